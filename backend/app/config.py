@@ -8,9 +8,23 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
+    # Package catalog: "sheets" (Google Sheets) or "file" (CSV/TSV, reloaded when it changes)
+    catalog_source: str = "sheets"
+    catalog_file_path: str = ""  # File source, defaults to sample_packages.csv in the repository root
+
     # Google Sheets
     google_sheets_id: str = ""
     google_service_account_key: str = ""  # Base64 encoded JSON key
+    sheets_block_rows: int = 5000  # Rows per batchGet block; 0 reads A:P in one request
+    sheets_fetch_concurrency: int = 4  # Row blocks fetched in parallel
+
+    # HTTP transport for Google API calls (pooled, shared by all threads)
+    google_api_connect_timeout: float = 5.0
+    google_api_read_timeout: float = 30.0
+    google_api_max_retries: int = 4  # Retries after 429/5xx responses and connection failures
+    google_api_backoff_base: float = 0.5  # Seconds; doubles per retry, fully jittered
+    google_api_backoff_max: float = 16.0  # Also caps Retry-After
+    google_api_pool_size: int = 10  # Kept-alive connections per host
 
     # Gemini AI
     gemini_api_key: str = ""
@@ -20,6 +34,78 @@ class Settings(BaseSettings):
 
     # Cache
     cache_ttl_seconds: int = 300  # 5 minutes
+    catalog_snapshot_enabled: bool = True  # Workers share one catalog fetch through mmap'd snapshot files
+    catalog_snapshot_dir: str = ""  # Defaults to app/data/catalog
+
+    # Server-side chat sessions (clients send session_id instead of their flow state)
+    chat_sessions_enabled: bool = True
+    chat_session_backend: str = "sqlite"  # "sqlite" (shared by workers) or "memory" (per worker)
+    chat_session_db_path: str = ""  # SQLite backend, defaults to app/data/chat_sessions.db
+    chat_session_ttl_seconds: float = 1800  # Idle sessions expire after this long
+    chat_session_max_bytes: int = 16 * 1024 * 1024  # Least recently used sessions are evicted above this
+    chat_history_max_turns: int = 10  # AI exchanges kept per session
+    chat_history_max_chars: int = 1000  # Longer messages are truncated in the history
+
+    # WebSocket chat (/api/chat/ws), limits per worker process
+    chat_ws_max_connections: int = 500
+    chat_ws_max_connections_per_client: int = 5
+    chat_ws_max_pending_messages: int = 8  # Queued messages per connection before new ones are rejected
+    chat_ws_max_message_bytes: int = 4096
+    chat_ws_idle_timeout_seconds: float = 300
+
+    # Custom trip requests (SQLite, shared by all workers)
+    trips_db_path: str = ""  # Defaults to app/data/custom_trips.db
+    trips_commit_max_batch: int = 100  # Most submissions committed in one transaction
+    trips_commit_linger_ms: float = 0  # Extra wait to grow a batch; 0 = only take what's queued
+
+    # Custom trip notifications (outbox in the trips database, delivered in the background)
+    notifications_enabled: bool = True
+    notifications_transport: str = "log"  # "log", "file" (JSON lines) or "smtp"
+    notifications_file_path: str = ""  # File transport, defaults to app/data/notifications.jsonl
+    notifications_admin_email: str = ""  # Admin alerts are skipped when empty
+    notifications_from_email: str = "info@nztours.com"
+    notifications_batch_size: int = 50  # Messages claimed and delivered together
+    notifications_max_attempts: int = 8  # Then the message is marked failed
+    notifications_retry_base_seconds: float = 5.0  # Doubles after each failed attempt
+    notifications_retry_max_seconds: float = 900.0
+    notifications_poll_seconds: float = 5.0  # Outbox check interval when not woken by a submission
+    smtp_host: str = "localhost"
+    smtp_port: int = 587
+    smtp_username: str = ""
+    smtp_password: str = ""
+    smtp_use_tls: bool = True
+
+    # Knowledge base / RAG (needs chromadb and sentence-transformers installed)
+    rag_enabled: bool = False
+    knowledge_db_path: str = ""  # SQLite knowledge store, defaults to app/data/knowledge.db
+    rag_vector_store: str = "chroma"  # "chroma" or "local" (in-process NumPy index)
+    rag_embedding_dtype: str = "float32"  # Local store only: float32, float16 or int8
+    rag_ann_index: str = "flat"  # Local store only: "flat" (exhaustive) or "ivf"
+    rag_ivf_nlist: int = 0  # Number of IVF clusters, 0 = ~sqrt(documents)
+    rag_ivf_nprobe: int = 8  # Clusters scored per query; higher = better recall, slower
+    rag_embed_batch_size: int = 64  # Documents embedded per batch on imports and rebuilds
+    rag_embed_workers: int = 0  # Processes for embedding large rebuilds, 0 or 1 = in-process
+    rag_embed_shard_size: int = 256  # Documents per process-pool shard
+    rag_parallel_embed_min_documents: int = 2000  # Smaller rebuilds always embed in-process
+    rag_reindex_debounce_seconds: float = 2.0  # Coalesce rebuild requests arriving this close together
+    rag_reindex_max_delay_seconds: float = 30.0  # Upper bound on how long a rebuild can be deferred
+
+    # Load models and API clients in the background at startup
+    warmup_enabled: bool = True
+
+    # Prometheus metrics at /metrics (per worker process)
+    metrics_enabled: bool = True
+
+    # Span timings in a Server-Timing header on every response
+    server_timing_enabled: bool = True
+
+    # Request profiling: send X-Profile with the admin token or sample a fraction of requests
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0  # Fraction of requests profiled automatically (not probes, /metrics or /api/profiles)
+    profiling_min_duration_ms: float = 0  # Sampled profiles of faster requests are discarded
+    profiling_admin_token: str = ""  # Required by X-Profile and /api/profiles; profiling stays off without it
+    profiling_dir: str = ""  # Defaults to app/data/profiles
+    profiling_max_profiles: int = 50  # Oldest profiles are deleted beyond this
 
     class Config:
         env_file = ".env"
@@ -1,21 +1,59 @@
 """FastAPI main application for NZ Tours API."""
 
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import get_settings
-from .routers import chat_router, packages_router, custom_trips_router
-# knowledge_router disabled - requires heavy dependencies (chromadb, sentence-transformers)
+from .routers import chat_router, packages_router, custom_trips_router, knowledge_router, profiles_router
+from .services.sheets_service import sheets_service
+from .services.gemini_service import gemini_service
+from .services.metrics import MetricsMiddleware, metrics
+from .services.profiling import ProfilingMiddleware, profiling_active
+from .services.rag_service import rag_service
+from .services.notifications import notification_outbox
+from .services.trip_store import trip_store
+from .services.warmup import warmup_tracker
+
+settings = get_settings()
+
+# Register components to warm up once the server is accepting connections
+warmup_tracker.register("sheets", sheets_service.warm_up)
+warmup_tracker.register("gemini", gemini_service.warm_up)
+if settings.rag_enabled:
+    warmup_tracker.register("rag", rag_service.warm_up)
+
+# Queue trip notifications in the same transaction as the trip
+if settings.notifications_enabled:
+    trip_store.add_hook(notification_outbox)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background warm-up and notification delivery; stop them on shutdown."""
+    if settings.warmup_enabled:
+        warmup_tracker.start()
+    else:
+        warmup_tracker.skip()
+    if settings.notifications_enabled:
+        notification_outbox.start()
+    yield
+    await warmup_tracker.stop()
+    notification_outbox.stop()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="NZ Tours API",
     description="API for New Zealand travel chatbot and tour packages",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
-settings = get_settings()
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
@@ -24,11 +62,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Span timings (Server-Timing header) and on-demand request profiles
+if settings.profiling_enabled and not profiling_active():
+    print("Request profiling disabled: PROFILING_ADMIN_TOKEN is not set")
+if profiling_active() or settings.server_timing_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
+# Outermost, so route latency includes the other middleware
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, registry=metrics)
+
 # Include routers
 app.include_router(chat_router)
 app.include_router(packages_router)
 app.include_router(custom_trips_router)
-# app.include_router(knowledge_router)  # Disabled for lighter deployment
+if profiling_active():
+    app.include_router(profiles_router)
+if settings.rag_enabled:
+    # Disabled by default for lighter deployment
+    app.include_router(knowledge_router)
 
 
 @app.get("/")
@@ -45,3 +97,21 @@ async def root():
 async def health():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@app.get("/ready")
+async def ready(response: Response):
+    """Readiness endpoint - reports warm-up status per component."""
+    status = warmup_tracker.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+
+if settings.metrics_enabled:
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def prometheus_metrics():
+        """Metrics in the Prometheus text format."""
+        # Some gauges query SQLite, so rendering stays off the event loop
+        body = await asyncio.to_thread(metrics.render)
+        return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
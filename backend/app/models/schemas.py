@@ -1,7 +1,11 @@
 """Pydantic models for the NZ Tours API."""
 
+from datetime import date
+from functools import cached_property
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
+
+from .seasons import describe_mask, month_mask, range_mask, season_mask
 
 
 class Package(BaseModel):
@@ -24,6 +28,18 @@ class Package(BaseModel):
     season: list[str]  # Best seasons
     status: str  # Active/Inactive
 
+    # Worked out on first use rather than at load, so validating a large
+    # catalog doesn't pay for a post-init hook on every package
+    @cached_property
+    def month_mask(self) -> int:
+        """Months the package runs, as a 12-bit mask (bit 0 is January)."""
+        return season_mask(self.season)
+
+    @property
+    def months(self) -> str:
+        """Months the package runs, e.g. "Dec-May"."""
+        return describe_mask(self.month_mask)
+
 
 class PackageFilter(BaseModel):
     """Filter criteria for packages."""
@@ -34,13 +50,35 @@ class PackageFilter(BaseModel):
     budget_min: Optional[float] = None
     budget_max: Optional[float] = None
     group_size: Optional[int] = None
+    travel_month: Optional[int] = Field(None, ge=1, le=12)
+    travel_season: Optional[str] = None  # Summer/Autumn/Winter/Spring, or a month range like "Oct-Mar"
+    travel_start: Optional[date] = None
+    travel_end: Optional[date] = None
+
+    @model_validator(mode="after")
+    def _check_travel_dates(self) -> "PackageFilter":
+        """Reject a travel date range that ends before it starts."""
+        if self.travel_start and self.travel_end and self.travel_end < self.travel_start:
+            raise ValueError("travel_end is before travel_start")
+        return self
+
+    def travel_mask(self) -> Optional[int]:
+        """Months of travel as a mask, or None if no travel time was given."""
+        if self.travel_month is not None:
+            return month_mask(self.travel_month)
+        if self.travel_start or self.travel_end:
+            return range_mask(self.travel_start or self.travel_end, self.travel_end)
+        if self.travel_season:
+            return season_mask([self.travel_season])
+        return None
 
 
 class ChatMessage(BaseModel):
     """Chat message from user."""
     message: str
     flow_state: Optional[str] = None
-    selections: Optional[dict] = None
+    selections: Optional[dict[str, str]] = None
+    session_id: Optional[str] = None  # Server-side session; replaces sending flow_state and selections
 
 
 class ChatResponse(BaseModel):
@@ -50,6 +88,7 @@ class ChatResponse(BaseModel):
     options: Optional[list[dict]] = None
     packages: Optional[list[Package]] = None
     is_ai_response: bool = False
+    session_id: Optional[str] = None
 
 
 class FlowOption(BaseModel):
@@ -0,0 +1,140 @@
+"""Travel seasons as 12-bit month masks (bit 0 is January).
+
+Seasons are New Zealand's (southern hemisphere): summer is December to
+February. Package seasons are free text, so names, month names and month
+ranges such as "Oct-Mar" are all accepted.
+"""
+
+from datetime import date
+from typing import Iterable, Optional
+
+ALL_MONTHS = 0xFFF
+
+MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+
+# Full and three-letter month names, lowercased, to month number
+MONTHS = {
+    **{name.lower(): i + 1 for i, name in enumerate(MONTH_NAMES)},
+    **{name[:3].lower(): i + 1 for i, name in enumerate(MONTH_NAMES)},
+    "sept": 9,
+}
+
+SEASON_MONTHS = {
+    "summer": (12, 1, 2),
+    "autumn": (3, 4, 5),
+    "fall": (3, 4, 5),
+    "winter": (6, 7, 8),
+    "spring": (9, 10, 11),
+}
+
+# Seasons that mean the package always runs
+ALL_YEAR = frozenset({"all", "all year", "year round", "year-round", "anytime", "any"})
+
+
+def month_mask(month: int) -> int:
+    """Mask of a single month (1-12)."""
+    if not 1 <= month <= 12:
+        raise ValueError(f"Month out of range: {month}")
+    return 1 << (month - 1)
+
+
+def months_mask(months: Iterable[int]) -> int:
+    """Mask of several months."""
+    mask = 0
+    for month in months:
+        mask |= month_mask(month)
+    return mask
+
+
+def span_mask(first: int, last: int) -> int:
+    """Mask of the months from ``first`` to ``last``, wrapping over the new year."""
+    count = (last - first) % 12 + 1
+    return months_mask((first - 1 + i) % 12 + 1 for i in range(count))
+
+
+def range_mask(start: date, end: Optional[date] = None) -> int:
+    """Mask of every month a trip between two dates touches."""
+    end = end or start
+    if end < start:
+        raise ValueError("Travel end date is before its start date")
+    if (end.year - start.year) * 12 + end.month - start.month >= 11:
+        return ALL_MONTHS
+    return span_mask(start.month, end.month)
+
+
+def parse_month(value) -> Optional[int]:
+    """Month number from 1-12, "7", "July" or "jul"; None if not a month."""
+    if isinstance(value, int):
+        return value if 1 <= value <= 12 else None
+    text = str(value).strip().lower()
+    if text.isdigit():
+        return parse_month(int(text))
+    return MONTHS.get(text)
+
+
+def season_mask(seasons: Iterable[str]) -> int:
+    """Normalise free-text seasons to a month mask.
+
+    Unrecognised entries are ignored; if nothing is recognised the package
+    is treated as running all year, so unclear data never hides it.
+    """
+    mask = 0
+    for season in seasons:
+        text = season.strip().lower()
+        if text in ALL_YEAR:
+            return ALL_MONTHS
+        if text in SEASON_MONTHS:
+            mask |= months_mask(SEASON_MONTHS[text])
+            continue
+        month = parse_month(text)
+        if month is not None:
+            mask |= month_mask(month)
+            continue
+        # Month ranges such as "Oct-Mar" or "November to April"
+        for separator in ("-", "–", " to "):
+            if separator in text:
+                first, last = (parse_month(part) for part in text.split(separator, 1))
+                if first and last:
+                    mask |= span_mask(first, last)
+                break
+    return mask or ALL_MONTHS
+
+
+def describe_mask(mask: int) -> str:
+    """Human-readable months, e.g. "All year" or "Dec-May"."""
+    if mask & ALL_MONTHS == ALL_MONTHS:
+        return "All year"
+    months = [month for month in range(1, 13) if mask & month_mask(month)]
+    if not months:
+        return "Never"
+    # Rotate so a run across the new year (e.g. Dec-Feb) reads in order
+    start = next(m for m in months if not mask & month_mask((m - 2) % 12 + 1))
+    runs, run = [], []
+    for i in range(12):
+        month = (start - 1 + i) % 12 + 1
+        if mask & month_mask(month):
+            run.append(month)
+        elif run:
+            runs.append(run)
+            run = []
+    if run:
+        runs.append(run)
+    short = [name[:3] for name in MONTH_NAMES]
+    return ", ".join(
+        short[r[0] - 1] if len(r) == 1 else f"{short[r[0] - 1]}-{short[r[-1] - 1]}" for r in runs
+    )
+
+
+def mentioned_months(text: str) -> int:
+    """Mask of the months and seasons named in free text (0 if none)."""
+    mask = 0
+    for word in text.lower().replace(",", " ").replace("?", " ").replace(".", " ").split():
+        if word in SEASON_MONTHS:
+            mask |= months_mask(SEASON_MONTHS[word])
+        # Short forms like "may" or "mar" are too ambiguous in conversation
+        elif word in MONTHS and len(word) > 3:
+            mask |= month_mask(MONTHS[word])
+    return mask
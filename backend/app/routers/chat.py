@@ -1,170 +1,305 @@
 """Chat endpoints."""
 
-from fastapi import APIRouter
+import asyncio
+import json
+from typing import Awaitable, Callable, Optional
 
+from fastapi import APIRouter, Response, WebSocket, WebSocketDisconnect
+
+from ..config import get_settings
 from ..models.schemas import ChatMessage, ChatResponse, Package
+from ..services.chat_flow import FLOW_CONFIG, STATE_SELECTION_MAP, chat_flow
+from ..services.chat_sessions import ChatSession, ChatSessionStore, SessionCodec
+from ..services.connection_limiter import ConnectionLimiter
 from ..services.sheets_service import sheets_service
 from ..services.gemini_service import gemini_service
 from ..services.recommendation import recommendation_service
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
-# Define conversation flow states and options
-FLOW_CONFIG = {
-    "greeting": {
-        "message": "Kia Ora! Welcome to NZ Tours. I'm here to help you discover the magic of Aotearoa New Zealand. How would you like to explore?",
-        "options": [
-            {"label": "Browse Packages", "value": "browse", "next_state": "destination"},
-            {"label": "Plan Custom Trip", "value": "custom", "next_state": "destination"},
-            {"label": "Talk to AI Assistant", "value": "ai", "next_state": "ai_chat"},
-        ],
-    },
-    "destination": {
-        "message": "Fantastic choice! Which region of New Zealand interests you most?",
-        "options": [
-            {"label": "North Island", "value": "north", "next_state": "trip_type"},
-            {"label": "South Island", "value": "south", "next_state": "trip_type"},
-            {"label": "Both Islands", "value": "both", "next_state": "trip_type"},
-            {"label": "Not Sure - Recommend Me!", "value": "recommend", "next_state": "trip_type"},
-        ],
-    },
-    "trip_type": {
-        "message": "What type of experience are you looking for?",
-        "options": [
-            {"label": "Adventure & Outdoors", "value": "adventure", "next_state": "duration"},
-            {"label": "Culture & Heritage", "value": "culture", "next_state": "duration"},
-            {"label": "Nature & Wildlife", "value": "nature", "next_state": "duration"},
-            {"label": "Food & Wine", "value": "food", "next_state": "duration"},
-            {"label": "Mixed Experience", "value": "mixed", "next_state": "duration"},
-        ],
-    },
-    "duration": {
-        "message": "How long would you like your adventure to be?",
-        "options": [
-            {"label": "3-5 Days", "value": "short", "next_state": "budget"},
-            {"label": "1 Week", "value": "week", "next_state": "budget"},
-            {"label": "2 Weeks", "value": "two_weeks", "next_state": "budget"},
-            {"label": "Flexible", "value": "flexible", "next_state": "budget"},
-        ],
-    },
-    "budget": {
-        "message": "What's your budget range per person?",
-        "options": [
-            {"label": "Budget ($500-$1,500)", "value": "budget", "next_state": "group_size"},
-            {"label": "Mid-Range ($1,500-$3,000)", "value": "mid", "next_state": "group_size"},
-            {"label": "Premium ($3,000-$5,000)", "value": "premium", "next_state": "group_size"},
-            {"label": "Luxury ($5,000+)", "value": "luxury", "next_state": "group_size"},
-        ],
-    },
-    "group_size": {
-        "message": "How many travelers will be joining?",
-        "options": [
-            {"label": "Solo Traveler", "value": "solo", "next_state": "show_packages"},
-            {"label": "Couple", "value": "couple", "next_state": "show_packages"},
-            {"label": "Small Group (3-5)", "value": "small", "next_state": "show_packages"},
-            {"label": "Large Group (6+)", "value": "large", "next_state": "show_packages"},
-        ],
-    },
-    "show_packages": {
-        "message": "Here are the perfect packages for your New Zealand adventure!",
-        "options": [
-            {"label": "Start New Search", "value": "restart", "next_state": "greeting"},
-            {"label": "Talk to AI Assistant", "value": "ai", "next_state": "ai_chat"},
-        ],
-    },
-    "ai_chat": {
-        "message": "I'm your AI travel assistant! Ask me anything about New Zealand travel, our packages, or help planning your trip. What would you like to know?",
-        "options": [
-            {"label": "Back to Package Browser", "value": "browse", "next_state": "destination"},
-        ],
-    },
-}
-
-# Map flow states to selection keys
-STATE_SELECTION_MAP = {
-    "destination": "destination",
-    "trip_type": "trip_type",
-    "duration": "duration",
-    "budget": "budget",
-    "group_size": "group_size",
-}
+settings = get_settings()
+chat_sessions = ChatSessionStore(
+    SessionCodec.from_flow(
+        FLOW_CONFIG,
+        STATE_SELECTION_MAP,
+        history_turns=settings.chat_history_max_turns,
+        history_chars=settings.chat_history_max_chars,
+    )
+)
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatMessage):
-    """Handle chat messages - both flow-based and AI responses."""
-    flow_state = request.flow_state or "greeting"
-    selections = request.selections or {}
-    message = request.message
+ws_connections = ConnectionLimiter(settings.chat_ws_max_connections, settings.chat_ws_max_connections_per_client)
 
-    # Check if user is in AI chat mode or typed a message
-    if flow_state == "ai_chat" or (message and not message.startswith("_flow:")):
-        # Use Gemini AI for response
-        packages = sheets_service.get_packages()
-        ai_response = await gemini_service.generate_response(message, packages)
 
-        return ChatResponse(
-            message=ai_response,
-            flow_state="ai_chat",
-            options=FLOW_CONFIG["ai_chat"]["options"],
-            is_ai_response=True,
-        )
+async def _save_session(session: Optional[ChatSession], flow_state: str, selections: dict) -> Optional[str]:
+    """Store the conversation state reached by this turn, returning the session id for the client."""
+    if session is None:
+        return None
+    session.flow_state = flow_state
+    session.selections = selections
+    session.lost = False
+    if chat_sessions.enabled:
+        # The SQLite backend blocks on disk and on other workers' writes
+        await asyncio.to_thread(chat_sessions.save, session)
+    return session.id
 
-    # Handle flow-based navigation
+
+def _is_ai_turn(flow_state: str, message: str) -> bool:
+    """Whether the user is in AI chat mode or typed a message."""
+    return flow_state == "ai_chat" or bool(message and not message.startswith("_flow:"))
+
+
+def _state_lost(session: Optional[ChatSession], selections_sent: bool, flow_state: str) -> bool:
+    """Whether a guided step would continue without the selections held by a lost session."""
+    return session is not None and session.lost and not selections_sent and flow_state != chat_flow.state(None)
+
+
+def _guided_step(message: str, flow_state: str, selections: dict) -> tuple[str, dict]:
+    """Apply a flow selection, returning the new state and selections."""
     if message.startswith("_flow:"):
         # Extract the selection value
         value = message.replace("_flow:", "")
 
-        # Find which option was selected and get next state
-        current_config = FLOW_CONFIG.get(flow_state, FLOW_CONFIG["greeting"])
-        next_state = flow_state
-
-        for option in current_config.get("options", []):
-            if option["value"] == value:
-                next_state = option.get("next_state", flow_state)
-                # Store the selection
-                if flow_state in STATE_SELECTION_MAP:
-                    selections[STATE_SELECTION_MAP[flow_state]] = value
-                break
+        # Look up the selected option's next state; unknown values stay put
+        next_state = chat_flow.transition(flow_state, value)
+        if next_state is None:
+            next_state = flow_state
+        elif flow_state in STATE_SELECTION_MAP:
+            # Store the selection
+            selections[STATE_SELECTION_MAP[flow_state]] = value
 
         # Special handling for restart
         if value == "restart":
             selections = {}
 
         flow_state = next_state
+    return flow_state, selections
 
-    # Get the flow configuration for current state
-    config = FLOW_CONFIG.get(flow_state, FLOW_CONFIG["greeting"])
 
-    # Build response
+def _ai_response(ai_response: str, session_id: Optional[str]) -> ChatResponse:
+    """Response for an AI turn."""
+    return ChatResponse(
+        message=ai_response,
+        flow_state="ai_chat",
+        options=chat_flow.options("ai_chat"),
+        is_ai_response=True,
+        session_id=session_id,
+    )
+
+
+def _packages_response(packages: list[Package], selections: dict, session_id: Optional[str]) -> ChatResponse:
+    """Response for the show_packages state, with recommendations."""
+    config = FLOW_CONFIG["show_packages"]
     response = ChatResponse(
         message=config["message"],
-        flow_state=flow_state,
+        flow_state="show_packages",
         options=config.get("options"),
         is_ai_response=False,
+        session_id=session_id,
     )
 
-    # If showing packages, get recommendations
-    if flow_state == "show_packages":
-        packages = sheets_service.get_packages()
-
-        if not packages:
-            # No packages available at all
-            response.message = "Sorry, there are no packages available at the moment. Please check back later or talk to our AI assistant for help!"
-            response.packages = []
+    if not packages:
+        # No packages available at all
+        response.message = "Sorry, there are no packages available at the moment. Please check back later or talk to our AI assistant for help!"
+        response.packages = []
+    else:
+        recommended = recommendation_service.get_recommendations(packages, selections)
+        if recommended:
+            response.packages = recommended
         else:
-            recommended = recommendation_service.get_recommendations(packages, selections)
-            if recommended:
-                response.packages = recommended
-            else:
-                response.packages = packages[:3]
-                response.message = "I couldn't find exact matches, but here are some amazing packages you might love!"
+            response.packages = packages[:3]
+            response.message = "I couldn't find exact matches, but here are some amazing packages you might love!"
 
     return response
 
 
+@router.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatMessage):
+    """Handle chat messages - both flow-based and AI responses.
+
+    With sessions enabled, a conversation gets a session when it starts; the
+    client can then send just its ``session_id``. State sent explicitly in
+    the request still takes precedence. If the session is gone and the
+    request carries no selections, the guided flow starts over instead of
+    recommending from empty selections.
+    """
+    session = None
+    if chat_sessions.enabled and (request.session_id or request.flow_state in (None, "greeting")):
+        session = await asyncio.to_thread(chat_sessions.load, request.session_id)
+
+    flow_state = chat_flow.state(request.flow_state or (session.flow_state if session else None))
+    selections = request.selections or (dict(session.selections) if session else {})
+    message = request.message
+
+    if _is_ai_turn(flow_state, message):
+        # Use Gemini AI for response
+        packages = await sheets_service.get_packages_async()
+        history = session.history if session else None
+        ai_response = await gemini_service.generate_response(message, packages, history)
+        if session is not None:
+            session.add_turn("user", message)
+            session.add_turn("assistant", ai_response)
+        return _ai_response(ai_response, await _save_session(session, "ai_chat", selections))
+
+    if _state_lost(session, request.selections is not None, flow_state):
+        flow_state, selections = chat_flow.state(None), {}
+    else:
+        flow_state, selections = _guided_step(message, flow_state, selections)
+    session_id = await _save_session(session, flow_state, selections)
+
+    # Guided steps have a fixed response, serialized when the flow was compiled
+    if flow_state != "show_packages":
+        return Response(chat_flow.response_body(flow_state, session_id), media_type="application/json")
+    packages = await sheets_service.get_packages_async()
+    return _packages_response(packages, selections, session_id)
+
+
+def _ws_frame(frame_type: str, data: Optional[str] = None, **fields) -> str:
+    """Encode a WebSocket frame; ``data`` is already-serialized JSON."""
+    frame = json.dumps({"type": frame_type, **fields})
+    if data is None:
+        return frame
+    return frame[:-1] + ', "data": ' + data + "}"
+
+
+async def _ws_turn(data: dict, session: ChatSession, send: Callable[[str], Awaitable[None]]) -> None:
+    """Handle one WebSocket chat message, streaming AI replies as they are generated."""
+    message = data.get("message", "")
+    if not isinstance(message, str):
+        await send(_ws_frame("error", detail="message must be a string"))
+        return
+    if not isinstance(data.get("flow_state"), (str, type(None))):
+        await send(_ws_frame("error", detail="flow_state must be a string"))
+        return
+    sent_selections = data.get("selections")
+    if sent_selections is not None and not (
+        isinstance(sent_selections, dict) and all(isinstance(value, str) for value in sent_selections.values())
+    ):
+        await send(_ws_frame("error", detail="selections must map names to strings"))
+        return
+    flow_state = chat_flow.state(data.get("flow_state") or session.flow_state)
+    selections = data.get("selections") or dict(session.selections)
+
+    if _is_ai_turn(flow_state, message):
+        await send(_ws_frame("typing"))
+        packages = await sheets_service.get_packages_async()
+        parts = []
+        # Each send waits for the socket, so a slow reader slows the stream instead of buffering it
+        async for chunk in gemini_service.stream_response(message, packages, session.history):
+            parts.append(chunk)
+            await send(_ws_frame("chunk", text=chunk))
+        ai_response = "".join(parts)
+        session.add_turn("user", message)
+        session.add_turn("assistant", ai_response)
+        response = _ai_response(ai_response, await _save_session(session, "ai_chat", selections))
+        await send(_ws_frame("response", response.model_dump_json()))
+        return
+
+    if _state_lost(session, "selections" in data, flow_state):
+        flow_state, selections = chat_flow.state(None), {}
+    else:
+        flow_state, selections = _guided_step(message, flow_state, selections)
+    session_id = await _save_session(session, flow_state, selections)
+    if flow_state != "show_packages":
+        body = chat_flow.response_body(flow_state, session_id).decode()
+    else:
+        packages = await sheets_service.get_packages_async()
+        body = _packages_response(packages, selections, session_id).model_dump_json()
+    await send(_ws_frame("response", body))
+
+
+@router.websocket("/chat/ws")
+async def chat_ws(websocket: WebSocket, session_id: Optional[str] = None):
+    """Chat over one persistent connection, with streamed AI replies.
+
+    Client frames are ``{"message": ..., "flow_state"?: ..., "selections"?: ...}``
+    or ``{"type": "ping"}``. The server sends ``session`` on connect, then
+    ``response`` frames carrying a ChatResponse under ``data``; AI turns are
+    preceded by ``typing`` and ``chunk`` frames with partial text. Messages
+    are handled one at a time in order. Messages beyond the pending limit
+    are rejected with an ``error`` frame.
+    """
+    client = websocket.client.host if websocket.client else "unknown"
+    if not ws_connections.acquire(client):
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
+
+    try:
+        await websocket.accept()
+        session = await asyncio.to_thread(chat_sessions.load, session_id)
+        send_lock = asyncio.Lock()
+
+        async def send(frame: str) -> None:
+            async with send_lock:
+                await websocket.send_text(frame)
+
+        pending: asyncio.Queue = asyncio.Queue(maxsize=settings.chat_ws_max_pending_messages)
+
+        async def process() -> None:
+            while True:
+                data = await pending.get()
+                try:
+                    await _ws_turn(data, session, send)
+                except Exception as e:
+                    print(f"Error handling chat message: {e}")
+                    await send(_ws_frame("error", detail="Failed to handle message"))
+
+        await send(_ws_frame("session", session_id=session.id))
+        worker = asyncio.create_task(process())
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        websocket.receive(), timeout=settings.chat_ws_idle_timeout_seconds
+                    )
+                except asyncio.TimeoutError:
+                    await websocket.close(code=1001, reason="Idle timeout")
+                    return
+                if event["type"] == "websocket.disconnect":
+                    return
+
+                text = event.get("text") or (event.get("bytes") or b"").decode("utf-8", "replace")
+                if len(text) > settings.chat_ws_max_message_bytes:
+                    await send(_ws_frame("error", detail="Message too large"))
+                    continue
+                try:
+                    data = json.loads(text)
+                    if not isinstance(data, dict):
+                        raise ValueError
+                except ValueError:
+                    await send(_ws_frame("error", detail="Invalid JSON message"))
+                    continue
+
+                if data.get("type") == "ping":
+                    await send(_ws_frame("pong"))
+                    continue
+                try:
+                    pending.put_nowait(data)
+                except asyncio.QueueFull:
+                    await send(_ws_frame("error", detail="Too many pending messages"))
+        finally:
+            worker.cancel()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        ws_connections.release(client)
+
+
+@router.get("/chat/sessions/stats")
+async def chat_session_stats():
+    """Chat session store size and evictions."""
+    return await asyncio.to_thread(chat_sessions.stats)
+
+
+@router.get("/chat/ws/stats")
+async def chat_ws_stats():
+    """Open and rejected WebSocket chat connections."""
+    return ws_connections.stats()
+
+
 @router.get("/sync")
 async def sync_packages():
     """Force refresh packages from Google Sheets."""
-    packages = sheets_service.get_packages(force_refresh=True)
+    packages = await sheets_service.get_packages_async(force_refresh=True)
     return {"status": "success", "count": len(packages)}
@@ -1,15 +1,24 @@
 """Custom trip request endpoints."""
 
+import asyncio
+import csv
+import io
+import json
 import uuid
-from datetime import datetime
-from fastapi import APIRouter
+from datetime import date, datetime
+from typing import Iterator, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from ..models.schemas import CustomTripRequest, CustomTripResponse
+from ..services.notifications import notification_outbox
+from ..services.trip_store import TRIP_FIELDS, trip_store
 
 router = APIRouter(prefix="/api/custom-trips", tags=["custom-trips"])
 
-# In-memory storage for demo (use database in production)
-custom_trip_requests: list[dict] = []
+# Leading characters that make a spreadsheet read a cell as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
 
 
 @router.post("", response_model=CustomTripResponse)
@@ -28,12 +37,12 @@ async def submit_custom_trip(request: CustomTripRequest):
         "created_at": datetime.now().isoformat(),
         "status": "pending",
     }
-    custom_trip_requests.append(trip_data)
-
-    # Here you would typically:
-    # 1. Save to database
-    # 2. Send notification email to admin
-    # 3. Send confirmation email to user
+    try:
+        # Returns once the request's batch has been committed; the admin and
+        # confirmation emails are queued in the same transaction and sent in the background
+        await trip_store.save(trip_data)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to save custom trip request")
 
     return CustomTripResponse(
         success=True,
@@ -43,6 +52,81 @@ async def submit_custom_trip(request: CustomTripRequest):
 
 
 @router.get("")
-async def get_custom_trip_requests():
-    """Get all custom trip requests (admin endpoint)."""
-    return {"requests": custom_trip_requests, "total": len(custom_trip_requests)}
+async def get_custom_trip_requests(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    skip_total: bool = False,
+):
+    """List custom trip requests, newest first, one page at a time (admin endpoint).
+
+    Pass ``next_cursor`` from the previous response as ``cursor`` to get
+    the following page. Date filters are inclusive. ``total`` counts every
+    matching request, a scan of them all; set ``skip_total`` to leave it
+    null when paging through a large backlog.
+    """
+    try:
+        requests, next_cursor = await asyncio.to_thread(
+            trip_store.list_page, limit, cursor, status, created_from, created_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = None if skip_total else await asyncio.to_thread(trip_store.count, status, created_from, created_to)
+    return {"requests": requests, "total": total, "next_cursor": next_cursor}
+
+
+def _csv_cell(value: object) -> object:
+    """Quote text a spreadsheet would otherwise evaluate as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _export_rows(trips: Iterator[dict], export_format: str) -> Iterator[str]:
+    """Serialise trips one row at a time as CSV or NDJSON."""
+    if export_format == "ndjson":
+        for trip in trips:
+            yield json.dumps(trip, ensure_ascii=False) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TRIP_FIELDS)
+    for trip in trips:
+        writer.writerow([
+            _csv_cell(json.dumps(trip["selections"], ensure_ascii=False) if field == "selections" else trip[field])
+            for field in TRIP_FIELDS
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/export")
+async def export_custom_trip_requests(
+    export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    status: Optional[str] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+):
+    """Stream matching custom trip requests as CSV or NDJSON (admin endpoint).
+
+    CSV cells starting with a formula character are prefixed with ``'`` so
+    spreadsheets show them as text.
+    """
+    trips = trip_store.iter_trips(status, created_from, created_to)
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_rows(trips, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=custom_trips.{export_format}"},
+    )
+
+
+@router.get("/notifications")
+async def get_notification_stats():
+    """Notification outbox depth and delivery metrics (admin endpoint)."""
+    return await asyncio.to_thread(notification_outbox.stats)
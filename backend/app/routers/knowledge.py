@@ -1,13 +1,16 @@
 """Knowledge base management endpoints."""
 
+import asyncio
 import json
-from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 
+from ..services.knowledge_store import COLLECTION_FIELDS, SECTIONS, knowledge_store
 from ..services.rag_service import rag_service
+from ..services.reindex_queue import reindex_queue
 
 router = APIRouter(prefix="/api/knowledge", tags=["knowledge"])
 
@@ -51,19 +54,159 @@ class BulkAddRequest(BaseModel):
     activities: Optional[list[ActivityItem]] = None
 
 
+# Maximum number of per-line errors reported by an NDJSON import
+MAX_IMPORT_ERRORS = 100
+
+
+class NDJSONImport:
+    """Incremental NDJSON import: validates lines, stores and embeds them in batches."""
+
+    def __init__(self, batch_size: int, embed: bool):
+        self.batch_size = batch_size
+        self.embed = embed
+        self.models = {"faqs": FAQItem, "destinations": DestinationItem, "activities": ActivityItem}
+        self.pending: dict[str, list[dict]] = {collection: [] for collection in COLLECTION_FIELDS}
+        self.pending_count = 0
+        self.added = {collection: 0 for collection in COLLECTION_FIELDS}
+        self.sections: list[str] = []
+        self.embedded = 0
+        self.invalid = 0
+        self.errors: list[dict] = []
+        self.line_number = 0
+
+    def _error(self, message: str) -> None:
+        """Record an invalid line."""
+        self.invalid += 1
+        if len(self.errors) < MAX_IMPORT_ERRORS:
+            self.errors.append({"line": self.line_number, "error": message})
+
+    async def feed(self, line: bytes) -> None:
+        """Validate one line, flushing a batch once enough items are pending."""
+        self.line_number += 1
+        if not line.strip():
+            return
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            self._error(f"Invalid JSON: {e}")
+            return
+        if not isinstance(record, dict):
+            self._error("Expected a JSON object")
+            return
+
+        if "section" in record:
+            if record["section"] not in SECTIONS:
+                self._error(f"Unknown section: {record['section']}")
+                return
+            await asyncio.to_thread(knowledge_store.set_section, record["section"], record.get("data"))
+            self.sections.append(record["section"])
+            return
+
+        collection = record.get("collection")
+        model = self.models.get(collection) if isinstance(collection, str) else None
+        if model is None:
+            self._error(f"Unknown collection: {record.get('collection')}")
+            return
+        try:
+            item = model.model_validate(record.get("item")).model_dump()
+        except ValidationError as e:
+            self._error(str(e))
+            return
+
+        self.pending[record["collection"]].append(item)
+        self.pending_count += 1
+        if self.pending_count >= self.batch_size:
+            await self.flush()
+
+    def _write_batch(self, batch: dict[str, list[dict]]) -> None:
+        """Store one batch in a single transaction, then embed it."""
+        row_ids = knowledge_store.add_many(batch)
+        for collection, ids in row_ids.items():
+            self.added[collection] += len(ids)
+        if self.embed:
+            documents = (
+                rag_service._item_document(collection, row_id, item)
+                for collection, items in batch.items()
+                for row_id, item in zip(row_ids[collection], items)
+            )
+            self.embedded += rag_service.add_documents(documents)
+
+    async def flush(self) -> None:
+        """Write out pending items off the event loop."""
+        if not self.pending_count:
+            return
+        batch = {collection: items for collection, items in self.pending.items() if items}
+        self.pending = {collection: [] for collection in COLLECTION_FIELDS}
+        self.pending_count = 0
+        await asyncio.to_thread(self._write_batch, batch)
+
+    def _embed_sections(self) -> int:
+        """Re-embed the imported sections as stored."""
+        documents = [
+            doc
+            for name in dict.fromkeys(self.sections)
+            for doc in rag_service._section_documents(name, knowledge_store.get_section(name))
+        ]
+        return rag_service.add_documents(documents)
+
+    async def finish(self) -> None:
+        """Flush the last batch and re-embed any imported sections."""
+        await self.flush()
+        if self.embed and self.sections:
+            self.embedded += await asyncio.to_thread(self._embed_sections)
+
+    def summary(self) -> dict:
+        """Import results."""
+        return {
+            "status": "success",
+            "added": self.added,
+            "sections": sorted(set(self.sections)),
+            "embedded": self.embedded,
+            "invalid": self.invalid,
+            "errors": self.errors,
+        }
+
+
+def _export_ndjson() -> Iterator[bytes]:
+    """Yield the knowledge base one NDJSON record at a time."""
+    for name in SECTIONS:
+        data = knowledge_store.get_section(name)
+        if data is not None:
+            yield (json.dumps({"section": name, "data": data}, ensure_ascii=False) + "\n").encode()
+    for collection in COLLECTION_FIELDS:
+        for item in knowledge_store.iter_items(collection):
+            yield (json.dumps({"collection": collection, "item": item}, ensure_ascii=False) + "\n").encode()
+
+
 @router.post("/initialize")
 async def initialize_rag(force_rebuild: bool = False):
-    """Initialize or rebuild the RAG index."""
-    success = rag_service.initialize(force_rebuild=force_rebuild)
+    """Initialize the RAG index, or queue a background rebuild."""
+    if force_rebuild:
+        job = reindex_queue.request_rebuild("initialize")
+        return {"status": "queued", "message": "RAG rebuild queued", "job_id": job.id}
+    success = await asyncio.to_thread(rag_service.initialize)
     if success:
         return {"status": "success", "message": "RAG system initialized successfully"}
     raise HTTPException(status_code=500, detail="Failed to initialize RAG system")
 
 
 @router.get("/search")
-async def search_knowledge(query: str, n_results: int = 5):
-    """Search the knowledge base."""
-    results = rag_service.retrieve(query, n_results=n_results)
+async def search_knowledge(
+    query: str,
+    n_results: int = 5,
+    doc_types: Optional[list[str]] = Query(None, alias="type"),
+    region: Optional[str] = None,
+    location: Optional[str] = None,
+):
+    """Search the knowledge base, optionally filtered by type, region and location."""
+    results = await asyncio.to_thread(
+        rag_service.retrieve,
+        query,
+        n_results=n_results,
+        doc_types=doc_types,
+        region=region,
+        location=location,
+    )
     return {"query": query, "results": results}
 
 
@@ -71,23 +214,12 @@ async def search_knowledge(query: str, n_results: int = 5):
 async def add_faq(faq: FAQItem):
     """Add a new FAQ to the knowledge base."""
     try:
-        kb_path = Path(__file__).parent.parent / "data" / "knowledge_base.json"
-
-        with open(kb_path, 'r', encoding='utf-8') as f:
-            kb = json.load(f)
-
-        if "faqs" not in kb:
-            kb["faqs"] = []
-
-        kb["faqs"].append({"question": faq.question, "answer": faq.answer})
+        await asyncio.to_thread(knowledge_store.add, "faqs", {"question": faq.question, "answer": faq.answer})
 
-        with open(kb_path, 'w', encoding='utf-8') as f:
-            json.dump(kb, f, indent=2, ensure_ascii=False)
+        # Rebuild RAG index in the background
+        job = reindex_queue.request_rebuild("faq")
 
-        # Rebuild RAG index
-        rag_service.initialize(force_rebuild=True)
-
-        return {"status": "success", "message": "FAQ added successfully"}
+        return {"status": "success", "message": "FAQ added successfully", "job_id": job.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -96,22 +228,11 @@ async def add_faq(faq: FAQItem):
 async def add_destination(destination: DestinationItem):
     """Add a new destination to the knowledge base."""
     try:
-        kb_path = Path(__file__).parent.parent / "data" / "knowledge_base.json"
-
-        with open(kb_path, 'r', encoding='utf-8') as f:
-            kb = json.load(f)
-
-        if "destinations" not in kb:
-            kb["destinations"] = []
-
-        kb["destinations"].append(destination.model_dump())
+        await asyncio.to_thread(knowledge_store.add, "destinations", destination.model_dump())
 
-        with open(kb_path, 'w', encoding='utf-8') as f:
-            json.dump(kb, f, indent=2, ensure_ascii=False)
+        job = reindex_queue.request_rebuild("destination")
 
-        rag_service.initialize(force_rebuild=True)
-
-        return {"status": "success", "message": "Destination added successfully"}
+        return {"status": "success", "message": "Destination added successfully", "job_id": job.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -120,22 +241,11 @@ async def add_destination(destination: DestinationItem):
 async def add_activity(activity: ActivityItem):
     """Add a new activity to the knowledge base."""
     try:
-        kb_path = Path(__file__).parent.parent / "data" / "knowledge_base.json"
-
-        with open(kb_path, 'r', encoding='utf-8') as f:
-            kb = json.load(f)
-
-        if "activities" not in kb:
-            kb["activities"] = []
-
-        kb["activities"].append(activity.model_dump())
+        await asyncio.to_thread(knowledge_store.add, "activities", activity.model_dump())
 
-        with open(kb_path, 'w', encoding='utf-8') as f:
-            json.dump(kb, f, indent=2, ensure_ascii=False)
+        job = reindex_queue.request_rebuild("activity")
 
-        rag_service.initialize(force_rebuild=True)
-
-        return {"status": "success", "message": "Activity added successfully"}
+        return {"status": "success", "message": "Activity added successfully", "job_id": job.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -143,7 +253,8 @@ async def add_activity(activity: ActivityItem):
 @router.post("/document")
 async def add_document(doc: DocumentItem):
     """Add a generic document to RAG index."""
-    success = rag_service.add_document(
+    success = await asyncio.to_thread(
+        rag_service.add_document,
         doc_id=doc.id,
         content=doc.content,
         metadata={"type": doc.doc_type}
@@ -157,63 +268,43 @@ async def add_document(doc: DocumentItem):
 async def bulk_add(request: BulkAddRequest):
     """Add multiple items to knowledge base."""
     try:
-        kb_path = Path(__file__).parent.parent / "data" / "knowledge_base.json"
-
-        with open(kb_path, 'r', encoding='utf-8') as f:
-            kb = json.load(f)
+        items = {
+            "faqs": [{"question": faq.question, "answer": faq.answer} for faq in request.faqs or []],
+            "destinations": [dest.model_dump() for dest in request.destinations or []],
+            "activities": [activity.model_dump() for activity in request.activities or []],
+        }
 
-        added = {"faqs": 0, "destinations": 0, "activities": 0}
+        # All collections are written in a single transaction
+        row_ids = await asyncio.to_thread(knowledge_store.add_many, items)
+        added = {collection: len(ids) for collection, ids in row_ids.items()}
 
-        if request.faqs:
-            if "faqs" not in kb:
-                kb["faqs"] = []
-            for faq in request.faqs:
-                kb["faqs"].append({"question": faq.question, "answer": faq.answer})
-                added["faqs"] += 1
+        job = reindex_queue.request_rebuild("bulk")
 
-        if request.destinations:
-            if "destinations" not in kb:
-                kb["destinations"] = []
-            for dest in request.destinations:
-                kb["destinations"].append(dest.model_dump())
-                added["destinations"] += 1
+        return {"status": "success", "added": added, "job_id": job.id}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if request.activities:
-            if "activities" not in kb:
-                kb["activities"] = []
-            for activity in request.activities:
-                kb["activities"].append(activity.model_dump())
-                added["activities"] += 1
 
-        with open(kb_path, 'w', encoding='utf-8') as f:
-            json.dump(kb, f, indent=2, ensure_ascii=False)
+@router.get("/jobs")
+async def list_reindex_jobs():
+    """List recent reindex jobs, newest first."""
+    return {"jobs": [job.to_dict() for job in reindex_queue.recent()]}
 
-        rag_service.initialize(force_rebuild=True)
 
-        return {"status": "success", "added": added}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@router.get("/jobs/{job_id}")
+async def get_reindex_job(job_id: str):
+    """Get progress and timings of a reindex job."""
+    job = reindex_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 
 @router.get("/stats")
 async def get_knowledge_stats():
     """Get knowledge base statistics."""
     try:
-        kb_path = Path(__file__).parent.parent / "data" / "knowledge_base.json"
-
-        with open(kb_path, 'r', encoding='utf-8') as f:
-            kb = json.load(f)
-
-        stats = {
-            "faqs": len(kb.get("faqs", [])),
-            "destinations": len(kb.get("destinations", [])),
-            "activities": len(kb.get("activities", [])),
-            "has_company_info": "company_info" in kb,
-            "has_policies": "policies" in kb,
-            "seasons_documented": len(kb.get("seasonal_tips", {})),
-        }
-
-        return stats
+        return await asyncio.to_thread(knowledge_store.stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -222,11 +313,43 @@ async def get_knowledge_stats():
 async def export_knowledge():
     """Export the entire knowledge base."""
     try:
-        kb_path = Path(__file__).parent.parent / "data" / "knowledge_base.json"
+        return await asyncio.to_thread(knowledge_store.export)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export/ndjson")
+async def export_knowledge_ndjson():
+    """Stream the knowledge base as NDJSON, one section or item per line."""
+    return StreamingResponse(
+        _export_ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=knowledge_base.ndjson"},
+    )
 
-        with open(kb_path, 'r', encoding='utf-8') as f:
-            kb = json.load(f)
 
-        return kb
+@router.post("/import/ndjson")
+async def import_knowledge_ndjson(request: Request, batch_size: int = 500, embed: bool = True):
+    """Stream an NDJSON import, storing and embedding records in batches.
+
+    Lines use the export format: ``{"collection": "faqs", "item": {...}}`` or
+    ``{"section": "policies", "data": {...}}``. Invalid lines are skipped
+    and reported; valid ones are committed batch by batch.
+    """
+    importer = NDJSONImport(batch_size=max(1, batch_size), embed=embed)
+    buffer = b""
+    try:
+        if embed and not rag_service.is_initialized:
+            # Build the index from existing data first so batches are only embedded once
+            await asyncio.to_thread(rag_service.initialize)
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                await importer.feed(line)
+        if buffer:
+            await importer.feed(buffer)
+        await importer.finish()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return importer.summary()
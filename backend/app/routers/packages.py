@@ -1,25 +1,80 @@
 """Package endpoints."""
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
 
 from ..models.schemas import Package, PackageFilter
+from ..services.package_search import PackageSearchIndex, package_search
 from ..services.sheets_service import sheets_service
 from ..services.recommendation import recommendation_service
 
 router = APIRouter(prefix="/api/packages", tags=["packages"])
 
 
+class SnapshotJSONResponse(Response):
+    """JSON already rendered into the catalog snapshot, sent from the mapped pages without copying."""
+
+    media_type = "application/json"
+
+    def render(self, content: memoryview) -> memoryview:
+        return content
+
+
 @router.get("", response_model=list[Package])
 async def get_packages():
     """Get all active packages."""
-    packages = sheets_service.get_packages()
+    packages = await sheets_service.get_packages_async()
+    body = sheets_service.cached_json(packages)
+    if body is not None:
+        return SnapshotJSONResponse(body)
     return packages
 
 
+async def _search_index() -> PackageSearchIndex:
+    """Search index for the current catalog."""
+    packages = await sheets_service.get_packages_async()
+    version = sheets_service.catalog_version
+    index = package_search.cached(packages, version)
+    if index is None:
+        # Rebuilding takes about a second at 10k packages; keep it off the event loop
+        index = await asyncio.to_thread(package_search.get_index, packages, version)
+    return index
+
+
+@router.get("/search", response_model=list[Package])
+async def search_packages(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=50),
+    prefix: bool = False,
+):
+    """Full-text search over package names, regions, highlights, descriptions and itineraries, best match first."""
+    index = await _search_index()
+    return [package for package, _ in index.search(q, limit, prefix=prefix)]
+
+
+@router.get("/autocomplete")
+async def autocomplete_packages(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(8, ge=1, le=20),
+):
+    """Type-ahead suggestions: completions of the last word and the best matching packages."""
+    index = await _search_index()
+    return {
+        "suggestions": index.suggest(q, limit),
+        "packages": [
+            {"id": package.id, "name": package.name}
+            for package, _ in index.search(q, limit, prefix=True)
+        ],
+    }
+
+
+# Declared after the fixed paths above so they are not captured as ids
 @router.get("/{package_id}", response_model=Package)
 async def get_package(package_id: str):
     """Get a specific package by ID."""
-    packages = sheets_service.get_packages()
+    packages = await sheets_service.get_packages_async()
     for package in packages:
         if package.id == package_id:
             return package
@@ -29,6 +84,6 @@ async def get_package(package_id: str):
 @router.post("/filter", response_model=list[Package])
 async def filter_packages(filters: PackageFilter):
     """Filter packages by criteria."""
-    packages = sheets_service.get_packages()
+    packages = await sheets_service.get_packages_async()
     filtered = recommendation_service.filter_packages(packages, filters)
     return filtered
@@ -0,0 +1,48 @@
+"""Admin endpoints for request profiles captured by the profiling middleware."""
+
+import hmac
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from ..config import get_settings
+from ..services.profiling import profile_store
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Reject the request unless it carries the admin token (always, if none is configured)."""
+    token = get_settings().profiling_admin_token
+    if not (token and x_admin_token and hmac.compare_digest(x_admin_token, token)):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/api/profiles", tags=["profiles"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("")
+async def list_profiles():
+    """Stored profiles, newest first, with their request details and span timings."""
+    return {"profiles": profile_store.list()}
+
+
+@router.get("/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(
+    profile_id: str,
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    limit: int = Query(40, ge=1, le=500),
+):
+    """Text report of a profile's most expensive functions."""
+    report = profile_store.report(profile_id, sort, limit)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
+
+
+@router.get("/{profile_id}/raw")
+async def download_profile(profile_id: str):
+    """The pstats dump, for snakeviz or ``python -m pstats``."""
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
@@ -0,0 +1,163 @@
+"""Package catalog shared by every worker process through memory-mapped snapshot files.
+
+One worker at a time (whoever holds the refresh lock) fetches the catalog and
+publishes it as ``catalog-<version>.snap``: a small header followed by the
+catalog rendered as the JSON array ``/api/packages`` returns. The current
+version lives in an 8-byte control file that every worker maps, so checking
+for a new version is a memory read, and all workers switch together as soon
+as the control word is bumped. Snapshot bytes are shared through the page
+cache; each worker only builds its own ``Package`` objects, once per version.
+"""
+
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from pydantic import TypeAdapter
+
+from ..config import get_settings
+from ..models.schemas import Package
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; the catalog stays per process there
+    fcntl = None
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+MAGIC = b"NZCS"
+FORMAT_VERSION = 2
+# magic, format version, catalog version, published at, package count, body
+# length, source version (0, 0 if the source has none)
+HEADER = struct.Struct("<4sHxxQdIQqq")
+CONTROL = struct.Struct("<Q")
+
+# Snapshots kept on disk besides the current one, for workers still switching over
+KEEP_SNAPSHOTS = 2
+
+_packages_adapter = TypeAdapter(list[Package])
+
+
+class CatalogSnapshot:
+    """A published catalog version, mapped read-only."""
+
+    def __init__(self, path: Path, packages: Optional[list[Package]] = None):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt = struct.unpack_from("<4sH", self._map)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"Not a catalog snapshot: {path}")
+        _, _, self.version, self.published_at, self.count, length, *source_version = HEADER.unpack_from(self._map)
+        # Version of the source the catalog was read from, such as a file's (mtime_ns, size)
+        self.source_version: Optional[tuple[int, int]] = tuple(source_version) if any(source_version) else None
+        # A view, not a copy: responses are written straight from the shared pages
+        self.body = memoryview(self._map)[HEADER.size:HEADER.size + length]
+        self._packages = packages
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was published."""
+        return time.time() - self.published_at
+
+    def packages(self) -> list[Package]:
+        """The catalog as models, parsed on first use."""
+        if self._packages is None:
+            self._packages = _packages_adapter.validate_json(bytes(self.body))
+        return self._packages
+
+
+class CatalogSnapshotStore:
+    """Publishes and follows catalog snapshots in a directory shared by the workers."""
+
+    def __init__(self, directory: Optional[Path] = None, subdirectory: str = ""):
+        self.directory = Path(directory or get_settings().catalog_snapshot_dir or DATA_DIR / "catalog") / subdirectory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._control_path = self.directory / "CURRENT"
+        self._lock_path = self.directory / "refresh.lock"
+        if not self._control_path.exists():
+            # Created under the lock so two workers starting together don't both truncate it
+            with self.refresh_lock(blocking=True):
+                if not self._control_path.exists() or self._control_path.stat().st_size < CONTROL.size:
+                    tmp = self._control_path.with_suffix(".tmp")
+                    tmp.write_bytes(CONTROL.pack(0))
+                    tmp.replace(self._control_path)
+        with open(self._control_path, "r+b") as f:
+            self._control = mmap.mmap(f.fileno(), CONTROL.size)
+        self._snapshot: Optional[CatalogSnapshot] = None
+
+    def _path(self, version: int) -> Path:
+        return self.directory / f"catalog-{version:012d}.snap"
+
+    def published_version(self) -> int:
+        """Version in the control word (0 before the first publish)."""
+        return CONTROL.unpack_from(self._control)[0]
+
+    def current(self) -> Optional[CatalogSnapshot]:
+        """The latest published snapshot, remapped only when the version changes."""
+        version = self.published_version()
+        if version == 0:
+            return None
+        if self._snapshot is None or self._snapshot.version != version:
+            try:
+                self._snapshot = CatalogSnapshot(self._path(version))
+            except (OSError, ValueError) as e:
+                # A torn read of the control word or a pruned file; keep the mapped version
+                print(f"Error mapping catalog snapshot {version}: {e}")
+        return self._snapshot
+
+    @contextmanager
+    def refresh_lock(self, blocking: bool) -> Iterator[bool]:
+        """Hold the cross-process refresh lock; yields False if not blocking and it is taken."""
+        with open(self._lock_path, "a+b") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def publish(self, packages: list[Package], source_version: Optional[tuple[int, int]] = None) -> CatalogSnapshot:
+        """Write a new version and switch every worker to it (refresh lock held)."""
+        version = self.published_version() + 1
+        body = _packages_adapter.dump_json(packages)
+        header = HEADER.pack(
+            MAGIC, FORMAT_VERSION, version, time.time(), len(packages), len(body), *(source_version or (0, 0))
+        )
+        path = self._path(version)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(body)
+        os.replace(tmp, path)
+        # The snapshot is complete before any worker can see its version
+        self._snapshot = CatalogSnapshot(path, packages)
+        CONTROL.pack_into(self._control, 0, version)
+        self._prune(version)
+        return self._snapshot
+
+    def _prune(self, version: int) -> None:
+        """Delete old snapshot files; workers that still map one keep their pages."""
+        for path in self.directory.glob("catalog-*.snap"):
+            try:
+                if int(path.stem.split("-")[1]) < version - KEEP_SNAPSHOTS:
+                    path.unlink(missing_ok=True)
+            except (ValueError, OSError):
+                continue
+
+
+def create_snapshot_store(subdirectory: str = "") -> Optional[CatalogSnapshotStore]:
+    """The shared snapshot store if enabled and supported, else None (per-process catalog)."""
+    if not get_settings().catalog_snapshot_enabled or fcntl is None:
+        return None
+    try:
+        return CatalogSnapshotStore(subdirectory=subdirectory)
+    except OSError as e:
+        print(f"Shared catalog disabled, cannot use snapshot directory: {e}")
+        return None
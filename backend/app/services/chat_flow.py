@@ -0,0 +1,183 @@
+"""Guided chat flow definition, compiled into a transition table."""
+
+import json
+from typing import Optional
+
+from ..models.schemas import ChatResponse
+
+INITIAL_STATE = "greeting"
+
+# Define conversation flow states and options
+FLOW_CONFIG = {
+    "greeting": {
+        "message": "Kia Ora! Welcome to NZ Tours. I'm here to help you discover the magic of Aotearoa New Zealand. How would you like to explore?",
+        "options": [
+            {"label": "Browse Packages", "value": "browse", "next_state": "destination"},
+            {"label": "Plan Custom Trip", "value": "custom", "next_state": "destination"},
+            {"label": "Talk to AI Assistant", "value": "ai", "next_state": "ai_chat"},
+        ],
+    },
+    "destination": {
+        "message": "Fantastic choice! Which region of New Zealand interests you most?",
+        "options": [
+            {"label": "North Island", "value": "north", "next_state": "trip_type"},
+            {"label": "South Island", "value": "south", "next_state": "trip_type"},
+            {"label": "Both Islands", "value": "both", "next_state": "trip_type"},
+            {"label": "Not Sure - Recommend Me!", "value": "recommend", "next_state": "trip_type"},
+        ],
+    },
+    "trip_type": {
+        "message": "What type of experience are you looking for?",
+        "options": [
+            {"label": "Adventure & Outdoors", "value": "adventure", "next_state": "duration"},
+            {"label": "Culture & Heritage", "value": "culture", "next_state": "duration"},
+            {"label": "Nature & Wildlife", "value": "nature", "next_state": "duration"},
+            {"label": "Food & Wine", "value": "food", "next_state": "duration"},
+            {"label": "Mixed Experience", "value": "mixed", "next_state": "duration"},
+        ],
+    },
+    "duration": {
+        "message": "How long would you like your adventure to be?",
+        "options": [
+            {"label": "3-5 Days", "value": "short", "next_state": "budget"},
+            {"label": "1 Week", "value": "week", "next_state": "budget"},
+            {"label": "2 Weeks", "value": "two_weeks", "next_state": "budget"},
+            {"label": "Flexible", "value": "flexible", "next_state": "budget"},
+        ],
+    },
+    "budget": {
+        "message": "What's your budget range per person?",
+        "options": [
+            {"label": "Budget ($500-$1,500)", "value": "budget", "next_state": "group_size"},
+            {"label": "Mid-Range ($1,500-$3,000)", "value": "mid", "next_state": "group_size"},
+            {"label": "Premium ($3,000-$5,000)", "value": "premium", "next_state": "group_size"},
+            {"label": "Luxury ($5,000+)", "value": "luxury", "next_state": "group_size"},
+        ],
+    },
+    "group_size": {
+        "message": "How many travelers will be joining?",
+        "options": [
+            {"label": "Solo Traveler", "value": "solo", "next_state": "travel_time"},
+            {"label": "Couple", "value": "couple", "next_state": "travel_time"},
+            {"label": "Small Group (3-5)", "value": "small", "next_state": "travel_time"},
+            {"label": "Large Group (6+)", "value": "large", "next_state": "travel_time"},
+        ],
+    },
+    "travel_time": {
+        "message": "When are you planning to travel?",
+        "options": [
+            {"label": "Summer (Dec-Feb)", "value": "summer", "next_state": "show_packages"},
+            {"label": "Autumn (Mar-May)", "value": "autumn", "next_state": "show_packages"},
+            {"label": "Winter (Jun-Aug)", "value": "winter", "next_state": "show_packages"},
+            {"label": "Spring (Sep-Nov)", "value": "spring", "next_state": "show_packages"},
+            {"label": "Not Sure Yet", "value": "anytime", "next_state": "show_packages"},
+        ],
+    },
+    "show_packages": {
+        "message": "Here are the perfect packages for your New Zealand adventure!",
+        "options": [
+            {"label": "Start New Search", "value": "restart", "next_state": "greeting"},
+            {"label": "Talk to AI Assistant", "value": "ai", "next_state": "ai_chat"},
+        ],
+    },
+    "ai_chat": {
+        "message": "I'm your AI travel assistant! Ask me anything about New Zealand travel, our packages, or help planning your trip. What would you like to know?",
+        "options": [
+            {"label": "Back to Package Browser", "value": "browse", "next_state": "destination"},
+        ],
+    },
+}
+
+# Map flow states to selection keys
+STATE_SELECTION_MAP = {
+    "destination": "destination",
+    "trip_type": "trip_type",
+    "duration": "duration",
+    "budget": "budget",
+    "group_size": "group_size",
+    "travel_time": "travel_time",
+}
+
+
+class CompiledFlow:
+    """Chat flow compiled for constant-time steps.
+
+    Transitions are a ``(state, value) -> next state`` dict and each state's
+    response body is serialized once, so a guided step is a dict lookup and
+    a byte copy. The definition is validated when compiled: every
+    ``next_state`` must exist and every state must be reachable from the
+    initial state.
+    """
+
+    def __init__(self, config: dict, selection_map: dict, initial_state: str = INITIAL_STATE):
+        self.config = config
+        self.selection_map = selection_map
+        self.initial_state = initial_state
+        self._validate()
+
+        self.transitions: dict[tuple[str, str], str] = {
+            (state, option["value"]): option.get("next_state", state)
+            for state, state_config in config.items()
+            for option in state_config.get("options", [])
+        }
+        # Bodies end just before the session id value, which varies per response
+        self._body_prefixes: dict[str, bytes] = {}
+        for state, state_config in config.items():
+            body = ChatResponse(
+                message=state_config["message"],
+                flow_state=state,
+                options=state_config.get("options"),
+                is_ai_response=False,
+            ).model_dump_json().encode()
+            suffix = b'"session_id":null}'
+            if not body.endswith(suffix):
+                raise ValueError("ChatResponse must serialize session_id last")
+            self._body_prefixes[state] = body[: -len(suffix)] + b'"session_id":'
+
+    def _validate(self) -> None:
+        """Reject dangling transitions and unreachable states."""
+        if self.initial_state not in self.config:
+            raise ValueError(f"Chat flow has no initial state '{self.initial_state}'")
+        problems = [
+            f"{state} -> {option.get('value')}: unknown state '{option['next_state']}'"
+            for state, state_config in self.config.items()
+            for option in state_config.get("options", [])
+            if option.get("next_state", state) not in self.config
+        ]
+        problems += [
+            f"selection state '{state}' is not a flow state"
+            for state in self.selection_map
+            if state not in self.config
+        ]
+
+        reachable, frontier = {self.initial_state}, [self.initial_state]
+        while frontier:
+            for option in self.config[frontier.pop()].get("options", []):
+                next_state = option.get("next_state")
+                if next_state in self.config and next_state not in reachable:
+                    reachable.add(next_state)
+                    frontier.append(next_state)
+        problems += [f"state '{state}' is unreachable" for state in self.config if state not in reachable]
+
+        if problems:
+            raise ValueError("Invalid chat flow: " + "; ".join(problems))
+
+    def state(self, state: Optional[str]) -> str:
+        """Normalise a client-supplied state, falling back to the initial state."""
+        return state if state in self.config else self.initial_state
+
+    def transition(self, state: str, value: str) -> Optional[str]:
+        """Next state for choosing ``value`` in ``state``, or None if it is not an option there."""
+        return self.transitions.get((state, value))
+
+    def options(self, state: str) -> Optional[list[dict]]:
+        """Options offered in a state."""
+        return self.config[state].get("options")
+
+    def response_body(self, state: str, session_id: Optional[str] = None) -> bytes:
+        """Pre-serialized ChatResponse JSON for a state."""
+        return self._body_prefixes[state] + json.dumps(session_id).encode() + b"}"
+
+
+# Compiled at import so an invalid flow fails at startup
+chat_flow = CompiledFlow(FLOW_CONFIG, STATE_SELECTION_MAP)
@@ -0,0 +1,395 @@
+"""Server-side chat session store with compact encoding and bounded memory."""
+
+import json
+import secrets
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from ..config import get_settings
+from .db import open_connection
+from .profiling import span
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+# Encoded layout: version, flow state index, selection count, then one code per selection
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<BBB")
+UNSET = 0
+OTHER = 255  # Value outside the known options, kept in the compressed extras
+
+# Rough per-entry bookkeeping overhead counted against the memory cap
+ENTRY_OVERHEAD = 120
+
+
+class ChatSession:
+    """Conversation state for one chat session."""
+
+    def __init__(
+        self,
+        session_id: str,
+        flow_state: Optional[str] = None,
+        selections: Optional[dict] = None,
+        history: Optional[list[dict]] = None,
+    ):
+        self.id = session_id
+        self.flow_state = flow_state
+        self.selections = selections or {}
+        self.history = history or []
+        # Stands in for a requested session that was not found (expired, or held by another worker)
+        self.lost = False
+
+    def add_turn(self, role: str, content: str) -> None:
+        """Append a message to the AI conversation history."""
+        self.history.append({"role": role, "content": content})
+
+
+class SessionCodec:
+    """Packs sessions into a few bytes using the chat flow's known states and options.
+
+    Each selection is stored as one byte (the index of the chosen option),
+    so a typical flow session is a handful of bytes. Free-form values and
+    AI history go into a zlib-compressed JSON tail, bounded to
+    ``history_turns`` exchanges of at most ``history_chars`` characters each.
+    """
+
+    def __init__(
+        self,
+        states: list[str],
+        selection_options: dict[str, list[str]],
+        history_turns: int = 10,
+        history_chars: int = 1000,
+    ):
+        self.states = list(states)
+        self.state_index = {state: i for i, state in enumerate(self.states)}
+        self.selection_keys = list(selection_options)
+        self.option_index = {
+            key: {value: i + 1 for i, value in enumerate(values)}
+            for key, values in selection_options.items()
+        }
+        self.options = {key: list(values) for key, values in selection_options.items()}
+        self.history_turns = history_turns
+        self.history_chars = history_chars
+
+    @classmethod
+    def from_flow(cls, flow_config: dict, state_selection_map: dict, **kwargs) -> "SessionCodec":
+        """Build the code tables from a chat flow definition."""
+        selection_options = {
+            selection_key: [option["value"] for option in flow_config[state].get("options", [])]
+            for state, selection_key in state_selection_map.items()
+        }
+        return cls(list(flow_config), selection_options, **kwargs)
+
+    def encode(self, session: ChatSession) -> bytes:
+        """Serialize a session (its id is the storage key and is not included)."""
+        state = self.state_index.get(session.flow_state, OTHER)
+        codes = bytearray()
+        extras = {}
+        for key in self.selection_keys:
+            value = session.selections.get(key)
+            if value is None:
+                codes.append(UNSET)
+            elif value in self.option_index[key]:
+                codes.append(self.option_index[key][value])
+            else:
+                codes.append(OTHER)
+                extras[key] = value
+        for key, value in session.selections.items():
+            if key not in self.option_index:
+                extras[key] = value
+
+        tail = {}
+        if extras:
+            tail["x"] = extras
+        if state == OTHER and session.flow_state:
+            tail["s"] = session.flow_state
+        history = session.history[-self.history_turns * 2:]
+        if history:
+            tail["h"] = [[turn["role"], turn["content"][: self.history_chars]] for turn in history]
+
+        data = HEADER.pack(FORMAT_VERSION, state, len(codes)) + bytes(codes)
+        if tail:
+            data += zlib.compress(json.dumps(tail, ensure_ascii=False, separators=(",", ":")).encode())
+        return data
+
+    def decode(self, session_id: str, data: bytes) -> ChatSession:
+        """Deserialize a session; raises ValueError for data from another format version."""
+        version, state, count = HEADER.unpack_from(data)
+        if version != FORMAT_VERSION or count != len(self.selection_keys):
+            raise ValueError("Incompatible chat session encoding")
+        codes = data[HEADER.size:HEADER.size + count]
+        rest = data[HEADER.size + count:]
+        tail = json.loads(zlib.decompress(rest)) if rest else {}
+
+        selections = {}
+        for key, code in zip(self.selection_keys, codes):
+            if code not in (UNSET, OTHER):
+                selections[key] = self.options[key][code - 1]
+        selections.update(tail.get("x", {}))
+        flow_state = self.states[state] if state < len(self.states) else tail.get("s")
+        history = [{"role": role, "content": content} for role, content in tail.get("h", [])]
+        return ChatSession(session_id, flow_state, selections, history)
+
+
+class MemorySessionBackend:
+    """In-process sessions with sliding TTL, LRU eviction and a hard byte cap.
+
+    Every write moves the session to the end of an ordered dict, so the
+    front is both least recently used and soonest to expire. Only visible to
+    the worker that holds it; use the SQLite backend to share sessions.
+    """
+
+    name = "memory"
+
+    def __init__(self, ttl_seconds: float, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    @staticmethod
+    def _size(session_id: str, data: bytes) -> int:
+        """Bytes an entry counts against the cap."""
+        return len(session_id) + len(data) + ENTRY_OVERHEAD
+
+    def _remove(self, session_id: str) -> None:
+        """Drop an entry and its byte count (lock held)."""
+        _, data = self._entries.pop(session_id)
+        self._bytes -= self._size(session_id, data)
+
+    def _purge(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones over the cap (lock held)."""
+        while self._entries:
+            session_id, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._remove(session_id)
+            self.expired += 1
+        while self._bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.evicted += 1
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        """Get a live session's data."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                self._remove(session_id)
+                self.expired += 1
+                return None
+            return entry[1]
+
+    def set(self, session_id: str, data: bytes) -> None:
+        """Store a session, refreshing its TTL and recency."""
+        now = time.time()
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+            self._entries[session_id] = (now + self.ttl_seconds, data)
+            self._bytes += self._size(session_id, data)
+            self._purge(now)
+
+    def delete(self, session_id: str) -> None:
+        """Forget a session."""
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+
+    def stats(self) -> dict:
+        """Session count, memory use and evictions."""
+        with self._lock:
+            self._purge(time.time())
+            return {
+                "backend": self.name,
+                "sessions": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
+
+
+class SQLiteSessionBackend:
+    """Sessions in a SQLite database (WAL mode) shared by every worker.
+
+    The TTL slides on each write, so the expiry index is also the LRU order:
+    the cap is enforced by deleting the sessions closest to expiry. Expired
+    rows and the cap are checked every ``purge_interval`` writes, against a
+    session count and size kept up to date by triggers rather than a scan.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, ttl_seconds: float, max_bytes: int, db_path: Optional[Path] = None, purge_interval: int = 200):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.db_path = Path(db_path or get_settings().chat_session_db_path or DATA_DIR / "chat_sessions.db")
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._writes = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, creating the table on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = open_connection(self.db_path)
+            # One transaction, so the totals start from a count no other worker is changing
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                    "id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_expires ON chat_sessions (expires_at)")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS chat_session_totals ("
+                    "id INTEGER PRIMARY KEY CHECK (id = 0), sessions INTEGER NOT NULL, bytes INTEGER NOT NULL)"
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO chat_session_totals "
+                    "SELECT 0, COUNT(*), COALESCE(SUM(length(data) + length(id)), 0) FROM chat_sessions"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS chat_sessions_insert AFTER INSERT ON chat_sessions BEGIN "
+                    "UPDATE chat_session_totals SET sessions = sessions + 1, "
+                    "bytes = bytes + length(NEW.data) + length(NEW.id); END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS chat_sessions_update AFTER UPDATE ON chat_sessions BEGIN "
+                    "UPDATE chat_session_totals SET "
+                    "bytes = bytes + length(NEW.data) + length(NEW.id) - length(OLD.data) - length(OLD.id); END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS chat_sessions_delete AFTER DELETE ON chat_sessions BEGIN "
+                    "UPDATE chat_session_totals SET sessions = sessions - 1, "
+                    "bytes = bytes - length(OLD.data) - length(OLD.id); END"
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return conn
+
+    @staticmethod
+    def _totals(conn: sqlite3.Connection) -> tuple[int, int]:
+        """Stored sessions and their bytes, from the running totals."""
+        row = conn.execute("SELECT sessions, bytes FROM chat_session_totals").fetchone()
+        return row["sessions"], row["bytes"]
+
+    def _purge(self, conn: sqlite3.Connection) -> None:
+        """Delete expired sessions, then the oldest ones while over the cap."""
+        self.expired += conn.execute("DELETE FROM chat_sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+        while True:
+            count, size = self._totals(conn)
+            if size + count * ENTRY_OVERHEAD <= self.max_bytes or not count:
+                return
+            # Drop a tenth of the sessions at a time rather than one per query
+            self.evicted += conn.execute(
+                "DELETE FROM chat_sessions WHERE id IN "
+                "(SELECT id FROM chat_sessions ORDER BY expires_at LIMIT ?)",
+                (max(1, count // 10),),
+            ).rowcount
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        """Get a live session's data."""
+        row = self._connect().execute(
+            "SELECT data FROM chat_sessions WHERE id = ? AND expires_at > ?", (session_id, time.time())
+        ).fetchone()
+        return bytes(row["data"]) if row else None
+
+    def set(self, session_id: str, data: bytes) -> None:
+        """Store a session, refreshing its TTL."""
+        conn = self._connect()
+        # An upsert rather than INSERT OR REPLACE, whose implicit delete would skip the totals trigger
+        conn.execute(
+            "INSERT INTO chat_sessions (id, data, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+            (session_id, data, time.time() + self.ttl_seconds),
+        )
+        self._writes += 1
+        if self._writes % self.purge_interval == 0:
+            self._purge(conn)
+
+    def delete(self, session_id: str) -> None:
+        """Forget a session."""
+        self._connect().execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+
+    def stats(self) -> dict:
+        """Session count, storage use and evictions."""
+        conn = self._connect()
+        self._purge(conn)
+        count, size = self._totals(conn)
+        return {
+            "backend": self.name,
+            "sessions": count,
+            "bytes": size + count * ENTRY_OVERHEAD,
+            "max_bytes": self.max_bytes,
+            "evicted": self.evicted,
+            "expired": self.expired,
+        }
+
+
+SESSION_BACKENDS = {
+    MemorySessionBackend.name: MemorySessionBackend,
+    SQLiteSessionBackend.name: SQLiteSessionBackend,
+}
+
+
+class ChatSessionStore:
+    """Loads and saves chat sessions through a codec and a storage backend."""
+
+    def __init__(self, codec: SessionCodec, backend=None):
+        settings = get_settings()
+        self.enabled = settings.chat_sessions_enabled
+        self.codec = codec
+        if backend is None:
+            if settings.chat_session_backend not in SESSION_BACKENDS:
+                raise ValueError(f"Unknown chat session backend: {settings.chat_session_backend}")
+            backend = SESSION_BACKENDS[settings.chat_session_backend](
+                settings.chat_session_ttl_seconds, settings.chat_session_max_bytes
+            )
+        self.backend = backend
+
+    def load(self, session_id: Optional[str]) -> ChatSession:
+        """Get a session, or a new empty one if it is missing, expired or unreadable.
+
+        A new session standing in for a requested one is marked ``lost``.
+        """
+        if session_id:
+            with span("session"):
+                data = self.backend.get(session_id)
+            if data is not None:
+                try:
+                    return self.codec.decode(session_id, data)
+                except Exception as e:
+                    print(f"Discarding unreadable chat session {session_id}: {e}")
+        session = ChatSession(secrets.token_urlsafe(16))
+        session.lost = bool(session_id)
+        return session
+
+    def save(self, session: ChatSession) -> None:
+        """Store a session, trimming its history to the configured bound."""
+        session.history = session.history[-self.codec.history_turns * 2:]
+        with span("session"):
+            self.backend.set(session.id, self.codec.encode(session))
+
+    def delete(self, session_id: str) -> None:
+        """Forget a session."""
+        self.backend.delete(session_id)
+
+    def stats(self) -> dict:
+        """Backend statistics."""
+        return self.backend.stats()
@@ -0,0 +1,45 @@
+"""Limits on concurrent long-lived connections."""
+
+import threading
+from collections import Counter
+
+
+class ConnectionLimiter:
+    """Caps open connections in total and per client address."""
+
+    def __init__(self, max_connections: int, max_per_client: int):
+        self.max_connections = max_connections
+        self.max_per_client = max_per_client
+        self._per_client: Counter[str] = Counter()
+        self._total = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, client: str) -> bool:
+        """Reserve a slot for a new connection; False if a limit is reached."""
+        with self._lock:
+            if self._total >= self.max_connections or self._per_client[client] >= self.max_per_client:
+                self._rejected += 1
+                return False
+            self._total += 1
+            self._per_client[client] += 1
+            return True
+
+    def release(self, client: str) -> None:
+        """Free a connection's slot."""
+        with self._lock:
+            self._total -= 1
+            self._per_client[client] -= 1
+            if self._per_client[client] <= 0:
+                del self._per_client[client]
+
+    def stats(self) -> dict:
+        """Open and rejected connection counts."""
+        with self._lock:
+            return {
+                "open": self._total,
+                "clients": len(self._per_client),
+                "max_connections": self.max_connections,
+                "max_per_client": self.max_per_client,
+                "rejected": self._rejected,
+            }
@@ -0,0 +1,19 @@
+"""SQLite connection helpers shared by the persistent stores."""
+
+import sqlite3
+from pathlib import Path
+
+
+def open_connection(db_path: Path, synchronous: str = "NORMAL") -> sqlite3.Connection:
+    """Open a WAL-mode connection in autocommit mode (transactions are explicit).
+
+    With ``synchronous=NORMAL`` a commit is not fsynced and the last ones can
+    be lost on power failure (never corrupted); ``FULL`` fsyncs every commit.
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    # busy timeout: other workers may hold the write lock briefly
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    return conn
@@ -0,0 +1,137 @@
+"""Multi-process bulk embedding for large RAG rebuilds."""
+
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Per-process model, loaded once by the pool initializer
+_worker_model = None
+
+
+def _available_cpus() -> list[int]:
+    """CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _init_worker(model_name: str, threads_per_worker: int, worker_counter) -> None:
+    """Pin the worker to its own CPUs, cap its threads and load the model."""
+    global _worker_model
+
+    with worker_counter.get_lock():
+        worker_index = worker_counter.value
+        worker_counter.value += 1
+
+    cpus = _available_cpus()
+    start = (worker_index * threads_per_worker) % len(cpus)
+    pinned = {cpus[(start + i) % len(cpus)] for i in range(threads_per_worker)}
+    if hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, pinned)
+        except OSError as e:
+            print(f"Could not pin embedding worker {worker_index}: {e}")
+
+    # Stop each worker's BLAS/torch pool from spawning a thread per core
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads_per_worker)
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads_per_worker)
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_shard(shard_id: int, contents: list[str], batch_size: int):
+    """Embed one shard in a worker process."""
+    return shard_id, _worker_model.encode(contents, batch_size=batch_size)
+
+
+class EmbeddingPool:
+    """Shards documents across worker processes and streams back embeddings.
+
+    At most ``2 * workers`` shards are in flight, so memory stays bounded
+    however large the input is. Shards are yielded as they finish, not in
+    input order.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: int,
+        shard_size: int = 256,
+        batch_size: int = 64,
+    ):
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        self.shard_size = shard_size
+        self.batch_size = batch_size
+        self.threads_per_worker = max(1, len(_available_cpus()) // self.workers)
+        self.last_run: Optional[dict] = None
+
+    def _shards(self, documents: Iterable[dict]) -> Iterator[list[dict]]:
+        """Split the document stream into fixed-size shards."""
+        shard: list[dict] = []
+        for doc in documents:
+            shard.append(doc)
+            if len(shard) >= self.shard_size:
+                yield shard
+                shard = []
+        if shard:
+            yield shard
+
+    def embed(self, documents: Iterable[dict]) -> Iterator[tuple[list[dict], "np.ndarray"]]:
+        """Yield (documents, embeddings) per shard as workers finish them."""
+        # Spawn rather than fork: torch state is not fork-safe
+        ctx = mp.get_context("spawn")
+        counter = ctx.Value("i", 0)
+        start = time.perf_counter()
+        embedded = 0
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self.model_name, self.threads_per_worker, counter),
+        ) as executor:
+            in_flight = {}
+            shards = enumerate(self._shards(documents))
+            exhausted = False
+
+            while in_flight or not exhausted:
+                while not exhausted and len(in_flight) < self.workers * 2:
+                    try:
+                        shard_id, shard = next(shards)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    contents = [doc["content"] for doc in shard]
+                    future = executor.submit(_encode_shard, shard_id, contents, self.batch_size)
+                    in_flight[future] = shard
+
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    shard = in_flight.pop(future)
+                    _, embeddings = future.result()
+                    embedded += len(shard)
+                    yield shard, embeddings
+
+        seconds = time.perf_counter() - start
+        self.last_run = {
+            "documents": embedded,
+            "seconds": round(seconds, 3),
+            "docs_per_second": round(embedded / seconds, 1) if seconds else None,
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+        }
+        print(
+            f"Embedded {embedded} documents with {self.workers} workers "
+            f"in {seconds:.1f}s ({self.last_run['docs_per_second']} docs/s)"
+        )
@@ -1,11 +1,34 @@
 """Gemini AI integration service."""
 
-import google.generativeai as genai
+import asyncio
+import time
+from typing import AsyncIterator
 
 from ..config import get_settings
 from ..models.schemas import Package
-# RAG disabled for lighter deployment
-# from .rag_service import rag_service
+from ..models.seasons import describe_mask, mentioned_months
+from .metrics import metrics
+from .profiling import add_span, span
+
+PROMPT_SECONDS = metrics.histogram(
+    "gemini_prompt_build_duration_seconds", "Time to build the prompt, including knowledge base retrieval"
+)
+REQUEST_SECONDS = metrics.histogram(
+    "gemini_request_duration_seconds", "Gemini call duration until the full response", ("mode", "outcome")
+)
+FIRST_CHUNK_SECONDS = metrics.histogram(
+    "gemini_first_chunk_seconds", "Time from a streaming Gemini call to its first text"
+)
+FAILURES = metrics.counter("gemini_failures", "Failed Gemini calls", ("mode",))
+FALLBACKS = metrics.counter("gemini_fallbacks", "Canned responses served instead of Gemini", ("reason",))
+
+# Knowledge base document types to search for messages about a topic;
+# anything else searches every type
+KNOWLEDGE_TOPICS = [
+    (("book", "cancel", "refund", "deposit", "payment", "insurance", "policy"), ["policy", "faq"]),
+    (("weather", "season", "when", "best time", "month"), ["seasonal_tip", "faq"]),
+    (("activity", "activities", "things to do", "bungee", "cruise", "hike"), ["activity", "destination"]),
+]
 
 
 class GeminiService:
@@ -40,6 +63,9 @@ for topics not covered in the knowledge base."""
                     print("Warning: GEMINI_API_KEY not set")
                     return None
 
+                # Imported on first use: the SDK takes about half a second to import
+                import google.generativeai as genai
+
                 genai.configure(api_key=api_key)
                 self._model = genai.GenerativeModel("gemini-2.0-flash")
             except Exception as e:
@@ -47,45 +73,84 @@ for topics not covered in the knowledge base."""
                 return None
         return self._model
 
-    def _format_packages_context(self, packages: list[Package]) -> str:
-        """Format packages as context for the AI."""
+    def warm_up(self) -> bool:
+        """Configure the Gemini client ahead of the first chat request."""
+        return self._get_model() is not None
+
+    def _get_knowledge_context(self, user_message: str) -> str:
+        """Retrieve knowledge base context, limited to the types the message is about."""
+        if not self._settings.rag_enabled:
+            return ""
+
+        # Imported lazily so RAG dependencies are only needed when enabled
+        from .rag_service import rag_service
+
+        message_lower = user_message.lower()
+        doc_types = None
+        for keywords, types in KNOWLEDGE_TOPICS:
+            if any(word in message_lower for word in keywords):
+                doc_types = types
+                break
+
+        try:
+            return rag_service.get_context_for_query(user_message, doc_types=doc_types)
+        except Exception as e:
+            print(f"Error retrieving knowledge context: {e}")
+            return ""
+
+    def _format_history(self, conversation_history: list[dict] = None) -> str:
+        """Format earlier turns of the conversation for the prompt."""
+        if not conversation_history:
+            return ""
+
+        lines = ["", "=== CONVERSATION SO FAR ==="]
+        for turn in conversation_history:
+            speaker = "Customer" if turn["role"] == "user" else "Assistant"
+            lines.append(f"{speaker}: {turn['content']}")
+        return "\n".join(lines) + "\n"
+
+    def _format_packages_context(self, packages: list[Package], months: int = 0) -> str:
+        """Format packages as context for the AI, limited to those running in ``months`` if given."""
+        heading = "Current Available Tour Packages"
+        if months:
+            packages = [pkg for pkg in packages if pkg.month_mask & months]
+            heading = f"Tour Packages Running in {describe_mask(months)}"
+            if not packages:
+                return f"\n\n{heading}: none\n"
         if not packages:
             return ""
 
-        context = "\n\nCurrent Available Tour Packages:\n"
+        context = f"\n\n{heading}:\n"
         for pkg in packages[:5]:  # Limit to 5 packages
             context += f"""
 - {pkg.name} ({pkg.region}, {pkg.type})
-  Duration: {pkg.duration} days | Price: ${pkg.price} NZD
+  Duration: {pkg.duration} days | Price: ${pkg.price} NZD | Runs: {pkg.months}
   Highlights: {', '.join(pkg.highlights[:3])}
 """
         return context
 
-    async def generate_response(
+    async def _build_prompt(
         self,
         user_message: str,
         packages: list[Package],
         conversation_history: list[dict] = None
     ) -> str:
-        """Generate an AI response using Gemini."""
+        """Build the full prompt with knowledge base, package and conversation context."""
+        # Build packages and knowledge base context
+        packages_context = self._format_packages_context(packages, mentioned_months(user_message))
+        # Retrieval embeds the query (and may build the index), so it runs off the event loop
+        knowledge_context = await asyncio.to_thread(self._get_knowledge_context, user_message)
+        history_context = self._format_history(conversation_history)
 
-        # Get model
-        model = self._get_model()
+        return f"""{self._system_prompt}
 
-        if model is None:
-            return self._get_fallback_response(user_message)
-
-        try:
-            # Build packages context
-            packages_context = self._format_packages_context(packages)
-
-            # Build the prompt
-            prompt = f"""{self._system_prompt}
+=== KNOWLEDGE BASE CONTEXT ===
+{knowledge_context}
 
 === AVAILABLE PACKAGES ===
 {packages_context}
 === END CONTEXT ===
-
+{history_context}
 Customer message: {user_message}
 
 Instructions:
@@ -96,13 +161,81 @@ Instructions:
 
 Your response:"""
 
-            response = model.generate_content(prompt)
-            return response.text
+    async def generate_response(
+        self,
+        user_message: str,
+        packages: list[Package],
+        conversation_history: list[dict] = None
+    ) -> str:
+        """Generate an AI response using Gemini."""
+
+        # Get model
+        model = self._get_model()
+
+        if model is None:
+            FALLBACKS.labels("unconfigured").inc()
+            return self._get_fallback_response(user_message)
+
+        try:
+            with PROMPT_SECONDS.time(), span("prompt"):
+                prompt = await self._build_prompt(user_message, packages, conversation_history)
+            start = time.perf_counter()
+            try:
+                response = model.generate_content(prompt)
+                text = response.text
+            except Exception:
+                REQUEST_SECONDS.labels("generate", "error").observe(time.perf_counter() - start)
+                FAILURES.labels("generate").inc()
+                raise
+            finally:
+                add_span("gemini", time.perf_counter() - start)
+            REQUEST_SECONDS.labels("generate", "ok").observe(time.perf_counter() - start)
+            return text
 
         except Exception as e:
             print(f"Error generating Gemini response: {e}")
+            FALLBACKS.labels("error").inc()
             return self._get_fallback_response(user_message)
 
+    async def stream_response(
+        self,
+        user_message: str,
+        packages: list[Package],
+        conversation_history: list[dict] = None
+    ) -> AsyncIterator[str]:
+        """Generate an AI response using Gemini, yielding text as it is produced."""
+        model = self._get_model()
+
+        if model is None:
+            FALLBACKS.labels("unconfigured").inc()
+            yield self._get_fallback_response(user_message)
+            return
+
+        streamed = False
+        start = None
+        try:
+            with PROMPT_SECONDS.time(), span("prompt"):
+                prompt = await self._build_prompt(user_message, packages, conversation_history)
+            start = time.perf_counter()
+            response = await model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    if not streamed:
+                        FIRST_CHUNK_SECONDS.observe(time.perf_counter() - start)
+                    streamed = True
+                    yield chunk.text
+            REQUEST_SECONDS.labels("stream", "ok").observe(time.perf_counter() - start)
+
+        except Exception as e:
+            print(f"Error streaming Gemini response: {e}")
+            if start is not None:
+                REQUEST_SECONDS.labels("stream", "error").observe(time.perf_counter() - start)
+                FAILURES.labels("stream").inc()
+            # Only fall back if nothing has been sent; a partial answer stands
+            if not streamed:
+                FALLBACKS.labels("error").inc()
+                yield self._get_fallback_response(user_message)
+
     def _get_fallback_response(self, user_message: str) -> str:
         """Provide fallback response when Gemini is unavailable."""
         message_lower = user_message.lower()
@@ -0,0 +1,132 @@
+"""Pooled, retrying HTTP transport for the Google API client.
+
+``PooledHttp`` replaces the ``httplib2.Http`` that googleapiclient builds by
+default. That object holds one connection per host and can't be shared
+between threads. This one sends requests through a urllib3 connection pool,
+so any number of threads can use one client with keep-alive. It has
+explicit connect and read timeouts, and retries 429 and 5xx responses
+and connection failures with jittered exponential backoff.
+"""
+
+import random
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httplib2
+import urllib3
+
+from ..config import get_settings
+from .metrics import metrics
+
+ATTEMPTS = metrics.counter("google_api_attempts", "Google API HTTP attempts by outcome", ("host", "outcome"))
+ATTEMPT_SECONDS = metrics.histogram("google_api_attempt_duration_seconds", "Google API HTTP attempt duration", ("host",))
+RETRIES = metrics.counter("google_api_retries", "Google API requests retried, by reason", ("host", "reason"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Only these are retried after a failure: a POST may already have taken effect
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Encodings urllib3 decodes; like httplib2, the header is renamed once the body is decoded
+DECODED_ENCODINGS = frozenset({"gzip", "deflate"})
+
+
+def _outcome(status: int) -> str:
+    """Metric label for a response status: 429 on its own, otherwise its class."""
+    return "429" if status == 429 else f"{status // 100}xx"
+
+
+class PooledHttp:
+    """Thread-safe ``httplib2.Http`` stand-in backed by a urllib3 pool manager.
+
+    Implements the ``request`` method googleapiclient and google-auth-httplib2
+    call. Redirects are not followed (Google APIs don't redirect). Once the
+    retries are used up, the last response is returned, or the last error
+    raised as ``TimeoutError`` or ``ConnectionError``.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        pool_size: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self.connect_timeout = connect_timeout if connect_timeout is not None else settings.google_api_connect_timeout
+        self.timeout = read_timeout if read_timeout is not None else settings.google_api_read_timeout
+        self.max_retries = max_retries if max_retries is not None else settings.google_api_max_retries
+        self.backoff_base = backoff_base if backoff_base is not None else settings.google_api_backoff_base
+        self.backoff_max = backoff_max if backoff_max is not None else settings.google_api_backoff_max
+        self._pool = urllib3.PoolManager(
+            maxsize=pool_size or settings.google_api_pool_size,
+            retries=False,
+            timeout=urllib3.Timeout(connect=self.connect_timeout, read=self.timeout),
+        )
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before retry ``attempt`` (1-based): full jitter, or the server's Retry-After."""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        """Send a request; returns ``(httplib2.Response, content bytes)`` like ``httplib2.Http.request``."""
+        host = urlsplit(uri).hostname or ""
+        retryable = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self._pool.request(method, uri, body=body, headers=headers, redirect=False)
+            except urllib3.exceptions.HTTPError as e:
+                # Refused and unresolvable connections are ConnectTimeoutErrors too; none sent the request
+                not_sent = isinstance(e, urllib3.exceptions.ConnectTimeoutError)
+                timed_out = isinstance(e, urllib3.exceptions.TimeoutError) and not isinstance(
+                    e, urllib3.exceptions.NewConnectionError
+                )
+                reason = "timeout" if timed_out else "error"
+                ATTEMPT_SECONDS.labels(host).observe(time.perf_counter() - start)
+                ATTEMPTS.labels(host, reason).inc()
+                if attempt < self.max_retries and (retryable or not_sent):
+                    attempt += 1
+                    RETRIES.labels(host, reason).inc()
+                    time.sleep(self._backoff(attempt))
+                    continue
+                raise (TimeoutError if timed_out else ConnectionError)(f"{method} {uri}: {e}") from e
+
+            ATTEMPT_SECONDS.labels(host).observe(time.perf_counter() - start)
+            ATTEMPTS.labels(host, _outcome(response.status)).inc()
+            if response.status in RETRY_STATUSES and attempt < self.max_retries and (retryable or response.status == 429):
+                attempt += 1
+                RETRIES.labels(host, str(response.status)).inc()
+                time.sleep(self._backoff(attempt, response.headers.get("retry-after")))
+                continue
+            return self._to_httplib2(response)
+
+    def _to_httplib2(self, response) -> tuple[httplib2.Response, bytes]:
+        """Convert a urllib3 response into what httplib2 would have returned."""
+        info = {name.lower(): value for name, value in response.headers.items()}
+        content = response.data
+        if info.get("content-encoding") in DECODED_ENCODINGS:
+            info["-content-encoding"] = info.pop("content-encoding")
+            info["content-length"] = str(len(content))
+        info["status"] = str(response.status)
+        result = httplib2.Response(info)
+        result.reason = response.reason
+        return result, content
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self._pool.clear()
+
+
+def google_http(credentials=None):
+    """Shared transport for a Google API client, authorized with ``credentials`` if given."""
+    http = PooledHttp()
+    if credentials is None:
+        return http
+    from google_auth_httplib2 import AuthorizedHttp
+
+    return AuthorizedHttp(credentials, http=http)
@@ -0,0 +1,229 @@
+"""SQLite-backed knowledge base store."""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterator, Optional
+
+from ..config import get_settings
+from .db import open_connection
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+# Collections with one row per item; list-valued fields are stored as JSON
+COLLECTION_FIELDS = {
+    "faqs": ("question", "answer"),
+    "destinations": ("name", "region", "description", "highlights", "best_for"),
+    "activities": ("name", "location", "description", "price_range", "duration", "difficulty"),
+}
+LIST_FIELDS = {"highlights", "best_for"}
+
+# Single-document sections, stored whole as JSON
+SECTIONS = ("company_info", "policies", "seasonal_tips")
+
+
+class KnowledgeStore:
+    """Transactional knowledge base store using SQLite in WAL mode.
+
+    Each collection has its own table and every write is a single
+    transaction. Item counts are kept in a ``counters`` table by triggers,
+    so stats never scan the data. On first use the store is seeded from
+    ``knowledge_base.json``.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None, seed_path: Optional[Path] = None):
+        settings = get_settings()
+        self.db_path = Path(db_path or settings.knowledge_db_path or DATA_DIR / "knowledge.db")
+        self.seed_path = seed_path or DATA_DIR / "knowledge_base.json"
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, creating the schema on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = open_connection(self.db_path)
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    self._create_schema(conn)
+                    self._ready = True
+        return conn
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create tables, counter triggers and seed data if missing."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sections ("
+                "name TEXT PRIMARY KEY, data TEXT NOT NULL, item_count INTEGER NOT NULL)"
+            )
+            for collection, fields in COLLECTION_FIELDS.items():
+                columns = ", ".join(f"{field} TEXT" for field in fields)
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {collection} (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})"
+                )
+                conn.execute("INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)", (collection,))
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {collection}_count_insert AFTER INSERT ON {collection} "
+                    f"BEGIN UPDATE counters SET value = value + 1 WHERE name = '{collection}'; END"
+                )
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {collection}_count_delete AFTER DELETE ON {collection} "
+                    f"BEGIN UPDATE counters SET value = value - 1 WHERE name = '{collection}'; END"
+                )
+            seeded = conn.execute("SELECT value FROM counters WHERE name = 'seeded'").fetchone()
+            if seeded is None:
+                self._seed(conn)
+                conn.execute("INSERT INTO counters (name, value) VALUES ('seeded', 1)")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _seed(self, conn: sqlite3.Connection) -> None:
+        """Import the bundled knowledge_base.json inside the schema transaction."""
+        if not self.seed_path.exists():
+            return
+        with open(self.seed_path, "r", encoding="utf-8") as f:
+            kb = json.load(f)
+        for collection in COLLECTION_FIELDS:
+            self._insert(conn, collection, kb.get(collection, []))
+        for name in SECTIONS:
+            if name in kb:
+                self._write_section(conn, name, kb[name])
+        print(f"Knowledge store seeded from {self.seed_path.name}")
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, collection: str, items: list[dict]) -> list[int]:
+        """Insert items into a collection table on an open transaction, returning row ids."""
+        fields = COLLECTION_FIELDS[collection]
+        sql = (
+            f"INSERT INTO {collection} ({', '.join(fields)}) "
+            f"VALUES ({', '.join('?' for _ in fields)})"
+        )
+        row_ids = []
+        for item in items:
+            values = tuple(
+                json.dumps(item.get(field, []), ensure_ascii=False) if field in LIST_FIELDS else item.get(field)
+                for field in fields
+            )
+            row_ids.append(conn.execute(sql, values).lastrowid)
+        return row_ids
+
+    @staticmethod
+    def _write_section(conn: sqlite3.Connection, name: str, data) -> None:
+        """Replace a single-document section."""
+        item_count = len(data) if isinstance(data, (dict, list)) else 1
+        conn.execute(
+            "INSERT OR REPLACE INTO sections (name, data, item_count) VALUES (?, ?, ?)",
+            (name, json.dumps(data, ensure_ascii=False), item_count),
+        )
+
+    @staticmethod
+    def _row_to_item(collection: str, row: sqlite3.Row) -> dict:
+        """Convert a table row back into a knowledge base item."""
+        return {
+            field: json.loads(row[field]) if field in LIST_FIELDS else row[field]
+            for field in COLLECTION_FIELDS[collection]
+        }
+
+    def _check_collection(self, collection: str) -> None:
+        """Reject unknown collection names (they are interpolated into SQL)."""
+        if collection not in COLLECTION_FIELDS:
+            raise ValueError(f"Unknown knowledge collection: {collection}")
+
+    def add(self, collection: str, item: dict) -> int:
+        """Atomically add one item to a collection, returning its row id."""
+        return self.add_many({collection: [item]})[collection][0]
+
+    def add_many(self, items: dict[str, list[dict]]) -> dict[str, list[int]]:
+        """Atomically add items to several collections in one transaction, returning row ids."""
+        for collection in items:
+            self._check_collection(collection)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            added = {
+                collection: self._insert(conn, collection, collection_items)
+                for collection, collection_items in items.items()
+            }
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def set_section(self, name: str, data) -> None:
+        """Atomically replace a single-document section."""
+        if name not in SECTIONS:
+            raise ValueError(f"Unknown knowledge section: {name}")
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._write_section(conn, name, data)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_section(self, name: str):
+        """Get a single-document section, or None if not set."""
+        row = self._connect().execute("SELECT data FROM sections WHERE name = ?", (name,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def iter_rows(self, collection: str, batch_size: int = 500) -> Iterator[tuple[int, dict]]:
+        """Stream (row id, item) pairs in insertion order, one page at a time.
+
+        Each page is a separate keyset query, so the generator holds no open
+        cursor between pages and can be resumed from any thread.
+        """
+        self._check_collection(collection)
+        last_id = 0
+        while True:
+            rows = self._connect().execute(
+                f"SELECT * FROM {collection} WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row["id"], self._row_to_item(collection, row)
+            last_id = rows[-1]["id"]
+
+    def iter_items(self, collection: str) -> Iterator[dict]:
+        """Stream a collection's items in insertion order without loading them all."""
+        for _, item in self.iter_rows(collection):
+            yield item
+
+    def stats(self) -> dict:
+        """Knowledge base statistics from the maintained counters."""
+        conn = self._connect()
+        counters = {row["name"]: row["value"] for row in conn.execute("SELECT name, value FROM counters")}
+        sections = {row["name"]: row["item_count"] for row in conn.execute("SELECT name, item_count FROM sections")}
+        return {
+            "faqs": counters.get("faqs", 0),
+            "destinations": counters.get("destinations", 0),
+            "activities": counters.get("activities", 0),
+            "has_company_info": "company_info" in sections,
+            "has_policies": "policies" in sections,
+            "seasons_documented": sections.get("seasonal_tips", 0),
+        }
+
+    def export(self) -> dict:
+        """Whole knowledge base in the knowledge_base.json layout."""
+        kb = {}
+        for name in SECTIONS:
+            data = self.get_section(name)
+            if data is not None:
+                kb[name] = data
+        for collection in COLLECTION_FIELDS:
+            kb[collection] = list(self.iter_items(collection))
+        return kb
+
+
+# Singleton instance
+knowledge_store = KnowledgeStore()
@@ -0,0 +1,124 @@
+"""Delivery transports for outbox notifications."""
+
+import abc
+import json
+import smtplib
+import threading
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Optional
+
+from ..config import get_settings
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+
+class NotificationTransport(abc.ABC):
+    """Delivers a batch of notifications.
+
+    ``send_batch`` returns one entry per message: None if it was delivered,
+    otherwise the error. Raising fails the whole batch.
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    def send_batch(self, messages: list[dict]) -> list[Optional[str]]:
+        """Deliver messages, returning per-message errors."""
+
+
+class LogTransport(NotificationTransport):
+    """Prints notifications instead of sending them (development default)."""
+
+    name = "log"
+
+    def send_batch(self, messages: list[dict]) -> list[Optional[str]]:
+        """Print each message."""
+        for message in messages:
+            print(f"Notification to {message['recipient']}: {message['subject']}")
+        return [None] * len(messages)
+
+
+class FileTransport(NotificationTransport):
+    """Appends notifications to a JSON lines file, a local stand-in for SMTP."""
+
+    name = "file"
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or get_settings().notifications_file_path or DATA_DIR / "notifications.jsonl")
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages: list[dict]) -> list[Optional[str]]:
+        """Write the whole batch with a single append."""
+        lines = "".join(json.dumps(message, ensure_ascii=False) + "\n" for message in messages)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        return [None] * len(messages)
+
+
+class SMTPTransport(NotificationTransport):
+    """Sends notifications as email, reusing one SMTP connection per batch."""
+
+    name = "smtp"
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: Optional[bool] = None,
+        sender: Optional[str] = None,
+        timeout: float = 30,
+    ):
+        settings = get_settings()
+        self.host = host or settings.smtp_host
+        self.port = port or settings.smtp_port
+        self.username = username if username is not None else settings.smtp_username
+        self.password = password if password is not None else settings.smtp_password
+        self.use_tls = settings.smtp_use_tls if use_tls is None else use_tls
+        self.sender = sender or settings.notifications_from_email
+        self.timeout = timeout
+
+    def _email(self, message: dict) -> EmailMessage:
+        """Build the MIME message."""
+        email = EmailMessage()
+        email["From"] = self.sender
+        email["To"] = message["recipient"]
+        email["Subject"] = message["subject"]
+        email.set_content(message["body"])
+        return email
+
+    def send_batch(self, messages: list[dict]) -> list[Optional[str]]:
+        """Send each message on one connection; connection errors fail the batch."""
+        errors: list[Optional[str]] = []
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for message in messages:
+                try:
+                    smtp.send_message(self._email(message))
+                    errors.append(None)
+                except smtplib.SMTPRecipientsRefused as e:
+                    errors.append(f"Recipient refused: {e.recipients}")
+                except smtplib.SMTPException as e:
+                    errors.append(str(e))
+        return errors
+
+
+TRANSPORTS = {
+    LogTransport.name: LogTransport,
+    FileTransport.name: FileTransport,
+    SMTPTransport.name: SMTPTransport,
+}
+
+
+def create_transport(name: Optional[str] = None) -> NotificationTransport:
+    """Create the configured transport."""
+    name = name or get_settings().notifications_transport
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown notification transport: {name}")
+    return TRANSPORTS[name]()
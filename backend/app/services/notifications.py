@@ -0,0 +1,332 @@
+"""Durable outbox and background delivery of custom trip notifications."""
+
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from ..config import get_settings
+from .db import open_connection
+from .metrics import metrics
+from .notification_transports import NotificationTransport, create_transport
+from .trip_store import TripStore, TripStoreHook, trip_store
+
+# Recent delivery latencies kept for percentiles
+LATENCY_WINDOW = 1000
+
+# Time from queueing to delivery: immediate sends up to hours of retries
+DELIVERY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0, 14400.0)
+
+DELIVERY_SECONDS = metrics.histogram(
+    "notification_delivery_seconds", "Time from queueing a notification to its delivery", buckets=DELIVERY_BUCKETS
+)
+DELIVERIES = metrics.counter(
+    "notification_deliveries", "Notification delivery attempts by outcome (sent, retried, failed)", ("outcome",)
+)
+
+
+def _percentile(values: list[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of unsorted values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def build_messages(trip: dict, admin_email: str = "") -> list[dict]:
+    """Admin alert and customer confirmation for a new custom trip request."""
+    selections = "\n".join(f"  {key}: {value}" for key, value in (trip.get("selections") or {}).items())
+    messages = []
+    if admin_email:
+        messages.append({
+            "kind": "admin",
+            "recipient": admin_email,
+            "subject": f"New custom trip request {trip['id']} from {trip.get('name')}",
+            "body": (
+                f"Request: {trip['id']}\n"
+                f"Name: {trip.get('name')}\n"
+                f"Email: {trip.get('email')}\n"
+                f"Phone: {trip.get('phone')}\n"
+                f"Selections:\n{selections or '  (none)'}\n"
+                f"Notes: {trip.get('notes') or '-'}\n"
+            ),
+        })
+    if trip.get("email"):
+        messages.append({
+            "kind": "customer",
+            "recipient": trip["email"],
+            "subject": f"We've received your custom trip request ({trip['id']})",
+            "body": (
+                f"Kia ora {trip.get('name')},\n\n"
+                "Thanks for your custom trip request. Our travel experts will contact you "
+                "within 24-48 hours.\n\n"
+                f"Your request reference is {trip['id']}.\n\n"
+                "NZ Tours\n"
+            ),
+        })
+    return messages
+
+
+class NotificationOutbox(TripStoreHook):
+    """Transactional outbox for trip notifications, drained by a worker thread.
+
+    Messages are written in the same transaction as their trip, so a
+    committed request always has its notifications queued and a rolled back
+    one never does. The worker claims due messages in batches by pushing
+    their next attempt past a lease, so several app processes can share the
+    outbox, and a message claimed by a process that dies is retried once the
+    lease expires. Failed deliveries back off exponentially with jitter until
+    ``max_attempts``, then are left with status ``failed``.
+    """
+
+    def __init__(
+        self,
+        store: TripStore,
+        transport: Optional[NotificationTransport] = None,
+        batch_size: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_base_seconds: Optional[float] = None,
+        retry_max_seconds: Optional[float] = None,
+        poll_seconds: Optional[float] = None,
+        lease_seconds: float = 300,
+    ):
+        settings = get_settings()
+        self.store = store
+        self.admin_email = settings.notifications_admin_email
+        self._transport = transport
+        self.batch_size = batch_size or settings.notifications_batch_size
+        self.max_attempts = max_attempts or settings.notifications_max_attempts
+        self.retry_base_seconds = retry_base_seconds or settings.notifications_retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds or settings.notifications_retry_max_seconds
+        self.poll_seconds = poll_seconds or settings.notifications_poll_seconds
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        # Delivery metrics for this process
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._sent = 0
+        self._retried = 0
+        self._dead = 0
+        self._last_error: Optional[str] = None
+
+    @property
+    def transport(self) -> NotificationTransport:
+        """Configured transport, created on first use."""
+        if self._transport is None:
+            self._transport = create_transport()
+        return self._transport
+
+    # Trip store hook
+
+    def create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create the outbox table in the trips database."""
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS notification_outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, trip_id TEXT NOT NULL, kind TEXT NOT NULL, "
+            "recipient TEXT NOT NULL, subject TEXT NOT NULL, body TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, next_attempt_at REAL NOT NULL, sent_at REAL, last_error TEXT)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_notification_outbox_due "
+            "ON notification_outbox (status, next_attempt_at)"
+        )
+
+    def on_insert(self, conn: sqlite3.Connection, trip: dict) -> None:
+        """Queue the trip's notifications on its transaction."""
+        now = time.time()
+        for message in build_messages(trip, self.admin_email):
+            conn.execute(
+                "INSERT INTO notification_outbox "
+                "(trip_id, kind, recipient, subject, body, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (trip["id"], message["kind"], message["recipient"], message["subject"], message["body"], now, now),
+            )
+
+    def on_commit(self, trips: list[dict]) -> None:
+        """Wake the worker so new messages go out without waiting for a poll."""
+        self._wake.set()
+
+    # Delivery
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection to the trips database."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = open_connection(self.store.db_path)
+            self.create_schema(conn)
+        return conn
+
+    def _claim(self, conn: sqlite3.Connection) -> list[sqlite3.Row]:
+        """Lease a batch of due messages to this process."""
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT * FROM notification_outbox WHERE status = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (now, self.batch_size),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE notification_outbox SET attempts = attempts + 1, next_attempt_at = ? WHERE id = ?",
+                [(now + self.lease_seconds, row["id"]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _backoff(self, attempts: int) -> float:
+        """Delay before the next attempt: exponential, capped, with jitter."""
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _record(self, conn: sqlite3.Connection, rows: list[sqlite3.Row], errors: list[Optional[str]]) -> None:
+        """Mark each claimed message as sent, retrying or failed."""
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for row, error in zip(rows, errors):
+                attempts = row["attempts"] + 1
+                if error is None:
+                    conn.execute(
+                        "UPDATE notification_outbox SET status = 'sent', attempts = ?, sent_at = ?, "
+                        "last_error = NULL WHERE id = ?",
+                        (attempts, now, row["id"]),
+                    )
+                    self._sent += 1
+                    self._latencies.append(now - row["created_at"])
+                    DELIVERIES.labels("sent").inc()
+                    DELIVERY_SECONDS.observe(now - row["created_at"])
+                elif attempts >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE notification_outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                        (attempts, error, row["id"]),
+                    )
+                    self._dead += 1
+                    DELIVERIES.labels("failed").inc()
+                    print(f"Giving up on notification {row['id']} to {row['recipient']}: {error}")
+                else:
+                    conn.execute(
+                        "UPDATE notification_outbox SET attempts = ?, next_attempt_at = ?, last_error = ? "
+                        "WHERE id = ?",
+                        (attempts, now + self._backoff(attempts), error, row["id"]),
+                    )
+                    self._retried += 1
+                    DELIVERIES.labels("retried").inc()
+                if error is not None:
+                    self._last_error = error
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def process_batch(self) -> int:
+        """Deliver one batch of due messages, returning how many were attempted."""
+        conn = self._connect()
+        rows = self._claim(conn)
+        if not rows:
+            return 0
+        messages = [
+            {key: row[key] for key in ("id", "trip_id", "kind", "recipient", "subject", "body")}
+            for row in rows
+        ]
+        try:
+            errors = self.transport.send_batch(messages)
+        except Exception as e:
+            errors = [str(e)] * len(rows)
+        self._record(conn, rows, errors)
+        return len(rows)
+
+    def _next_wait(self) -> float:
+        """Seconds until the next retry is due, capped at the poll interval."""
+        row = self._connect().execute(
+            "SELECT MIN(next_attempt_at) FROM notification_outbox WHERE status = 'pending'"
+        ).fetchone()
+        if row[0] is None:
+            return self.poll_seconds
+        return max(0.0, min(self.poll_seconds, row[0] - time.time()))
+
+    def _run(self) -> None:
+        """Worker loop: drain due messages, then sleep until woken or a retry is due."""
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                if self.process_batch() >= self.batch_size:
+                    continue
+                wait = self._next_wait()
+            except Exception as e:
+                print(f"Error delivering notifications: {e}")
+                wait = self.poll_seconds
+            self._wake.wait(wait)
+
+    def start(self) -> None:
+        """Start the delivery worker."""
+        if self._worker is None or not self._worker.is_alive():
+            self._stopping.clear()
+            self._worker = threading.Thread(target=self._run, name="notification-worker", daemon=True)
+            self._worker.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        """Stop the delivery worker after its current batch."""
+        self._stopping.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def status_counts(self) -> dict[str, int]:
+        """Messages in the outbox by status, including empty ones."""
+        counts = dict.fromkeys(("pending", "sent", "failed"), 0)
+        for row in self._connect().execute("SELECT status, COUNT(*) AS n FROM notification_outbox GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        return counts
+
+    def oldest_pending_seconds(self) -> Optional[float]:
+        """Age of the oldest undelivered message, or None if the queue is empty."""
+        oldest = self._connect().execute(
+            "SELECT MIN(created_at) FROM notification_outbox WHERE status = 'pending'"
+        ).fetchone()[0]
+        return time.time() - oldest if oldest else None
+
+    def stats(self) -> dict:
+        """Queue depth from the outbox and delivery metrics from this process."""
+        counts = self.status_counts()
+        oldest = self.oldest_pending_seconds()
+        latencies = list(self._latencies)
+        return {
+            "transport": self.transport.name,
+            "queue_depth": counts.get("pending", 0),
+            "failed": counts.get("failed", 0),
+            "sent_total": counts.get("sent", 0),
+            "oldest_pending_seconds": round(oldest, 1) if oldest is not None else None,
+            "process": {
+                "sent": self._sent,
+                "retried": self._retried,
+                "gave_up": self._dead,
+                "delivery_latency_ms": {
+                    "p50": round(_percentile(latencies, 50) * 1000, 1) if latencies else None,
+                    "p95": round(_percentile(latencies, 95) * 1000, 1) if latencies else None,
+                    "max": round(max(latencies) * 1000, 1) if latencies else None,
+                },
+                "last_error": self._last_error,
+            },
+        }
+
+
+# Singleton instance
+notification_outbox = NotificationOutbox(trip_store)
+
+# Read from the shared outbox at scrape time, so every worker reports the same queue
+metrics.gauge(
+    "notification_outbox_messages", "Notifications in the outbox by status", ("status",),
+    callback=lambda: {(status,): n for status, n in notification_outbox.status_counts().items()},
+)
+metrics.gauge(
+    "notification_outbox_oldest_pending_seconds", "Age of the oldest undelivered notification",
+    callback=notification_outbox.oldest_pending_seconds,
+)
@@ -0,0 +1,193 @@
+"""Batch parsing of catalog sheet rows into validated packages.
+
+Headers are normalised once per sheet into a column index map; each block of
+rows is then converted a column at a time and validated in one
+``TypeAdapter(list[Package])`` call. Rows that fail are left out and
+reported with their sheet row number instead of being printed one by one.
+"""
+
+import gc
+from typing import Callable, Optional
+
+from pydantic import TypeAdapter, ValidationError
+
+from ..models.schemas import Package
+from .metrics import metrics
+from .profiling import span
+
+PARSE_SECONDS = metrics.histogram("sheets_parse_duration_seconds", "Time to parse the fetched rows into packages")
+
+PACKAGES = TypeAdapter(list[Package])
+
+# Sheet columns by normalised header, with the value used when a column is missing
+COLUMN_DEFAULTS = {
+    "id": "", "name": "", "region": "Both", "type": "Mixed", "duration": "1", "price": "0",
+    "group_size": "1-10", "description": "", "highlights": "", "itinerary": "", "inclusions": "",
+    "exclusions": "", "image_url": "", "gallery": "", "season": "All", "status": "Active",
+}
+LIST_COLUMNS = ("highlights", "itinerary", "inclusions", "exclusions", "gallery", "season")
+TEXT_COLUMNS = ("id", "name", "region", "type", "description", "image_url", "status")
+# Errors listed in a report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+def normalize_header(header: str) -> str:
+    """Sheet header as a field name: "Image URL" -> "image_url"."""
+    return header.lower().replace(" ", "_")
+
+
+def parse_list(value: str) -> list[str]:
+    """Parse a comma-separated or newline-separated string into a list."""
+    if not value:
+        return []
+    # Handle both comma and newline separators
+    return [item for item in map(str.strip, value.replace("\n", ",").split(",")) if item]
+
+
+def parse_group_size(value: str) -> tuple[int, int]:
+    """Group size range from "2-8" or "2" (an empty cell means 1)."""
+    if "-" in value:
+        low, high = value.split("-")[:2]
+        return int(low), int(high)
+    size = int(value) if value else 1
+    return size, size
+
+
+class RowError:
+    """Why one sheet row was left out of the catalog."""
+
+    def __init__(self, row: int, field: str, message: str, package_id: str = ""):
+        self.row = row
+        self.field = field
+        self.message = message
+        self.package_id = package_id
+
+    def to_dict(self) -> dict:
+        return {"row": self.row, "field": self.field, "message": self.message, "package_id": self.package_id}
+
+
+class ParseReport:
+    """Outcome of parsing a sheet: row counts and the rejected rows."""
+
+    def __init__(self):
+        self.rows = 0
+        self.inactive = 0
+        self.packages = 0
+        self.invalid = 0
+        self.errors: list[RowError] = []
+
+    def add_error(self, error: RowError) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(error)
+
+    def summary(self) -> str:
+        """One line for the log, with the first rejected row."""
+        line = f"{self.packages} active packages from {self.rows} rows, {self.inactive} inactive, {self.invalid} invalid"
+        if self.errors:
+            first = self.errors[0]
+            line += f" (row {first.row}, {first.field}: {first.message})"
+        return line
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "inactive": self.inactive,
+            "packages": self.packages,
+            "invalid": self.invalid,
+            "errors": [error.to_dict() for error in self.errors],
+        }
+
+
+class PackageParser:
+    """Parses blocks of rows that share one header row."""
+
+    def __init__(self, headers: list[str]):
+        # Later duplicates of a header win, as they always have
+        index = {normalize_header(header): i for i, header in enumerate(headers)}
+        self._columns = {name: index.get(name) for name in COLUMN_DEFAULTS}
+
+    def _column(self, name: str, rows: list[list]) -> list:
+        """One column's cells, "" where a row is short, or the default if the sheet lacks it."""
+        i = self._columns[name]
+        if i is None:
+            return [COLUMN_DEFAULTS[name]] * len(rows)
+        return [row[i] if i < len(row) else "" for row in rows]
+
+    @staticmethod
+    def _convert(values: list, convert: Callable, name: str, failed: dict[int, tuple[str, str]]) -> list:
+        """Convert a column, each distinct value once, noting the first failing field of each row in ``failed``."""
+        converted, errors = {}, {}
+        for value in set(values):
+            try:
+                converted[value] = convert(value)
+            except (ValueError, TypeError) as e:
+                errors[value] = str(e)
+        if errors:
+            for k, value in enumerate(values):
+                if value in errors:
+                    failed.setdefault(k, (name, errors[value]))
+        return [converted.get(value) for value in values]
+
+    def parse(self, rows: list[list], first_row: int, report: Optional[ParseReport] = None) -> list[Package]:
+        """Active packages among ``rows``, the first being sheet row ``first_row``.
+
+        The block's packages live until the next refresh, so they are moved
+        out of the collector's generations (``gc.freeze``) once built: full
+        collections then no longer walk the catalog, neither while the rest
+        of the sheet is parsed nor on every request afterwards. Frozen objects
+        are still freed by reference counting when the catalog is replaced.
+        """
+        report = report if report is not None else ParseReport()
+        report.rows += len(rows)
+        with PARSE_SECONDS.time(), span("parse"):
+            packages = self._parse(rows, first_row, report)
+            gc.freeze()
+        report.packages += len(packages)
+        return packages
+
+    def _parse(self, rows: list[list], first_row: int, report: ParseReport) -> list[Package]:
+        status = self._column("status", rows)
+        active = [k for k, value in enumerate(status) if str(value).lower() == "active"]
+        report.inactive += len(rows) - len(active)
+        if len(active) < len(rows):
+            row_numbers = [first_row + k for k in active]
+            rows = [rows[k] for k in active]
+        else:
+            row_numbers = list(range(first_row, first_row + len(rows)))
+
+        failed: dict[int, tuple[str, str]] = {}
+        columns = {name: list(map(str, self._column(name, rows))) for name in TEXT_COLUMNS}
+        columns["duration"] = self._convert(self._column("duration", rows), int, "duration", failed)
+        columns["price"] = self._convert(self._column("price", rows), float, "price", failed)
+        groups = self._convert(list(map(str, self._column("group_size", rows))), parse_group_size, "group_size", failed)
+        for name in LIST_COLUMNS:
+            # Validation copies each list, so rows with the same cell can share one parse
+            columns[name] = self._convert(list(map(str, self._column(name, rows))), parse_list, name, failed)
+
+        names = list(columns)
+        records, record_rows = [], []
+        for k, values in enumerate(zip(*columns.values())):
+            if k in failed:
+                name, message = failed[k]
+                report.add_error(RowError(row_numbers[k], name, message, columns["id"][k]))
+                continue
+            record = dict(zip(names, values))
+            record["group_size_min"], record["group_size_max"] = groups[k]
+            records.append(record)
+            record_rows.append(row_numbers[k])
+
+        return self._validate(records, record_rows, report)
+
+    def _validate(self, records: list[dict], record_rows: list[int], report: ParseReport) -> list[Package]:
+        """Validate the records as one batch, dropping and reporting any that fail."""
+        try:
+            return PACKAGES.validate_python(records)
+        except ValidationError as e:
+            bad: dict[int, dict] = {}
+            for error in e.errors():
+                bad.setdefault(error["loc"][0], error)
+        for k, error in bad.items():
+            field = ".".join(str(part) for part in error["loc"][1:])
+            report.add_error(RowError(record_rows[k], field, error["msg"], str(records[k].get("id", ""))))
+        return PACKAGES.validate_python([record for k, record in enumerate(records) if k not in bad])
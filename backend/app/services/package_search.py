@@ -0,0 +1,291 @@
+"""In-memory full-text search and autocomplete over the package catalog."""
+
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from ..models.schemas import Package
+
+# Searchable fields and their weight in a package's term frequency
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "region": 2.0,
+    "highlights": 2.0,
+    "description": 1.0,
+    "itinerary": 1.0,
+}
+
+# Too common to help ranking; "day" starts nearly every itinerary line
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or our the to with your you day days".split()
+)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+MAX_COMPLETIONS = 10
+
+# Multi-term queries whose rarest term is in at most this many packages are scored exhaustively
+DIRECT_SCORE_LIMIT = 512
+
+# Merged prefix expansions kept per index
+MERGED_CACHE_SIZE = 256
+
+# Postings read per term before a query of only common terms returns its best so far
+MAX_SCAN_ROUNDS = 500
+
+
+def words(text: str) -> list[str]:
+    """Lowercase ASCII words, with accents (e.g. Maori macrons) folded."""
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return TOKEN_RE.findall(folded)
+
+
+def is_indexed(word: str) -> bool:
+    """Whether a word is kept in the index."""
+    return len(word) > 1 and word not in STOPWORDS
+
+
+def tokenize(text: str) -> list[str]:
+    """Indexed terms of a text."""
+    return [word for word in words(text) if is_indexed(word)]
+
+
+class _TrieNode:
+    """Prefix trie node holding its most frequent completions."""
+
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: dict[str, "_TrieNode"] = {}
+        self.top: list[str] = []
+
+
+class PackageSearchIndex:
+    """Inverted index with BM25-style scores and a completion trie.
+
+    Scores are computed once at build time: each term maps to
+    ``{package index: score}`` plus the same postings sorted by score, so a
+    single-term query is a slice and multi-term queries only visit the
+    rarest term's postings. Every trie node stores its top completions by
+    document frequency, so autocomplete is one walk down the prefix.
+    """
+
+    def __init__(self, packages: list[Package]):
+        self.packages = packages
+        self.postings: dict[str, dict[int, float]] = {}
+        self.ranked: dict[str, list[tuple[float, int]]] = {}
+        self.trie = _TrieNode()
+        self._merged: OrderedDict[tuple[str, ...], tuple[dict[int, float], list[tuple[float, int]]]] = OrderedDict()
+        self._merged_lock = threading.Lock()
+        self._build()
+
+    def _build(self) -> None:
+        """Tokenize every package and compute term scores."""
+        term_freqs: list[dict[str, float]] = []
+        lengths = []
+        for package in self.packages:
+            freqs: dict[str, float] = {}
+            length = 0.0
+            for field, weight in FIELD_WEIGHTS.items():
+                value = getattr(package, field)
+                text = " ".join(value) if isinstance(value, list) else value
+                for token in tokenize(text):
+                    freqs[token] = freqs.get(token, 0.0) + weight
+                    length += weight
+            term_freqs.append(freqs)
+            lengths.append(length)
+
+        n = len(self.packages)
+        avg_length = (sum(lengths) / n) if n else 1.0
+        doc_freq: dict[str, int] = {}
+        for freqs in term_freqs:
+            for token in freqs:
+                doc_freq[token] = doc_freq.get(token, 0) + 1
+
+        for doc, (freqs, length) in enumerate(zip(term_freqs, lengths)):
+            norm = K1 * (1 - B + B * length / avg_length)
+            for token, tf in freqs.items():
+                idf = math.log(1 + (n - doc_freq[token] + 0.5) / (doc_freq[token] + 0.5))
+                self.postings.setdefault(token, {})[doc] = idf * tf / (tf + norm)
+
+        for token, docs in self.postings.items():
+            self.ranked[token] = sorted(((-score, doc) for doc, score in docs.items()))
+        self._build_trie(doc_freq)
+
+    def _build_trie(self, doc_freq: dict[str, int]) -> None:
+        """Insert the vocabulary and store each node's most frequent completions."""
+        for token in doc_freq:
+            node = self.trie
+            for char in token:
+                node = node.children.setdefault(char, _TrieNode())
+            node.top = [token]
+
+        def fill(node: _TrieNode) -> list[str]:
+            candidates = list(node.top)
+            for child in node.children.values():
+                candidates.extend(fill(child))
+            node.top = heapq.nsmallest(MAX_COMPLETIONS, candidates, key=lambda t: (-doc_freq[t], t))
+            return node.top
+
+        fill(self.trie)
+
+    def complete(self, prefix: str, limit: int = MAX_COMPLETIONS) -> list[str]:
+        """Most frequent indexed terms starting with ``prefix``."""
+        node = self.trie
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.top[:limit]
+
+    def suggest(self, query: str, limit: int = MAX_COMPLETIONS) -> list[str]:
+        """Completions of the last, possibly partial, word of a query."""
+        query_words = words(query)
+        return self.complete(query_words[-1], limit) if query_words else []
+
+    def _groups(self, query: str, prefix: bool) -> Optional[list[list[str]]]:
+        """Terms each result must match one of; None if some query term matches nothing."""
+        query_words = words(query)
+        # A partial last word is kept even if it is short or looks like a stopword
+        tokens = [
+            word for i, word in enumerate(query_words)
+            if is_indexed(word) or (prefix and i == len(query_words) - 1)
+        ]
+        if not tokens:
+            return None
+        groups = []
+        for i, token in enumerate(tokens):
+            if prefix and i == len(tokens) - 1:
+                terms = self.complete(token)
+            else:
+                terms = [token] if token in self.postings else []
+            if not terms:
+                return None
+            groups.append(terms)
+        return groups
+
+    def _group(self, terms: tuple[str, ...]) -> tuple[dict[int, float], list[tuple[float, int]]]:
+        """Postings for packages matching any of the terms, at each package's best score.
+
+        Prefix expansions are merged once and cached, since type-ahead
+        prefixes repeat across users.
+        """
+        if len(terms) == 1:
+            return self.postings[terms[0]], self.ranked[terms[0]]
+        merged = self._merged.get(terms)
+        if merged is not None:
+            self._merged.move_to_end(terms)
+            return merged
+        postings: dict[int, float] = {}
+        for term in terms:
+            for doc, score in self.postings[term].items():
+                if score > postings.get(doc, 0.0):
+                    postings[doc] = score
+        merged = postings, sorted((-score, doc) for doc, score in postings.items())
+        with self._merged_lock:
+            self._merged[terms] = merged
+            while len(self._merged) > MERGED_CACHE_SIZE:
+                self._merged.popitem(last=False)
+        return merged
+
+    def search(self, query: str, limit: int = 10, prefix: bool = False) -> list[tuple[Package, float]]:
+        """Packages matching every query term, best first.
+
+        With ``prefix``, the last term also matches words it starts, for
+        search-as-you-type.
+        """
+        groups = self._groups(query, prefix)
+        if groups is None:
+            return []
+        groups = [self._group(tuple(terms)) for terms in groups]
+        groups.sort(key=lambda group: len(group[0]))
+
+        if len(groups) == 1:
+            return self._hits((-neg_score, doc) for neg_score, doc in groups[0][1][:limit])
+
+        def total(doc: int) -> Optional[float]:
+            # Sum of the doc's score in every group, or None if a group does not match
+            score = 0.0
+            for postings, _ in groups:
+                term_score = postings.get(doc)
+                if term_score is None:
+                    return None
+                score += term_score
+            return score
+
+        # Rare term: score every package containing it
+        if len(groups[0][0]) <= DIRECT_SCORE_LIMIT:
+            scored = ((total(doc), doc) for doc in groups[0][0])
+            return self._hits(heapq.nlargest(limit, ((score, doc) for score, doc in scored if score is not None)))
+
+        # Only common terms: threshold algorithm. Read every group's postings
+        # best first and stop once the k-th best total beats the best total
+        # an unseen package could still reach, or the scan budget runs out.
+        bounds = [0.0] * len(groups)
+        top: list[tuple[float, int]] = []
+        seen = set()
+        for position in range(MAX_SCAN_ROUNDS):
+            for i, (_, ranked) in enumerate(groups):
+                if position >= len(ranked):
+                    # Every package matching all groups appears in this one, so all have been scored
+                    return self._hits(top)
+                neg_score, doc = ranked[position]
+                bounds[i] = -neg_score
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                score = total(doc)
+                if score is None:
+                    continue
+                if len(top) < limit:
+                    heapq.heappush(top, (score, doc))
+                elif score > top[0][0]:
+                    heapq.heapreplace(top, (score, doc))
+            if len(top) >= limit and top[0][0] >= sum(bounds):
+                break
+        return self._hits(top)
+
+    def _hits(self, top: Iterable[tuple[float, int]]) -> list[tuple[Package, float]]:
+        """Packages for (score, index) pairs, best first."""
+        return [(self.packages[doc], round(score, 4)) for score, doc in sorted(top, reverse=True)]
+
+
+class PackageSearchService:
+    """Keeps a search index for the current catalog version."""
+
+    def __init__(self):
+        self._index: Optional[PackageSearchIndex] = None
+        self._packages: Optional[list[Package]] = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def cached(self, packages: list[Package], version: int) -> Optional[PackageSearchIndex]:
+        """Index for this catalog if it has already been built."""
+        index = self._index
+        if index is not None and self._version == version and self._packages is packages:
+            return index
+        return None
+
+    def get_index(self, packages: list[Package], version: int) -> PackageSearchIndex:
+        """Index for this catalog, rebuilt when its version (or list) changes."""
+        index = self.cached(packages, version)
+        if index is not None:
+            return index
+        with self._lock:
+            if self._index is None or self._version != version or self._packages is not packages:
+                self._index = PackageSearchIndex(packages)
+                self._packages = packages
+                self._version = version
+            return self._index
+
+
+# Singleton instance
+package_search = PackageSearchService()
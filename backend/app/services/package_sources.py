@@ -0,0 +1,143 @@
+"""Where the package catalog is read from.
+
+``SheetsService`` caches, snapshots and serves the catalog; a
+``PackageSource`` only loads it and says when a loaded copy is out of date.
+The Google Sheets source lives with the Sheets client in ``sheets_service``;
+this module has the base class and the local CSV/TSV file source.
+"""
+
+import abc
+import csv
+import hashlib
+import os
+from itertools import islice
+from pathlib import Path
+from typing import Optional
+
+from ..config import get_settings
+from ..models.schemas import Package
+from .package_parser import PackageParser, ParseReport
+from .profiling import span
+
+# sample_packages.csv at the repository root, the sheet template in the README
+DEFAULT_CATALOG_FILE = Path(__file__).parents[3] / "sample_packages.csv"
+# Rows read and parsed at a time, so memory doesn't grow with the file
+FILE_BLOCK_ROWS = 5000
+# Reads of a file that keeps changing underneath before settling for the last one
+FILE_READ_ATTEMPTS = 3
+
+
+class PackageSource(abc.ABC):
+    """Loads the package catalog.
+
+    ``fetch`` returns the active packages, or None if the source has no
+    header row; it may raise, and the caller decides what to serve instead.
+    The rows it skipped are described in ``parse_report``, and the version
+    of the source it read (if the source has one) in ``loaded_version``.
+    """
+
+    name = "base"
+    # Snapshots of this source's catalog go in this subdirectory of the snapshot
+    # directory, so workers never adopt a catalog read from another source
+    snapshot_key = ""
+
+    def __init__(self):
+        self.parse_report: Optional[ParseReport] = None  # From the last fetch
+        self.loaded_version: Optional[tuple[int, int]] = None  # From the last fetch
+
+    def configured(self) -> bool:
+        """Whether the source has been set up (otherwise demo packages are served)."""
+        return True
+
+    def available(self) -> bool:
+        """Whether the source can be read now."""
+        return True
+
+    @abc.abstractmethod
+    def is_stale(self, loaded_at: float, loaded_version: Optional[tuple[int, int]]) -> bool:
+        """Whether a catalog loaded at ``loaded_at`` (a Unix time) from ``loaded_version`` should be reloaded."""
+
+    @abc.abstractmethod
+    def fetch(self) -> Optional[list[Package]]:
+        """Load the active packages."""
+
+
+class FileSource(PackageSource):
+    """CSV or TSV file laid out like the sheet, header row first.
+
+    Rows are streamed and parsed a block at a time, so the file is never
+    held in memory whole. The catalog is reloaded when the file's
+    modification time or size differs from when it was read, rather than
+    on the cache TTL; replace the file atomically (write and rename) to
+    update it.
+    """
+
+    name = "file"
+
+    def __init__(self, path: Optional[Path] = None):
+        super().__init__()
+        self.path = Path(path or get_settings().catalog_file_path or DEFAULT_CATALOG_FILE)
+        # Tab-separated by extension, otherwise comma-separated
+        self.delimiter = "\t" if self.path.suffix.lower() in (".tsv", ".tab") else ","
+        # Only a newer file triggers a reload, so a snapshot of another file must never be picked up
+        self.snapshot_key = "file-" + hashlib.sha1(str(self.path.resolve()).encode()).hexdigest()[:12]
+
+    def _signature(self) -> Optional[tuple[int, int]]:
+        """Modification time and size of the file, or None if it is missing."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def available(self) -> bool:
+        """Whether the file exists."""
+        return self._signature() is not None
+
+    def is_stale(self, loaded_at: float, loaded_version: Optional[tuple[int, int]]) -> bool:
+        """Whether the file's modification time or size differs from ``loaded_version``."""
+        signature = self._signature()
+        # A file that has gone away leaves the last catalog in place. Comparing
+        # signatures rather than times also catches a change within the
+        # filesystem's timestamp granularity of the read
+        return signature is not None and signature != loaded_version
+
+    def fetch(self) -> Optional[list[Package]]:
+        """Read the file; read it again if it changed while being read.
+
+        ``loaded_version`` is the signature from before the last read, so a
+        file still changing after the final attempt is reloaded next time.
+        """
+        with span("catalog_file"):
+            for _ in range(FILE_READ_ATTEMPTS):
+                signature = self._signature()
+                packages, report = self._read()
+                if self._signature() == signature:
+                    break
+        self.parse_report = report
+        self.loaded_version = signature
+        if report.invalid:
+            print(f"Skipped invalid package rows in {self.path.name}: {report.summary()}")
+        if packages is not None and not packages:
+            print(f"No active packages found in {self.path}")
+        return packages
+
+    def _read(self) -> tuple[Optional[list[Package]], ParseReport]:
+        """Active packages in the file (None if it is empty) and the parse report."""
+        report = ParseReport()
+        with open(self.path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f, delimiter=self.delimiter)
+            headers = next(reader, None)
+            if not headers:
+                return None, report
+            parser = PackageParser(headers)
+            packages: list[Package] = []
+            # Row numbers count records, as in the sheet, not lines of the file
+            first_row = 2
+            while True:
+                rows = list(islice(reader, FILE_BLOCK_ROWS))
+                if not rows:
+                    break
+                packages.extend(parser.parse(rows, first_row, report))
+                first_row += len(rows)
+        return packages, report
@@ -0,0 +1,226 @@
+"""Per-request span timings (Server-Timing) and on-demand cProfile profiles."""
+
+import asyncio
+import cProfile
+import hmac
+import io
+import json
+import pstats
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterator, Optional
+
+from ..config import get_settings
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+PROFILE_HEADER = b"x-profile"
+
+# Paths that are never sampled: scrapes, probes and the profile endpoints themselves
+UNSAMPLED_PREFIXES = ("/api/profiles", "/metrics", "/health", "/ready")
+
+_spans: ContextVar[Optional[list[tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block as a named span of the current request (a no-op outside one)."""
+    spans = _spans.get()
+    if spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans.append((name, time.perf_counter() - start))
+
+
+def add_span(name: str, seconds: float) -> None:
+    """Record an already measured span on the current request."""
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+def profiling_active() -> bool:
+    """Whether request profiling is on; it is refused without an admin token,
+    since profiles expose the code paths and timings of every request."""
+    settings = get_settings()
+    return settings.profiling_enabled and bool(settings.profiling_admin_token)
+
+
+def server_timing(spans: list[tuple[str, float]], total: float) -> str:
+    """``Server-Timing`` header value, summing repeated spans of the same name."""
+    durations: dict[str, float] = {}
+    for name, seconds in spans:
+        durations[name] = durations.get(name, 0.0) + seconds
+    durations["total"] = total
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in durations.items())
+
+
+class ProfileStore:
+    """Bounded ring of profiles on disk: a pstats dump plus a JSON summary each.
+
+    Files are named by start time, so the oldest are dropped first once
+    there are more than ``max_profiles``. Shared by every worker using the
+    same directory.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_profiles: Optional[int] = None):
+        settings = get_settings()
+        self.directory = Path(directory or settings.profiling_dir or DATA_DIR / "profiles")
+        self.max_profiles = max_profiles or settings.profiling_max_profiles
+
+    def save(self, profile: cProfile.Profile, meta: dict) -> None:
+        """Write a profile and trim the ring."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{time.time_ns()}-{meta['id']}"
+        profile.dump_stats(self.directory / f"{stem}.prof")
+        # The summary is written last, so a listed profile always has its stats
+        tmp = self.directory / f"{stem}.json.tmp"
+        tmp.write_text(json.dumps(meta))
+        tmp.replace(self.directory / f"{stem}.json")
+        for old in self._summaries()[self.max_profiles:]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".prof").unlink(missing_ok=True)
+
+    def _summaries(self) -> list[Path]:
+        """Summary files, newest first."""
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob("*.json"), reverse=True)
+
+    def list(self) -> list[dict]:
+        """Summaries of the stored profiles, newest first."""
+        profiles = []
+        for path in self._summaries():
+            try:
+                profiles.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def path(self, profile_id: str) -> Optional[Path]:
+        """The pstats dump of a profile, if it is still in the ring."""
+        if not profile_id.isalnum():
+            return None
+        matches = list(self.directory.glob(f"*-{profile_id}.prof")) if self.directory.exists() else []
+        return matches[0] if matches else None
+
+    def report(self, profile_id: str, sort: str = "cumulative", limit: int = 40) -> Optional[str]:
+        """Text report of a profile's most expensive functions."""
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        out = io.StringIO()
+        stats = pstats.Stats(str(path), stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware adding ``Server-Timing`` spans and profiling chosen requests.
+
+    A request is profiled when it carries ``X-Profile`` equal to the admin
+    token or is picked by the sample rate; sampled
+    profiles faster than ``min_duration_ms`` are discarded. cProfile sees
+    everything on the event loop thread while the request is in flight,
+    including other concurrent requests, and only one request is profiled at
+    a time. Work handed to threads is not profiled but does show in the spans.
+    """
+
+    def __init__(self, app, store: Optional[ProfileStore] = None):
+        settings = get_settings()
+        self.app = app
+        self.profiling = profiling_active()
+        self.server_timing = settings.server_timing_enabled
+        self.sample_rate = settings.profiling_sample_rate
+        self.min_duration = settings.profiling_min_duration_ms / 1000
+        self.token = settings.profiling_admin_token.encode()
+        self.store = store or profile_store
+        self._busy = threading.Lock()
+
+    def _wants_profile(self, scope) -> Optional[str]:
+        """Why this request should be profiled ("header" or "sampled"), if at all."""
+        if not self.profiling:
+            return None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                if hmac.compare_digest(value, self.token):
+                    return "header"
+                break
+        path = scope["path"]
+        if self.sample_rate and not path.startswith(UNSAMPLED_PREFIXES) and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.profiling or self.server_timing):
+            await self.app(scope, receive, send)
+            return
+
+        spans: list[tuple[str, float]] = []
+        token = _spans.set(spans)
+        trigger = self._wants_profile(scope)
+        profile = None
+        profile_id = None
+        if trigger and self._busy.acquire(blocking=False):
+            profile = cProfile.Profile()
+            profile_id = secrets.token_hex(6)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                if self.server_timing:
+                    headers.append((b"server-timing", server_timing(spans, time.perf_counter() - start).encode()))
+                if profile_id and trigger == "header":
+                    headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError as e:
+                # Another profiler (e.g. a debugger) is active
+                print(f"Cannot profile request: {e}")
+                profile, profile_id = None, None
+                self._busy.release()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _spans.reset(token)
+            if profile is not None:
+                profile.disable()
+                self._busy.release()
+                if trigger == "header" or elapsed >= self.min_duration:
+                    meta = {
+                        "id": profile_id,
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status,
+                        "trigger": trigger,
+                        "started_at": time.time() - elapsed,
+                        "duration_ms": round(elapsed * 1000, 2),
+                        "spans": [[name, round(seconds * 1000, 2)] for name, seconds in spans],
+                    }
+                    try:
+                        await asyncio.to_thread(self.store.save, profile, meta)
+                    except Exception as e:
+                        print(f"Error saving request profile: {e}")
+
+
+# Singleton instance
+profile_store = ProfileStore()
@@ -1,168 +1,426 @@
 """RAG (Retrieval Augmented Generation) service for knowledge-based responses."""
 
-import json
+import shutil
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional
 
-import chromadb
-from sentence_transformers import SentenceTransformer
+from ..config import get_settings
+from .metrics import metrics
+from .profiling import span
+
+if TYPE_CHECKING:
+    import chromadb
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    from .vector_index import PartitionedIndex, VectorIndex
+
+INDEX_ROOT = Path(__file__).parent.parent / "data" / "vector_index"
+COLLECTION_PREFIX = "nz_tours_knowledge"
+# Lightweight but effective sentence embedding model
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+ENCODE_SECONDS = metrics.histogram("rag_encode_duration_seconds", "Time to embed a retrieval query")
+QUERY_SECONDS = metrics.histogram("rag_query_duration_seconds", "Vector store query time", ("store",))
+RETRIEVE_ERRORS = metrics.counter("rag_retrieve_errors", "Failed knowledge base retrievals")
+
+# Chroma's where filters match exactly, so these fields are also stored
+# lowercased under "<field>_lower" and filters are matched against the copies
+CHROMA_FILTER_FIELDS = ("type", "region", "location")
+LOWER_SUFFIX = "_lower"
+
+
+def _with_lowercase_filters(metadata: dict) -> dict:
+    """Chroma metadata with lowercased copies of the filter fields."""
+    lowered = {
+        f"{key}{LOWER_SUFFIX}": str(metadata[key]).lower()
+        for key in CHROMA_FILTER_FIELDS
+        if metadata.get(key) is not None
+    }
+    return {**metadata, **lowered}
+
+
+def _without_lowercase_filters(metadata: dict) -> dict:
+    """Chroma metadata as it was indexed."""
+    return {key: value for key, value in metadata.items() if not key.endswith(LOWER_SUFFIX)}
 
 
 class RAGService:
     """Service for RAG-based knowledge retrieval and response generation."""
 
     def __init__(self):
-        self._embedder: Optional[SentenceTransformer] = None
-        self._chroma_client: Optional[chromadb.PersistentClient] = None
+        self._embedder: Optional["SentenceTransformer"] = None
+        self._chroma_client: Optional["chromadb.PersistentClient"] = None
         self._collection = None
-        self._knowledge_base = None
+        self._local_index: Optional["PartitionedIndex"] = None
         self._initialized = False
-
-    def _get_embedder(self) -> SentenceTransformer:
+        self._rebuild_lock = threading.Lock()
+        # Callers that find the index missing wait for the first load instead of starting their own build
+        self._init_lock = threading.Lock()
+        # Documents added while a rebuild runs (None otherwise), replayed into the new index before the swap
+        self._pending_adds: Optional[list[tuple[list[dict], "np.ndarray"]]] = None
+        self._add_lock = threading.Lock()
+        # Orders saves of the in-process index, so an older snapshot never overwrites a newer one
+        self._save_lock = threading.Lock()
+        self._settings = get_settings()
+
+    @property
+    def is_initialized(self) -> bool:
+        """Whether the index has been loaded or built."""
+        return self._initialized
+
+    @property
+    def _uses_local_index(self) -> bool:
+        """Whether embeddings live in the in-process (optionally quantized) index."""
+        return self._settings.rag_vector_store == "local"
+
+    def _local_index_dir(self) -> Path:
+        """Directory holding the current version of the persisted in-process index."""
+        pointer = INDEX_ROOT / "CURRENT"
+        if pointer.exists():
+            return INDEX_ROOT / pointer.read_text().strip()
+        return INDEX_ROOT
+
+    def _publish_local_version(self, version: str) -> None:
+        """Atomically point CURRENT at a freshly saved index version."""
+        tmp_pointer = INDEX_ROOT / "CURRENT.tmp"
+        tmp_pointer.write_text(version)
+        tmp_pointer.replace(INDEX_ROOT / "CURRENT")
+
+    def _get_embedder(self) -> "SentenceTransformer":
         """Get or create sentence transformer model."""
         if self._embedder is None:
-            # Use a lightweight but effective model
-            self._embedder = SentenceTransformer('all-MiniLM-L6-v2')
+            # Imported lazily: torch and the model weights take seconds to load
+            from sentence_transformers import SentenceTransformer
+
+            self._embedder = SentenceTransformer(EMBEDDING_MODEL)
         return self._embedder
 
-    def _get_chroma_client(self) -> chromadb.PersistentClient:
+    def _get_chroma_client(self) -> "chromadb.PersistentClient":
         """Get or create ChromaDB client."""
         if self._chroma_client is None:
+            import chromadb
+
             persist_dir = Path(__file__).parent.parent / "data" / "chroma_db"
             persist_dir.mkdir(parents=True, exist_ok=True)
             self._chroma_client = chromadb.PersistentClient(path=str(persist_dir))
         return self._chroma_client
 
-    def _load_knowledge_base(self) -> dict:
-        """Load knowledge base from JSON file."""
-        if self._knowledge_base is None:
-            kb_path = Path(__file__).parent.parent / "data" / "knowledge_base.json"
-            if kb_path.exists():
-                with open(kb_path, 'r', encoding='utf-8') as f:
-                    self._knowledge_base = json.load(f)
-            else:
-                self._knowledge_base = {}
-        return self._knowledge_base
-
-    def _prepare_documents(self) -> list[dict]:
-        """Prepare documents from knowledge base for indexing."""
-        kb = self._load_knowledge_base()
-        documents = []
+    @staticmethod
+    def _item_document(collection: str, row_id: int, item: dict) -> dict:
+        """Build the indexed document for one knowledge store item."""
+        if collection == "faqs":
+            return {
+                "id": f"faq_{row_id}",
+                "content": f"Question: {item['question']}\nAnswer: {item['answer']}",
+                "metadata": {"type": "faq", "question": item["question"]}
+            }
+        if collection == "destinations":
+            highlights = ", ".join(item.get("highlights", []))
+            best_for = ", ".join(item.get("best_for", []))
+            return {
+                "id": f"dest_{item['name'].lower().replace(' ', '_')}",
+                "content": f"Destination: {item['name']} ({item['region']}). {item['description']} Highlights: {highlights}. Best for: {best_for}.",
+                "metadata": {"type": "destination", "name": item["name"], "region": item["region"]}
+            }
+        if collection == "activities":
+            return {
+                "id": f"activity_{item['name'].lower().replace(' ', '_')}",
+                "content": f"Activity: {item['name']} in {item['location']}. {item['description']} Price: {item['price_range']}. Duration: {item['duration']}. Difficulty: {item['difficulty']}.",
+                "metadata": {"type": "activity", "name": item["name"], "location": item["location"]}
+            }
+        raise ValueError(f"Unknown knowledge collection: {collection}")
+
+    @staticmethod
+    def _section_documents(name: str, data) -> list[dict]:
+        """Build the indexed documents for a single-document knowledge section."""
+        if not data:
+            return []
 
-        # Company info
-        if "company_info" in kb:
-            info = kb["company_info"]
-            contact = info.get('contact', {})
-            documents.append({
+        if name == "company_info":
+            contact = data.get('contact', {})
+            return [{
                 "id": "company_info",
-                "content": f"Company: {info.get('name', '')}. {info.get('description', '')}. Contact email: {contact.get('email', '')}. Phone: {contact.get('phone', '')}. Address: {contact.get('address', '')}. Working hours: {info.get('working_hours', '')}",
+                "content": f"Company: {data.get('name', '')}. {data.get('description', '')}. Contact email: {contact.get('email', '')}. Phone: {contact.get('phone', '')}. Address: {contact.get('address', '')}. Working hours: {data.get('working_hours', '')}",
                 "metadata": {"type": "company_info"}
-            })
-
-        # FAQs
-        for i, faq in enumerate(kb.get("faqs", [])):
-            documents.append({
-                "id": f"faq_{i}",
-                "content": f"Question: {faq['question']}\nAnswer: {faq['answer']}",
-                "metadata": {"type": "faq", "question": faq["question"]}
-            })
-
-        # Destinations
-        for dest in kb.get("destinations", []):
-            highlights = ", ".join(dest.get("highlights", []))
-            best_for = ", ".join(dest.get("best_for", []))
-            documents.append({
-                "id": f"dest_{dest['name'].lower().replace(' ', '_')}",
-                "content": f"Destination: {dest['name']} ({dest['region']}). {dest['description']} Highlights: {highlights}. Best for: {best_for}.",
-                "metadata": {"type": "destination", "name": dest["name"], "region": dest["region"]}
-            })
-
-        # Activities
-        for activity in kb.get("activities", []):
-            documents.append({
-                "id": f"activity_{activity['name'].lower().replace(' ', '_')}",
-                "content": f"Activity: {activity['name']} in {activity['location']}. {activity['description']} Price: {activity['price_range']}. Duration: {activity['duration']}. Difficulty: {activity['difficulty']}.",
-                "metadata": {"type": "activity", "name": activity["name"], "location": activity["location"]}
-            })
-
-        # Policies
-        policies = kb.get("policies", {})
-        if policies:
-            policy_text = ". ".join([f"{k.replace('_', ' ').title()}: {v}" for k, v in policies.items()])
-            documents.append({
+            }]
+
+        if name == "policies":
+            policy_text = ". ".join([f"{k.replace('_', ' ').title()}: {v}" for k, v in data.items()])
+            return [{
                 "id": "policies",
                 "content": f"Booking Policies: {policy_text}",
                 "metadata": {"type": "policy"}
-            })
+            }]
 
-        # Seasonal tips
-        for season, info in kb.get("seasonal_tips", {}).items():
-            events = ", ".join(info.get("events", []))
-            documents.append({
-                "id": f"season_{season}",
-                "content": f"Season: {season.title()} ({info['months']}). Weather: {info['weather']}. Tips: {info['tips']}. Events: {events}.",
-                "metadata": {"type": "seasonal_tip", "season": season}
-            })
+        if name == "seasonal_tips":
+            documents = []
+            for season, info in data.items():
+                events = ", ".join(info.get("events", []))
+                documents.append({
+                    "id": f"season_{season}",
+                    "content": f"Season: {season.title()} ({info['months']}). Weather: {info['weather']}. Tips: {info['tips']}. Events: {events}.",
+                    "metadata": {"type": "seasonal_tip", "season": season}
+                })
+            return documents
 
-        return documents
+        raise ValueError(f"Unknown knowledge section: {name}")
 
-    def initialize(self, force_rebuild: bool = False) -> bool:
-        """Initialize RAG system with knowledge base."""
-        try:
-            client = self._get_chroma_client()
-            collection_name = "nz_tours_knowledge"
-
-            if force_rebuild:
-                try:
-                    client.delete_collection(collection_name)
-                except:
-                    pass
-                self._collection = None
-
-            # Try to get existing collection
-            try:
-                self._collection = client.get_collection(name=collection_name)
-                if self._collection.count() > 0 and not force_rebuild:
-                    self._initialized = True
-                    print(f"RAG loaded with {self._collection.count()} documents")
-                    return True
-            except:
-                pass
+    def _iter_documents(self) -> Iterator[dict]:
+        """Stream documents for indexing from the knowledge store."""
+        from .knowledge_store import COLLECTION_FIELDS, knowledge_store
 
-            # Create new collection with custom embedding function
-            embedder = self._get_embedder()
+        # Company info
+        yield from self._section_documents("company_info", knowledge_store.get_section("company_info"))
 
-            class EmbeddingFunction:
-                def __init__(self, model):
-                    self.model = model
+        # FAQs, destinations and activities
+        for collection in COLLECTION_FIELDS:
+            for row_id, item in knowledge_store.iter_rows(collection):
+                yield self._item_document(collection, row_id, item)
 
-                def __call__(self, input):
-                    return self.model.encode(input).tolist()
+        # Policies and seasonal tips
+        yield from self._section_documents("policies", knowledge_store.get_section("policies"))
+        yield from self._section_documents("seasonal_tips", knowledge_store.get_section("seasonal_tips"))
 
-            self._collection = client.create_collection(
-                name=collection_name,
-                metadata={"description": "NZ Tours knowledge base"}
+    def _prepare_documents(self) -> list[dict]:
+        """Prepare documents from knowledge base for indexing."""
+        return list(self._iter_documents())
+
+    def _new_local_index(self) -> "VectorIndex":
+        """Create an empty in-process index as configured."""
+        from .vector_index import IVFIndex, VectorIndex
+
+        dtype = self._settings.rag_embedding_dtype
+        if self._settings.rag_ann_index == "ivf":
+            return IVFIndex(
+                dtype=dtype,
+                nlist=self._settings.rag_ivf_nlist,
+                nprobe=self._settings.rag_ivf_nprobe,
             )
+        return VectorIndex(dtype=dtype)
+
+    def _count_documents(self) -> int:
+        """Number of documents a rebuild will index, from the store's counters."""
+        from .knowledge_store import knowledge_store
+
+        stats = knowledge_store.stats()
+        return (
+            stats["faqs"] + stats["destinations"] + stats["activities"]
+            + int(stats["has_company_info"]) + int(stats["has_policies"])
+            + stats["seasons_documented"]
+        )
+
+    def _embed_batches(
+        self,
+        documents: Iterable[dict],
+        batch_size: Optional[int] = None,
+        parallel: bool = False,
+    ) -> Iterator[tuple[list[dict], "np.ndarray"]]:
+        """Yield (documents, embeddings) in fixed-size batches.
+
+        With ``parallel`` the documents are sharded across a process pool and
+        batches arrive in completion order rather than input order.
+        """
+        batch_size = batch_size or self._settings.rag_embed_batch_size
+        if parallel:
+            from .embedding_pool import EmbeddingPool
+
+            pool = EmbeddingPool(
+                EMBEDDING_MODEL,
+                workers=self._settings.rag_embed_workers,
+                shard_size=self._settings.rag_embed_shard_size,
+                batch_size=batch_size,
+            )
+            yield from pool.embed(documents)
+            return
+
+        embedder = self._get_embedder()
+        batch: list[dict] = []
+        for doc in documents:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch, embedder.encode([d["content"] for d in batch], batch_size=batch_size)
+                batch = []
+        if batch:
+            yield batch, embedder.encode([d["content"] for d in batch], batch_size=batch_size)
+
+    def _write_batch(self, batch: list[dict], embeddings: "np.ndarray", index=None) -> set[str]:
+        """Add embedded documents to ``index`` (the live one by default), returning the local partitions touched."""
+        ids = [doc["id"] for doc in batch]
+        contents = [doc["content"] for doc in batch]
+        metadatas = [doc.get("metadata") or {} for doc in batch]
+        if self._uses_local_index:
+            return (self._local_index if index is None else index).add(ids, embeddings, contents, metadatas)
+        (self._collection if index is None else index).upsert(
+            ids=ids,
+            documents=contents,
+            metadatas=[_with_lowercase_filters(metadata) for metadata in metadatas],
+            embeddings=embeddings.tolist()
+        )
+        return set()
+
+    def _add_live(self, batch: list[dict], embeddings: "np.ndarray") -> set[str]:
+        """Add embedded documents to the live index, keeping them for the rebuild in progress."""
+        with self._add_lock:
+            touched = self._write_batch(batch, embeddings)
+            if self._pending_adds is not None:
+                self._pending_adds.append((batch, embeddings))
+        return touched
+
+    def _replay_pending(self, index) -> int:
+        """Add the documents added during the rebuild to its new index (add lock held)."""
+        replayed = 0
+        for batch, embeddings in self._pending_adds:
+            self._write_batch(batch, embeddings, index)
+            replayed += len(batch)
+        if replayed:
+            print(f"RAG rebuild picked up {replayed} documents added while it ran")
+        return replayed
+
+    def _save_local(self, partitions: set[str]) -> None:
+        """Persist changed partitions of the in-process index.
+
+        The snapshot is copied under the add lock, so adds on other threads
+        can't change it mid-write; the files are written outside it.
+        """
+        from .vector_index import PartitionedIndex
+
+        with self._save_lock:
+            with self._add_lock:
+                directory = self._local_index_dir()
+                snapshot = self._local_index.snapshot(partitions)
+            PartitionedIndex.write(directory, snapshot)
+
+    def _load_existing(self) -> bool:
+        """Load a previously built index, returning False if there is none."""
+        if self._uses_local_index:
+            from .vector_index import PartitionedIndex
+
+            template = self._new_local_index()
+            stored = PartitionedIndex.load(self._local_index_dir(), self._new_local_index)
+            if (
+                stored is None
+                or stored.count() == 0
+                or stored.dtype != template.dtype
+                or stored.kind != template.kind
+            ):
+                return False
+            self._local_index = stored
+            print(f"RAG loaded with {stored.count()} documents ({stored.kind}, {stored.dtype})")
+            return True
 
-            # Prepare and index documents
-            documents = self._prepare_documents()
-
-            if documents:
-                ids = [doc["id"] for doc in documents]
-                contents = [doc["content"] for doc in documents]
-                metadatas = [doc["metadata"] for doc in documents]
-                embeddings = embedder.encode(contents).tolist()
+        client = self._get_chroma_client()
+        names = sorted(
+            name
+            for name in (getattr(c, "name", c) for c in client.list_collections())
+            if name == COLLECTION_PREFIX or name.startswith(f"{COLLECTION_PREFIX}_v")
+        )
+        if not names:
+            return False
+        # Version suffixes sort chronologically, so the last name is the newest build
+        collection = client.get_collection(name=names[-1])
+        if collection.count() == 0:
+            return False
+        if not (collection.metadata or {}).get("lowercase_filters"):
+            # Built before filters ignored case; rebuilt so filtered queries match
+            return False
+        self._collection = collection
+        print(f"RAG loaded with {collection.count()} documents")
+        return True
+
+    def rebuild(self, progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """Build a new index version from the knowledge store and swap it in.
+
+        Queries keep using the previous index until the new one is complete;
+        the swap is a single reference assignment. Documents added while the
+        rebuild runs go into the previous index and are replayed into the new
+        one before the swap, so none are lost.
+        """
+        with self._rebuild_lock:
+            with self._add_lock:
+                self._pending_adds = []
+            try:
+                return self._rebuild(progress)
+            finally:
+                with self._add_lock:
+                    self._pending_adds = None
+
+    def _rebuild(self, progress: Optional[Callable[[int, int], None]]) -> int:
+        """Build and swap in a new index version (rebuild lock held)."""
+        total = self._count_documents()
+        done = 0
+        if progress:
+            progress(done, total)
+        version = f"v{time.time_ns()}"
+        # Large rebuilds shard embedding across processes; small ones aren't worth the spawn cost
+        parallel = (
+            self._settings.rag_embed_workers > 1
+            and total >= self._settings.rag_parallel_embed_min_documents
+        )
+        start = time.perf_counter()
+
+        if self._uses_local_index:
+            from .vector_index import PartitionedIndex
+
+            # One sub-index per document type so type-filtered queries score less
+            index = PartitionedIndex(self._new_local_index)
+            for batch, embeddings in self._embed_batches(self._iter_documents(), parallel=parallel):
+                self._write_batch(batch, embeddings, index)
+                done += len(batch)
+                if progress:
+                    progress(done, max(total, done))
+
+            # Saves of the previous version finish first, so none lands in a deleted directory
+            with self._save_lock, self._add_lock:
+                self._replay_pending(index)
+                index.save(INDEX_ROOT / version)
+                previous_dir = self._local_index_dir()
+                self._publish_local_version(version)
+                self._local_index = index
+            if previous_dir != INDEX_ROOT:
+                shutil.rmtree(previous_dir, ignore_errors=True)
+            print(
+                f"RAG rebuilt with {done} documents ({index.kind}, {index.dtype}) "
+                f"at {done / (time.perf_counter() - start):.0f} docs/s"
+            )
+        else:
+            client = self._get_chroma_client()
+            collection = client.create_collection(
+                name=f"{COLLECTION_PREFIX}_{version}",
+                metadata={"description": "NZ Tours knowledge base", "lowercase_filters": True}
+            )
+            for batch, embeddings in self._embed_batches(self._iter_documents(), parallel=parallel):
+                self._write_batch(batch, embeddings, collection)
+                done += len(batch)
+                if progress:
+                    progress(done, max(total, done))
+
+            with self._add_lock:
+                self._replay_pending(collection)
+                previous = self._collection
+                self._collection = collection
+            if previous is not None:
+                try:
+                    client.delete_collection(previous.name)
+                except Exception as e:
+                    print(f"Error deleting previous RAG collection: {e}")
+            print(f"RAG rebuilt with {done} documents at {done / (time.perf_counter() - start):.0f} docs/s")
 
-                self._collection.add(
-                    ids=ids,
-                    documents=contents,
-                    metadatas=metadatas,
-                    embeddings=embeddings
-                )
+        self._initialized = True
+        return done
 
-            self._initialized = True
-            print(f"RAG initialized with {len(documents)} documents")
-            return True
+    def initialize(self, force_rebuild: bool = False) -> bool:
+        """Initialize RAG system with knowledge base."""
+        try:
+            with self._init_lock:
+                if self._initialized and not force_rebuild:
+                    return True
+                if not force_rebuild and self._load_existing():
+                    self._initialized = True
+                    return True
+                self.rebuild()
+                return True
 
         except Exception as e:
             print(f"Error initializing RAG: {e}")
@@ -170,30 +428,84 @@ class RAGService:
             traceback.print_exc()
             return False
 
-    def retrieve(self, query: str, n_results: int = 5) -> list[dict]:
-        """Retrieve relevant documents for a query."""
+    def warm_up(self) -> bool:
+        """Load the embedding model and index ahead of the first query."""
+        embedder = self._get_embedder()
+        # Run one encode so the first real query doesn't pay for lazy kernel setup
+        embedder.encode("Kia Ora")
+        return self.initialize()
+
+    def retrieve(
+        self,
+        query: str,
+        n_results: int = 5,
+        doc_types: Optional[list[str]] = None,
+        region: Optional[str] = None,
+        location: Optional[str] = None,
+    ) -> list[dict]:
+        """Retrieve relevant documents for a query, optionally filtered by metadata (ignoring case)."""
         if not self._initialized:
             self.initialize()
 
+        if self._uses_local_index:
+            if self._local_index is None:
+                return []
+            try:
+                with ENCODE_SECONDS.time(), span("rag_encode"):
+                    query_embedding = self._get_embedder().encode(query)
+                with QUERY_SECONDS.labels("local").time(), span("rag_query"):
+                    results = self._local_index.query(
+                        query_embedding,
+                        n_results,
+                        partitions=doc_types,
+                        where={"region": region, "location": location},
+                        nprobe=self._settings.rag_ivf_nprobe,
+                    )
+                return [
+                    {"content": r["content"], "metadata": r["metadata"], "distance": r["distance"]}
+                    for r in results
+                ]
+            except Exception as e:
+                print(f"Error retrieving documents: {e}")
+                RETRIEVE_ERRORS.inc()
+                return []
+
         if self._collection is None:
             return []
 
         try:
             embedder = self._get_embedder()
-            query_embedding = embedder.encode(query).tolist()
-
-            results = self._collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                include=["documents", "metadatas", "distances"]
-            )
+            with ENCODE_SECONDS.time(), span("rag_encode"):
+                query_embedding = embedder.encode(query).tolist()
+
+            # Matched against the lowercased copies, like the local index's filters
+            conditions = []
+            if doc_types:
+                conditions.append({f"type{LOWER_SUFFIX}": {"$in": [t.lower() for t in doc_types]}})
+            if region:
+                conditions.append({f"region{LOWER_SUFFIX}": region.lower()})
+            if location:
+                conditions.append({f"location{LOWER_SUFFIX}": location.lower()})
+            where = None
+            if len(conditions) == 1:
+                where = conditions[0]
+            elif conditions:
+                where = {"$and": conditions}
+
+            with QUERY_SECONDS.labels("chroma").time(), span("rag_query"):
+                results = self._collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=n_results,
+                    where=where,
+                    include=["documents", "metadatas", "distances"]
+                )
 
             retrieved = []
             if results and results["documents"] and results["documents"][0]:
                 for i, doc in enumerate(results["documents"][0]):
                     retrieved.append({
                         "content": doc,
-                        "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
+                        "metadata": _without_lowercase_filters(results["metadatas"][0][i] or {}) if results["metadatas"] else {},
                         "distance": results["distances"][0][i] if results["distances"] else 0
                     })
 
@@ -201,11 +513,17 @@ class RAGService:
 
         except Exception as e:
             print(f"Error retrieving documents: {e}")
+            RETRIEVE_ERRORS.inc()
             return []
 
-    def get_context_for_query(self, query: str, max_tokens: int = 2000) -> str:
+    def get_context_for_query(
+        self,
+        query: str,
+        max_tokens: int = 2000,
+        doc_types: Optional[list[str]] = None,
+    ) -> str:
         """Get formatted context for a query to be used in LLM prompt."""
-        retrieved = self.retrieve(query, n_results=5)
+        retrieved = self.retrieve(query, n_results=5, doc_types=doc_types)
 
         if not retrieved:
             return "No specific information found in knowledge base."
@@ -228,25 +546,38 @@ class RAGService:
         if not self._initialized:
             self.initialize()
 
-        if self._collection is None:
+        if (self._local_index if self._uses_local_index else self._collection) is None:
             return False
 
         try:
-            embedder = self._get_embedder()
-            embedding = embedder.encode(content).tolist()
-
-            self._collection.add(
-                ids=[doc_id],
-                documents=[content],
-                metadatas=[metadata or {}],
-                embeddings=[embedding]
-            )
+            document = {"id": doc_id, "content": content, "metadata": metadata or {}}
+            touched = self._add_live([document], self._get_embedder().encode([content]))
+            if touched:
+                self._save_local(touched)
             return True
 
         except Exception as e:
             print(f"Error adding document: {e}")
             return False
 
+    def add_documents(self, documents: Iterable[dict], batch_size: Optional[int] = None) -> int:
+        """Embed and index documents in fixed-size batches to bound memory use."""
+        if not self._initialized:
+            self.initialize()
+
+        if (self._local_index if self._uses_local_index else self._collection) is None:
+            return 0
+
+        added = 0
+        touched: set[str] = set()
+        for batch, embeddings in self._embed_batches(documents, batch_size):
+            touched.update(self._add_live(batch, embeddings))
+            added += len(batch)
+
+        if touched:
+            self._save_local(touched)
+        return added
+
 
 # Singleton instance
 rag_service = RAGService()
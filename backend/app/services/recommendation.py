@@ -1,8 +1,20 @@
 """Package recommendation and filtering service."""
 
+import time
 from typing import Optional
 
 from ..models.schemas import Package, PackageFilter
+from ..models.seasons import parse_month, season_mask
+from .metrics import metrics
+from .profiling import add_span
+
+FILTER_SECONDS = metrics.histogram("recommendation_filter_duration_seconds", "Time to filter the catalog")
+RECOMMENDATIONS = metrics.counter(
+    "recommendations", "Guided-flow recommendation requests, by whether any package matched", ("result",)
+)
+RECOMMENDATION_HIT = RECOMMENDATIONS.labels("hit")
+RECOMMENDATION_EMPTY = RECOMMENDATIONS.labels("empty")
+RECOMMENDED_PACKAGES = metrics.counter("recommended_packages", "Packages returned by recommendations")
 
 
 class RecommendationService:
@@ -14,6 +26,7 @@ class RecommendationService:
         filters: PackageFilter
     ) -> list[Package]:
         """Filter packages based on criteria."""
+        start = time.perf_counter()
         filtered = packages.copy()
 
         if filters.region:
@@ -50,6 +63,13 @@ class RecommendationService:
                 if p.group_size_min <= filters.group_size <= p.group_size_max
             ]
 
+        travel_mask = filters.travel_mask()
+        if travel_mask is not None:
+            filtered = [p for p in filtered if p.month_mask & travel_mask]
+
+        elapsed = time.perf_counter() - start
+        FILTER_SECONDS.observe(elapsed)
+        add_span("filter", elapsed)
         return filtered
 
     def get_recommendations(
@@ -117,12 +137,22 @@ class RecommendationService:
             }
             filters.group_size = group_sizes.get(group.lower())
 
+        # Travel time: a season from the flow, or a month from other clients
+        travel_time = selections.get("travel_time")
+        if travel_time and travel_time.lower() != "anytime":
+            filters.travel_season = travel_time
+        travel_month = parse_month(selections.get("travel_month") or "")
+        if travel_month:
+            filters.travel_month = travel_month
+
         # Apply filters
         recommended = self.filter_packages(packages, filters)
 
         # Sort by relevance (price for now, could be more sophisticated)
         recommended.sort(key=lambda p: p.price)
 
+        (RECOMMENDATION_HIT if recommended else RECOMMENDATION_EMPTY).inc()
+        RECOMMENDED_PACKAGES.inc(len(recommended))
         return recommended
 
     def calculate_match_score(
@@ -185,6 +215,13 @@ class RecommendationService:
                 elif package.price < min_b:
                     score += 1  # Under budget is still good
 
+        # Travel time match (weight: 1)
+        travel_time = selections.get("travel_time")
+        if travel_time and travel_time.lower() != "anytime":
+            total_weight += 1
+            if package.month_mask & season_mask([travel_time]):
+                score += 1
+
         if total_weight == 0:
             return 1.0  # No criteria, everything matches
 
@@ -0,0 +1,173 @@
+"""Background job queue for debounced RAG index rebuilds."""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Optional
+
+from ..config import get_settings
+
+# Rebuild callable: receives a progress callback (done, total), returns documents indexed
+RebuildFn = Callable[[Callable[[int, int], None]], int]
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    """Format a unix timestamp for API responses."""
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+class ReindexJob:
+    """A single (possibly coalesced) rebuild request."""
+
+    MAX_REASONS = 20
+
+    def __init__(self, reason: str, run_at: float, deadline: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.status = "queued"
+        self.reasons = [reason]
+        self.requests = 1
+        self.queued_at = time.time()
+        self.run_at = run_at
+        self.deadline = deadline
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = 0
+        self.total = 0
+        self.documents: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """Job status for the API."""
+        wait_ms = duration_ms = docs_per_second = None
+        if self.started_at:
+            wait_ms = round((self.started_at - self.queued_at) * 1000, 1)
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            duration_ms = round(elapsed * 1000, 1)
+            if elapsed > 0:
+                docs_per_second = round(self.done / elapsed, 1)
+        return {
+            "id": self.id,
+            "status": self.status,
+            "reasons": self.reasons,
+            "requests": self.requests,
+            "progress": {"done": self.done, "total": self.total},
+            "documents": self.documents,
+            "queued_at": _isoformat(self.queued_at),
+            "started_at": _isoformat(self.started_at),
+            "finished_at": _isoformat(self.finished_at),
+            "wait_ms": wait_ms,
+            "duration_ms": duration_ms,
+            "docs_per_second": docs_per_second,
+            "error": self.error,
+        }
+
+
+class ReindexQueue:
+    """Coalesces rebuild requests and runs them one at a time on a worker thread.
+
+    A request made while a job is still queued joins that job instead of
+    creating a new one. The queued job starts once no request has arrived
+    for ``debounce_seconds``, but never later than ``max_delay_seconds``
+    after it was first queued. A request that arrives while a job is running
+    queues a follow-up job, so that job covers writes made during the
+    rebuild.
+    """
+
+    def __init__(
+        self,
+        rebuild: Optional[RebuildFn] = None,
+        debounce_seconds: Optional[float] = None,
+        max_delay_seconds: Optional[float] = None,
+        history: int = 100,
+    ):
+        settings = get_settings()
+        self._rebuild = rebuild
+        self.debounce_seconds = (
+            settings.rag_reindex_debounce_seconds if debounce_seconds is None else debounce_seconds
+        )
+        self.max_delay_seconds = (
+            settings.rag_reindex_max_delay_seconds if max_delay_seconds is None else max_delay_seconds
+        )
+        self._history = history
+        self._jobs: OrderedDict[str, ReindexJob] = OrderedDict()
+        self._pending: Optional[ReindexJob] = None
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+    def _get_rebuild(self) -> RebuildFn:
+        """Default to rebuilding the RAG service index."""
+        if self._rebuild is None:
+            from .rag_service import rag_service
+
+            self._rebuild = rag_service.rebuild
+        return self._rebuild
+
+    def request_rebuild(self, reason: str) -> ReindexJob:
+        """Queue a rebuild, or join the one already waiting to run."""
+        with self._condition:
+            now = time.time()
+            job = self._pending
+            if job is None:
+                job = ReindexJob(reason, now + self.debounce_seconds, now + self.max_delay_seconds)
+                self._pending = job
+                self._jobs[job.id] = job
+                while len(self._jobs) > self._history:
+                    self._jobs.popitem(last=False)
+            else:
+                job.requests += 1
+                if len(job.reasons) < ReindexJob.MAX_REASONS:
+                    job.reasons.append(reason)
+                job.run_at = min(now + self.debounce_seconds, job.deadline)
+
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="reindex-worker", daemon=True)
+                self._worker.start()
+            self._condition.notify()
+            return job
+
+    def get(self, job_id: str) -> Optional[ReindexJob]:
+        """Look up a recent job."""
+        return self._jobs.get(job_id)
+
+    def recent(self) -> list[ReindexJob]:
+        """Recent jobs, newest first."""
+        return list(reversed(self._jobs.values()))
+
+    def _next_job(self) -> ReindexJob:
+        """Block until the pending job's debounce window has passed."""
+        with self._condition:
+            while True:
+                job = self._pending
+                if job is None:
+                    self._condition.wait()
+                    continue
+                delay = job.run_at - time.time()
+                if delay <= 0:
+                    self._pending = None
+                    job.status = "running"
+                    job.started_at = time.time()
+                    return job
+                self._condition.wait(timeout=delay)
+
+    def _run(self) -> None:
+        """Worker loop: run jobs one at a time."""
+        while True:
+            job = self._next_job()
+
+            def progress(done: int, total: int) -> None:
+                job.done, job.total = done, total
+
+            try:
+                job.documents = self._get_rebuild()(progress)
+                job.status = "succeeded"
+            except Exception as e:
+                print(f"Error rebuilding RAG index: {e}")
+                job.status = "failed"
+                job.error = str(e)
+            job.finished_at = time.time()
+
+
+# Singleton instance
+reindex_queue = ReindexQueue()
@@ -1,32 +1,89 @@
-"""Google Sheets integration service."""
+"""Package catalog service, backed by Google Sheets or a local file."""
 
+import asyncio
 import base64
 import json
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Optional
 
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-
 from ..config import get_settings
 from ..models.schemas import Package
+from .catalog_snapshot import CatalogSnapshot, create_snapshot_store
+from .metrics import metrics
+from .package_parser import COLUMN_DEFAULTS, PackageParser, ParseReport, normalize_header
+from .package_sources import FileSource, PackageSource
+from .profiling import add_span, span
 
+FETCH_SECONDS = metrics.histogram(
+    "sheets_fetch_duration_seconds", "Google Sheets values request duration", ("outcome",)
+)
+CACHE_LOOKUPS = metrics.counter("sheets_cache_requests", "Package cache lookups", ("result",))
+CACHE_HIT = CACHE_LOOKUPS.labels("hit")
+CACHE_MISS = CACHE_LOOKUPS.labels("miss")
+CACHE_DEMO = CACHE_LOOKUPS.labels("demo")
+CACHE_STALE = CACHE_LOOKUPS.labels("stale")
+
+# google-api-python-client's sheets v4 discovery document cut down to the
+# spreadsheets.get (sheet sizes only), values.get and values.batchGet methods;
+# processing the full 300 KB document costs about a quarter of a second on
+# the first request
+DISCOVERY_DOCUMENT = Path(__file__).parent.parent / "data" / "sheets_v4_discovery.json"
+
+
+def build_sheets_client(**kwargs):
+    """Sheets v4 client built from the bundled discovery document (kwargs go to ``build_from_document``)."""
+    # Imported on first use so cold starts don't pay for the Google API client
+    from googleapiclient.discovery import build_from_document
+
+    return build_from_document(DISCOVERY_DOCUMENT.read_text(), **kwargs)
+
+
+def _column_letter(index: int) -> str:
+    """A1 column letters for a zero-based column index."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def _column_runs(headers: list[str]) -> list[tuple[int, int]]:
+    """Inclusive spans of adjacent columns whose headers are package fields."""
+    runs: list[tuple[int, int]] = []
+    for i, header in enumerate(headers):
+        # Any other column in A:P is left out of the block requests
+        if normalize_header(header) not in COLUMN_DEFAULTS:
+            continue
+        if runs and runs[-1][1] == i - 1:
+            runs[-1] = (runs[-1][0], i)
+        else:
+            runs.append((i, i))
+    return runs
 
-class SheetsService:
-    """Service for fetching data from Google Sheets."""
 
+class SheetsSource(PackageSource):
+    """The catalog sheet, read through the Sheets v4 values API."""
+
+    name = "sheets"
     SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
 
     def __init__(self):
+        super().__init__()
         self._service = None
-        self._cache: Optional[list[Package]] = None
-        self._cache_time: float = 0
         self._settings = get_settings()
 
     def _get_service(self):
         """Get or create Google Sheets API service."""
         if self._service is None:
             try:
+                from google.oauth2.service_account import Credentials
+
+                from .google_http import google_http
+
                 # Decode base64 service account key
                 key_json = base64.b64decode(self._settings.google_service_account_key)
                 key_dict = json.loads(key_json)
@@ -34,113 +91,329 @@ class SheetsService:
                 credentials = Credentials.from_service_account_info(
                     key_dict, scopes=self.SCOPES
                 )
-                self._service = build("sheets", "v4", credentials=credentials)
+                # One pooled transport, safe to share with the block fetch threads
+                self._service = build_sheets_client(http=google_http(credentials))
             except Exception as e:
                 print(f"Error initializing Sheets service: {e}")
                 return None
         return self._service
 
-    def _parse_list(self, value: str) -> list[str]:
-        """Parse a comma-separated or newline-separated string into a list."""
-        if not value:
-            return []
-        # Handle both comma and newline separators
-        items = value.replace("\n", ",").split(",")
-        return [item.strip() for item in items if item.strip()]
+    def configured(self) -> bool:
+        """Whether a sheet ID and service account key are set."""
+        return bool(self._settings.google_sheets_id and self._settings.google_service_account_key)
+
+    def available(self) -> bool:
+        """Whether the Sheets client could be built."""
+        return self._get_service() is not None
+
+    def is_stale(self, loaded_at: float, loaded_version: Optional[tuple[int, int]]) -> bool:
+        """Whether the cache TTL has passed since ``loaded_at``; the sheet has no version."""
+        return time.time() - loaded_at >= self._settings.cache_ttl_seconds
+
+    def fetch(self) -> Optional[list[Package]]:
+        """Fetch and parse the sheet."""
+        return self._fetch_packages(self._get_service())
 
-    def _parse_package(self, row: list, headers: list[str]) -> Optional[Package]:
-        """Parse a row into a Package object."""
+    def _execute(self, request) -> dict:
+        """Execute a Sheets API request, timing it."""
+        fetch_start = time.perf_counter()
         try:
-            # Create a dict from headers and row values
-            data = {}
-            for i, header in enumerate(headers):
-                data[header.lower().replace(" ", "_")] = row[i] if i < len(row) else ""
-
-            # Parse group size (format: "2-8" or "2")
-            group_size = data.get("group_size", "1-10")
-            if "-" in str(group_size):
-                parts = str(group_size).split("-")
-                group_min = int(parts[0])
-                group_max = int(parts[1])
-            else:
-                group_min = group_max = int(group_size) if group_size else 1
-
-            return Package(
-                id=str(data.get("id", "")),
-                name=str(data.get("name", "")),
-                region=str(data.get("region", "Both")),
-                type=str(data.get("type", "Mixed")),
-                duration=int(data.get("duration", 1)),
-                price=float(data.get("price", 0)),
-                group_size_min=group_min,
-                group_size_max=group_max,
-                description=str(data.get("description", "")),
-                highlights=self._parse_list(str(data.get("highlights", ""))),
-                itinerary=self._parse_list(str(data.get("itinerary", ""))),
-                inclusions=self._parse_list(str(data.get("inclusions", ""))),
-                exclusions=self._parse_list(str(data.get("exclusions", ""))),
-                image_url=str(data.get("image_url", "")),
-                gallery=self._parse_list(str(data.get("gallery", ""))),
-                season=self._parse_list(str(data.get("season", "All"))),
-                status=str(data.get("status", "Active")),
-            )
-        except Exception as e:
-            print(f"Error parsing package row: {e}")
-            return None
+            result = request.execute()
+        except Exception:
+            FETCH_SECONDS.labels("error").observe(time.perf_counter() - fetch_start)
+            raise
+        FETCH_SECONDS.labels("ok").observe(time.perf_counter() - fetch_start)
+        return result
 
-    def get_packages(self, force_refresh: bool = False) -> list[Package]:
-        """Get all packages from Google Sheets with caching."""
-        current_time = time.time()
-        cache_valid = (
-            self._cache is not None
-            and (current_time - self._cache_time) < self._settings.cache_ttl_seconds
-        )
+    def _get_ranges(self, service, ranges: list[str]) -> list[list[list[str]]]:
+        """Rows of each A1 range, in one batchGet request."""
+        result = self._execute(service.spreadsheets().values().batchGet(
+            spreadsheetId=self._settings.google_sheets_id,
+            ranges=ranges,
+            fields="valueRanges(values)",
+        ))
+        return [value_range.get("values", []) for value_range in result.get("valueRanges", [])]
 
-        if cache_valid and not force_refresh:
-            return self._cache
+    def _get_row_count(self, service) -> int:
+        """Rows in the grid of the first visible sheet, the one A1 ranges without a sheet name read."""
+        result = self._execute(service.spreadsheets().get(
+            spreadsheetId=self._settings.google_sheets_id,
+            fields="sheets(properties(hidden,gridProperties(rowCount)))",
+        ))
+        for sheet in result.get("sheets", []):
+            properties = sheet.get("properties", {})
+            if not properties.get("hidden"):
+                return properties.get("gridProperties", {}).get("rowCount", 0)
+        return 0
 
-        service = self._get_service()
-        if service is None:
-            # Return demo packages if sheets not configured
-            return self._get_demo_packages()
+    def _get_block(self, service, runs: list[tuple[int, int]], first_row: int, last_row: int) -> list[list[str]]:
+        """Rows ``first_row`` to ``last_row`` of the given column spans, stitched back together."""
+        ranges = [f"{_column_letter(a)}{first_row}:{_column_letter(b)}{last_row}" for a, b in runs]
+        parts = self._get_ranges(service, ranges)
+        if len(parts) == 1:
+            return parts[0]
+        # Each span omits its own trailing empty rows and cells, so pad before joining
+        rows = []
+        for i in range(max((len(part) for part in parts), default=0)):
+            row = []
+            for (a, b), part in zip(runs, parts):
+                cells = part[i] if i < len(part) else []
+                row.extend(cells)
+                row.extend([""] * (b - a + 1 - len(cells)))
+            rows.append(row)
+        return rows
 
-        try:
-            sheet = service.spreadsheets()
-            result = sheet.values().get(
-                spreadsheetId=self._settings.google_sheets_id,
-                range="A:P"  # All columns
-            ).execute()
+    def _fetch_packages(self, service) -> Optional[list[Package]]:
+        """Fetch the sheet and parse its active packages; None if the sheet is empty.
 
-            values = result.get("values", [])
+        The first block, with the header row, is requested together with the
+        sheet's row count: the values API leaves out trailing empty rows, so
+        a short block doesn't mean the sheet ends there. A sheet that fits in
+        the first block costs those two requests, sent in parallel. Larger
+        sheets are read up to the row count in further blocks of
+        ``sheets_block_rows``, up to ``sheets_fetch_concurrency`` in flight,
+        requesting only the package columns; each block is parsed as soon as
+        it and those before it have arrived.
+        """
+        block_rows = self._settings.sheets_block_rows
+        concurrency = max(1, self._settings.sheets_fetch_concurrency)
+        packages: list[Package] = []
+        report = ParseReport()
+        with ThreadPoolExecutor(concurrency, thread_name_prefix="sheets-block") as pool:
+            fetch_start = time.perf_counter()
+            try:
+                if block_rows > 0:
+                    row_count = pool.submit(self._get_row_count, service)
+                    values = self._get_ranges(service, [f"A1:P{block_rows + 1}"])[0]
+                    last_row = row_count.result()
+                else:
+                    values = self._get_ranges(service, ["A:P"])[0]
+                    last_row = len(values)
+            finally:
+                add_span("sheets", time.perf_counter() - fetch_start)
             if not values:
-                return self._get_demo_packages()
+                return None
 
             headers = values[0]
-            packages = []
+            packages.extend(PackageParser(headers).parse(values[1:], 2, report))
+
+            runs = _column_runs(headers)
+            if block_rows > 0 and last_row > block_rows + 1 and runs:
+                parser = PackageParser([headers[i] for a, b in runs for i in range(a, b + 1)])
+                next_row = block_rows + 2
+                blocks_start = time.perf_counter()
+                pending = deque()
+
+                def submit() -> None:
+                    nonlocal next_row
+                    block_end = min(next_row + block_rows - 1, last_row)
+                    future = pool.submit(self._get_block, service, runs, next_row, block_end)
+                    pending.append((next_row, future))
+                    next_row = block_end + 1
+
+                while next_row <= last_row and len(pending) < concurrency:
+                    submit()
+                try:
+                    while pending:
+                        first_row, future = pending.popleft()
+                        packages.extend(parser.parse(future.result(), first_row, report))
+                        if next_row <= last_row:
+                            submit()
+                finally:
+                    # After a failed block, those not yet sent are dropped
+                    for _, future in pending:
+                        future.cancel()
+                    add_span("sheets_blocks", time.perf_counter() - blocks_start)
+
+        self.parse_report = report
+        if report.invalid:
+            print(f"Skipped invalid package rows: {report.summary()}")
+        # If no active packages found but sheet was accessible, return empty (not demo)
+        if not packages:
+            print("No active packages found in Google Sheet")
+        return packages
+
+
+SOURCES = {
+    SheetsSource.name: SheetsSource,
+    FileSource.name: FileSource,
+}
 
-            for row in values[1:]:
-                package = self._parse_package(row, headers)
-                if package and package.status.lower() == "active":
-                    packages.append(package)
 
-            self._cache = packages
-            self._cache_time = current_time
+def create_package_source(name: Optional[str] = None) -> PackageSource:
+    """Create the configured catalog source."""
+    name = name or get_settings().catalog_source
+    if name not in SOURCES:
+        raise ValueError(f"Unknown catalog source: {name}")
+    return SOURCES[name]()
 
-            # If no active packages found but sheet was accessible, return empty (not demo)
-            if not packages:
-                print("No active packages found in Google Sheet")
+
+class SheetsService:
+    """Serves the package catalog from a cache filled by a ``PackageSource``.
+
+    The source is Google Sheets, refreshed after ``cache_ttl_seconds``, or a
+    local CSV/TSV file, reloaded when it changes. Demo packages are served
+    when the source isn't set up.
+
+    With catalog snapshots enabled, the cache is shared by every worker: the
+    worker that wins the refresh lock fetches the catalog and publishes a new
+    snapshot, and the others adopt it instead of fetching their own copy
+    (serving their current catalog while a refresh is in progress).
+    """
+
+    def __init__(self, source: Optional[PackageSource] = None):
+        self._source = source or create_package_source()
+        self.parse_report: Optional[ParseReport] = None  # From the last fetch by this worker
+        self._cache: Optional[list[Package]] = None
+        self._cache_time: float = 0
+        self._cache_version: Optional[tuple[int, int]] = None  # Source version the cache was read from
+        self._demo_packages: Optional[list[Package]] = None
+        self._catalog_version = 0
+        self._snapshots = create_snapshot_store(self._source.snapshot_key)
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._refresh: Optional[asyncio.Future] = None  # Background get_packages for async callers
+
+    @property
+    def catalog_version(self) -> int:
+        """Incremented whenever a new package list is loaded, so derived data can be rebuilt."""
+        return self._catalog_version
+
+    def warm_up(self) -> bool:
+        """Set up the catalog source (the Sheets client) and prime the package cache."""
+        available = self._source.available()
+        self.get_packages()
+        return available
+
+    def _fetch(self) -> Optional[list[Package]]:
+        """Load the catalog from the source."""
+        CACHE_MISS.inc()
+        packages = self._source.fetch()
+        self.parse_report = self._source.parse_report
+        return packages
+
+    def _adopt(self, snapshot: CatalogSnapshot) -> None:
+        """Make a published snapshot this worker's cached catalog."""
+        if self._snapshot is not None and self._snapshot.version == snapshot.version:
+            return
+        with span("snapshot"):
+            self._cache = snapshot.packages()
+        self._cache_time = snapshot.published_at
+        self._cache_version = snapshot.source_version
+        self._snapshot = snapshot
+        self._catalog_version += 1
+
+    def _refresh_shared(self, force_refresh: bool, started: float) -> Optional[list[Package]]:
+        """Refresh the shared catalog, or leave it to the worker already refreshing it."""
+        # Wait for the other worker only if there is nothing to serve meanwhile
+        blocking = force_refresh or self._cache is None
+        with self._snapshots.refresh_lock(blocking) as held:
+            if not held:
+                CACHE_STALE.inc()
+                return self._cache
+            # Another worker may have published while this one waited for the lock
+            snapshot = self._snapshots.current()
+            if (
+                snapshot is not None
+                and snapshot.published_at >= started
+                and not self._source.is_stale(snapshot.published_at, snapshot.source_version)
+            ):
+                self._adopt(snapshot)
+                CACHE_HIT.inc()
+                return self._cache
+            packages = self._fetch()
+            if packages is None:
+                return None
+            self._adopt(self._snapshots.publish(packages, self._source.loaded_version))
+            return packages
+
+    def get_packages(self, force_refresh: bool = False) -> list[Package]:
+        """Get all packages from the catalog source with caching."""
+        current_time = time.time()
+        if self._snapshots is not None:
+            snapshot = self._snapshots.current()
+            if snapshot is not None:
+                self._adopt(snapshot)
+        cache_valid = self._cache is not None and not self._source.is_stale(self._cache_time, self._cache_version)
+
+        if cache_valid and not force_refresh:
+            CACHE_HIT.inc()
+            return self._cache
+
+        if not self._source.available():
+            # Return demo packages if the source is not configured
+            CACHE_DEMO.inc()
+            return self._get_demo_packages()
+
+        try:
+            if self._snapshots is not None:
+                packages = self._refresh_shared(force_refresh, current_time)
+            else:
+                packages = self._fetch()
+                if packages is not None:
+                    self._cache = packages
+                    self._cache_time = current_time
+                    self._cache_version = self._source.loaded_version
+                    self._catalog_version += 1
+            if packages is None:
+                return self._get_demo_packages()
             return packages
 
         except Exception as e:
-            print(f"Error fetching from sheets: {e}")
-            # Only return demo packages if sheets is not configured
-            if not self._settings.google_sheets_id or not self._settings.google_service_account_key:
+            print(f"Error fetching packages from {self._source.name}: {e}")
+            # Only return demo packages if the source is not configured
+            if not self._source.configured():
                 return self._get_demo_packages()
             # If configured but error occurred, return empty to indicate issue
             return []
 
+    def _cache_current(self) -> bool:
+        """Whether the cache can be served without reloading it or adopting a newer snapshot."""
+        if self._cache is None or self._source.is_stale(self._cache_time, self._cache_version):
+            return False
+        if self._snapshots is None:
+            return True
+        return self._snapshot is not None and self._snapshot.version == self._snapshots.published_version()
+
+    async def get_packages_async(self, force_refresh: bool = False) -> list[Package]:
+        """``get_packages`` for async handlers; loads and retries run in a thread.
+
+        A current cache is returned directly. An out-of-date one is served
+        while a single background refresh replaces it; with nothing cached
+        yet, callers wait for that refresh. A forced refresh always waits.
+        """
+        if force_refresh:
+            return await asyncio.to_thread(self.get_packages, True)
+        if self._cache_current():
+            CACHE_HIT.inc()
+            return self._cache
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(asyncio.to_thread(self.get_packages))
+        if self._cache is not None:
+            CACHE_STALE.inc()
+            return self._cache
+        return await asyncio.shield(self._refresh)
+
+    def cached_json(self, packages: list[Package]) -> Optional[memoryview]:
+        """The shared snapshot's JSON rendering of ``packages``, if they came from it."""
+        if self._snapshot is not None and packages is self._cache:
+            return self._snapshot.body
+        return None
+
+    def cache_age(self) -> Optional[float]:
+        """Seconds since the package cache was filled, or None if it is empty."""
+        if self._cache is None:
+            return None
+        return time.time() - self._cache_time
+
     def _get_demo_packages(self) -> list[Package]:
         """Return demo packages when sheets not available."""
+        if self._demo_packages is None:
+            self._demo_packages = self._build_demo_packages()
+            self._catalog_version += 1
+        return self._demo_packages
+
+    def _build_demo_packages(self) -> list[Package]:
+        """Build the demo package list."""
         return [
             Package(
                 id="1",
@@ -261,3 +534,18 @@ class SheetsService:
 
 # Singleton instance
 sheets_service = SheetsService()
+
+metrics.gauge("sheets_cache_age_seconds", "Age of the cached package list", callback=sheets_service.cache_age)
+metrics.gauge(
+    "sheets_cached_packages", "Packages in the cache",
+    callback=lambda: len(sheets_service._cache) if sheets_service._cache is not None else None,
+)
+metrics.gauge("catalog_version", "Package catalog version in this process", callback=lambda: sheets_service.catalog_version)
+metrics.gauge(
+    "sheets_invalid_rows", "Rows rejected by the last catalog parse in this process",
+    callback=lambda: sheets_service.parse_report.invalid if sheets_service.parse_report else None,
+)
+metrics.gauge(
+    "catalog_snapshot_version", "Catalog snapshot version published to all workers",
+    callback=lambda: sheets_service._snapshots.published_version() if sheets_service._snapshots else None,
+)
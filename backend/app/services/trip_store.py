@@ -0,0 +1,315 @@
+"""Durable SQLite-backed store for custom trip requests."""
+
+import asyncio
+import base64
+import json
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator, Optional
+
+from ..config import get_settings
+from .db import open_connection
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+TRIP_FIELDS = ("id", "created_at", "status", "name", "phone", "email", "notes", "selections")
+
+
+class TripStoreHook:
+    """Extension point for writes that must commit atomically with a trip."""
+
+    def create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create the hook's tables in the trips database."""
+
+    def on_insert(self, conn: sqlite3.Connection, trip: dict) -> None:
+        """Write related rows on the trip's open transaction."""
+
+    def on_commit(self, trips: list[dict]) -> None:
+        """Called on the writer thread after trips have committed."""
+
+
+class TripStore:
+    """Custom trip requests in SQLite (WAL mode), written with group commit.
+
+    Submissions are handed to a single writer thread which commits every
+    request already waiting in one transaction, so a burst of submissions
+    costs a few fsyncs instead of one each. Connections use
+    ``synchronous=FULL``: a submission is only acknowledged once its commit
+    has been fsynced. The database file is shared, so every uvicorn worker
+    sees every request.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        max_batch: Optional[int] = None,
+        linger_ms: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self.db_path = Path(db_path or settings.trips_db_path or DATA_DIR / "custom_trips.db")
+        self.max_batch = max_batch or settings.trips_commit_max_batch
+        self.linger_seconds = (settings.trips_commit_linger_ms if linger_ms is None else linger_ms) / 1000
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready = False
+        self._queue: "queue.Queue[tuple[dict, Future]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._hooks: list[TripStoreHook] = []
+
+    def add_hook(self, hook: TripStoreHook) -> None:
+        """Register a hook whose writes share each trip's transaction."""
+        self._hooks.append(hook)
+        if self._ready:
+            hook.create_schema(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, creating the schema on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = open_connection(self.db_path, synchronous="FULL")
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    self._create_schema(conn)
+                    self._ready = True
+        return conn
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create the table and its indexes if missing."""
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS custom_trips ("
+            "id TEXT PRIMARY KEY, created_at TEXT NOT NULL, status TEXT NOT NULL, "
+            "name TEXT, phone TEXT, email TEXT, notes TEXT, selections TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_custom_trips_status ON custom_trips (status, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_custom_trips_created_at ON custom_trips (created_at)")
+        for hook in self._hooks:
+            hook.create_schema(conn)
+
+    @staticmethod
+    def _row_to_trip(row: sqlite3.Row) -> dict:
+        """Convert a table row back into a trip request dict."""
+        trip = {field: row[field] for field in TRIP_FIELDS}
+        trip["selections"] = json.loads(trip["selections"]) if trip["selections"] else {}
+        return trip
+
+    def _ensure_writer(self) -> None:
+        """Start the writer thread on first use."""
+        if self._writer is None or not self._writer.is_alive():
+            with self._init_lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._write_loop, name="trip-writer", daemon=True)
+                    self._writer.start()
+
+    def _next_batch(self) -> list[tuple[dict, Future]]:
+        """Block for one submission, then take whatever else is already queued."""
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                if self.linger_seconds:
+                    batch.append(self._queue.get(timeout=self.linger_seconds))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        # Trips are saved even if their callers have gone; from here a future can't be cancelled
+        for _, future in batch:
+            future.set_running_or_notify_cancel()
+        return batch
+
+    @staticmethod
+    def _resolve(future: Future, error: Optional[Exception] = None) -> None:
+        """Report a submission's outcome, unless its caller cancelled before it was taken."""
+        if future.cancelled():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+    def _commit(self, conn: sqlite3.Connection, trips: list[dict]) -> None:
+        """Insert trips in one transaction."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for trip in trips:
+                self._insert(conn, trip)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        for hook in self._hooks:
+            try:
+                hook.on_commit(trips)
+            except Exception as e:
+                print(f"Error in trip store commit hook: {e}")
+
+    def _write_loop(self) -> None:
+        """Writer thread: commit queued submissions in batches."""
+        while True:
+            batch = self._next_batch()
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                # Typically the database couldn't be opened: fail this batch, keep serving the queue
+                print(f"Error saving custom trip requests: {e}")
+                self._close_connection()
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _write_batch(self, batch: list[tuple[dict, Future]]) -> None:
+        """Commit a batch and resolve its futures."""
+        conn = self._connect()
+        try:
+            self._commit(conn, [trip for trip, _ in batch])
+        except Exception:
+            # One bad row must not fail its neighbours: retry individually
+            for trip, future in batch:
+                try:
+                    self._commit(conn, [trip])
+                except Exception as e:
+                    print(f"Error saving custom trip request {trip.get('id')}: {e}")
+                    self._resolve(future, e)
+                else:
+                    self._resolve(future)
+            return
+        for _, future in batch:
+            self._resolve(future)
+
+    def _close_connection(self) -> None:
+        """Drop this thread's connection, so the next use opens a fresh one."""
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def _insert(self, conn: sqlite3.Connection, trip: dict) -> None:
+        """Insert one trip and its hooks' related rows on an open transaction."""
+        conn.execute(
+            f"INSERT INTO custom_trips ({', '.join(TRIP_FIELDS)}) VALUES ({', '.join('?' for _ in TRIP_FIELDS)})",
+            tuple(
+                json.dumps(trip.get(field) or {}, ensure_ascii=False) if field == "selections" else trip.get(field)
+                for field in TRIP_FIELDS
+            ),
+        )
+        for hook in self._hooks:
+            hook.on_insert(conn, trip)
+
+    def submit(self, trip: dict) -> Future:
+        """Queue a trip for the next group commit; the future resolves once it is durable."""
+        self._ensure_writer()
+        future: Future = Future()
+        self._queue.put((trip, future))
+        return future
+
+    async def save(self, trip: dict) -> None:
+        """Persist a trip, returning once its batch has committed."""
+        await asyncio.wrap_future(self.submit(trip))
+
+    def get(self, trip_id: str) -> Optional[dict]:
+        """Look up a trip request by id."""
+        row = self._connect().execute("SELECT * FROM custom_trips WHERE id = ?", (trip_id,)).fetchone()
+        return self._row_to_trip(row) if row else None
+
+    @staticmethod
+    def encode_cursor(trip: dict) -> str:
+        """Opaque pagination cursor pointing just past a trip."""
+        raw = json.dumps([trip["created_at"], trip["id"]]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[str, str]:
+        """Decode a cursor into its (created_at, id) key; raises ValueError if malformed."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            created_at, trip_id = json.loads(raw)
+            return str(created_at), str(trip_id)
+        except Exception as e:
+            raise ValueError("Invalid cursor") from e
+
+    @staticmethod
+    def _filters(
+        status: Optional[str] = None,
+        created_from: Optional[date] = None,
+        created_to: Optional[date] = None,
+    ) -> tuple[list[str], list]:
+        """SQL conditions and parameters for the listing filters (date range is inclusive)."""
+        conditions, params = [], []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        # created_at is an ISO timestamp, so date bounds compare as strings
+        if created_from:
+            conditions.append("created_at >= ?")
+            params.append(created_from.isoformat())
+        if created_to:
+            conditions.append("created_at < ?")
+            params.append((created_to + timedelta(days=1)).isoformat())
+        return conditions, params
+
+    def list_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+        created_from: Optional[date] = None,
+        created_to: Optional[date] = None,
+        newest_first: bool = True,
+    ) -> tuple[list[dict], Optional[str]]:
+        """One page of trip requests and the cursor for the next page (None at the end).
+
+        Uses keyset pagination on (created_at, id), so every page is an index
+        range scan however deep into the listing it is.
+        """
+        conditions, params = self._filters(status, created_from, created_to)
+        if cursor:
+            created_at, trip_id = self.decode_cursor(cursor)
+            conditions.append(f"(created_at, id) {'<' if newest_first else '>'} (?, ?)")
+            params.extend([created_at, trip_id])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "DESC" if newest_first else "ASC"
+        rows = self._connect().execute(
+            f"SELECT * FROM custom_trips {where} ORDER BY created_at {order}, id {order} LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+
+        trips = [self._row_to_trip(row) for row in rows[:limit]]
+        next_cursor = self.encode_cursor(trips[-1]) if len(rows) > limit else None
+        return trips, next_cursor
+
+    def iter_trips(
+        self,
+        status: Optional[str] = None,
+        created_from: Optional[date] = None,
+        created_to: Optional[date] = None,
+        page_size: int = 500,
+    ) -> Iterator[dict]:
+        """Stream matching trip requests oldest first, one page per query."""
+        cursor = None
+        while True:
+            trips, cursor = self.list_page(page_size, cursor, status, created_from, created_to, newest_first=False)
+            yield from trips
+            if cursor is None:
+                return
+
+    def count(
+        self,
+        status: Optional[str] = None,
+        created_from: Optional[date] = None,
+        created_to: Optional[date] = None,
+    ) -> int:
+        """Number of trip requests matching the filters."""
+        conditions, params = self._filters(status, created_from, created_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._connect().execute(f"SELECT COUNT(*) FROM custom_trips {where}", params).fetchone()[0]
+
+
+# Singleton instance
+trip_store = TripStore()
@@ -0,0 +1,615 @@
+"""In-process vector indexes with optional quantized embedding storage.
+
+``VectorIndex`` scores every stored vector. ``IVFIndex`` clusters vectors
+around k-means centroids and only scores the ``nprobe`` closest clusters,
+trading a little recall for sub-linear query cost on large corpora.
+``PartitionedIndex`` keeps one sub-index per document type so filtered
+queries only score their own partition.
+"""
+
+import json
+import re
+import secrets
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+# Rows scored per block when dequantizing, keeps peak memory bounded
+SCORE_BLOCK_ROWS = 1024
+
+# Metadata fields with a row lookup table for filtered search
+FILTER_KEYS = ("region", "location")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalise vectors so inner product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """Encode float32 vectors into the storage dtype, returning codes and per-vector scales."""
+    if dtype == "float32":
+        return vectors.astype(np.float32), None
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        # Symmetric per-vector scaling: the largest component maps to +/-127
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).clip(-127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unsupported embedding dtype: {dtype}")
+
+
+def score(codes: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+    """Inner-product scores of a float32 query against stored codes, block by block."""
+    if codes.dtype == np.float32:
+        return codes @ query
+    scores = np.empty(len(codes), dtype=np.float32)
+    buffer = np.empty((min(SCORE_BLOCK_ROWS, len(codes)), codes.shape[1]), dtype=np.float32)
+    for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+        block = codes[start:start + SCORE_BLOCK_ROWS]
+        rows = len(block)
+        np.copyto(buffer[:rows], block, casting="unsafe")
+        scores[start:start + rows] = buffer[:rows] @ query
+    if scales is not None:
+        scores *= scales
+    return scores
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class VectorIndex:
+    """Exhaustive cosine-similarity index over float32, float16 or int8 vectors."""
+
+    kind = "flat"
+
+    def __init__(self, dtype: str = "float32"):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.dtype = dtype
+        self.ids: list[str] = []
+        self.documents: list[str] = []
+        self.metadatas: list[dict] = []
+        self._id_to_row: dict[str, int] = {}
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._size = 0
+        self._filter_sets: dict[tuple[str, str], set[int]] = defaultdict(set)
+        self._filter_arrays: dict[tuple[str, str], np.ndarray] = {}
+
+    def count(self) -> int:
+        """Number of indexed vectors."""
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the stored vectors and scales."""
+        total = 0 if self._codes is None else self._codes[:self._size].nbytes
+        if self._scales is not None:
+            total += self._scales[:self._size].nbytes
+        return total
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        """Grow the backing arrays geometrically so inserts stay amortised O(1)."""
+        needed = self._size + rows
+        capacity = 0 if self._codes is None else len(self._codes)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 64)
+        codes_dtype = np.dtype(self.dtype)
+        codes = np.empty((new_capacity, dim), dtype=codes_dtype)
+        if self._codes is not None:
+            codes[:self._size] = self._codes[:self._size]
+        self._codes = codes
+        if self.dtype == "int8":
+            scales = np.empty(new_capacity, dtype=np.float32)
+            if self._scales is not None:
+                scales[:self._size] = self._scales[:self._size]
+            self._scales = scales
+
+    def add(
+        self,
+        ids: list[str],
+        embeddings,
+        documents: list[str],
+        metadatas: Optional[list[dict]] = None,
+    ) -> None:
+        """Add or replace vectors; embeddings are normalised before quantizing."""
+        if not ids:
+            return
+        vectors = normalize(embeddings)
+        codes, scales = quantize(vectors, self.dtype)
+        metadatas = metadatas or [{} for _ in ids]
+        self._reserve(len(ids), vectors.shape[1])
+
+        rows = []
+        for i, doc_id in enumerate(ids):
+            row = self._id_to_row.get(doc_id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._id_to_row[doc_id] = row
+                self.ids.append(doc_id)
+                self.documents.append(documents[i])
+                self.metadatas.append(metadatas[i] or {})
+            else:
+                self._index_metadata(row, self.metadatas[row], remove=True)
+                self.documents[row] = documents[i]
+                self.metadatas[row] = metadatas[i] or {}
+            self._index_metadata(row, self.metadatas[row])
+            self._codes[row] = codes[i]
+            if scales is not None:
+                self._scales[row] = scales[i]
+            rows.append(row)
+
+        self._on_rows_added(np.asarray(rows, dtype=np.int64), vectors)
+
+    def _index_metadata(self, row: int, metadata: dict, remove: bool = False) -> None:
+        """Add or remove a row from the filter lookup tables."""
+        for key in FILTER_KEYS:
+            value = metadata.get(key)
+            if value is None:
+                continue
+            entry = (key, str(value).lower())
+            if remove:
+                self._filter_sets[entry].discard(row)
+            else:
+                self._filter_sets[entry].add(row)
+            self._filter_arrays.pop(entry, None)
+
+    def rows_matching(self, where: Optional[dict]) -> Optional[np.ndarray]:
+        """Rows whose metadata equals every given filter value, or None if unfiltered."""
+        matched = None
+        for key, value in (where or {}).items():
+            if value is None:
+                continue
+            entry = (key, str(value).lower())
+            rows = self._filter_arrays.get(entry)
+            if rows is None:
+                rows = np.fromiter(sorted(self._filter_sets.get(entry, ())), dtype=np.int64)
+                self._filter_arrays[entry] = rows
+            matched = rows if matched is None else np.intersect1d(matched, rows, assume_unique=True)
+        return matched
+
+    def _on_rows_added(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Hook for subclasses that maintain extra structure per row."""
+
+    def _candidate_rows(self, query: np.ndarray, **params) -> Optional[np.ndarray]:
+        """Rows worth scoring for a query, or None to score everything."""
+        return None
+
+    def search(
+        self,
+        query_embedding,
+        n_results: int = 5,
+        where: Optional[dict] = None,
+        **params,
+    ) -> list[tuple[int, float]]:
+        """Return (row, cosine similarity) pairs for the nearest vectors."""
+        if self._size == 0:
+            return []
+        query = normalize(query_embedding)[0]
+        rows = self._candidate_rows(query, **params)
+        allowed = self.rows_matching(where)
+        if allowed is not None:
+            # Small filtered sets are cheaper (and exact) to score directly
+            if rows is None or len(allowed) <= len(rows):
+                rows = allowed
+            else:
+                rows = np.intersect1d(rows, allowed)
+            if len(rows) == 0:
+                return []
+        if rows is None:
+            scales = None if self._scales is None else self._scales[:self._size]
+            scores = score(self._codes[:self._size], scales, query)
+            return [(int(row), float(scores[row])) for row in top_k(scores, n_results)]
+
+        scales = None if self._scales is None else self._scales[rows]
+        scores = score(self._codes[rows], scales, query)
+        return [(int(rows[i]), float(scores[i])) for i in top_k(scores, n_results)]
+
+    def result(self, row: int, similarity: float) -> dict:
+        """Format a hit like the Chroma-backed retrieval."""
+        return {
+            "id": self.ids[row],
+            "content": self.documents[row],
+            "metadata": self.metadatas[row],
+            "distance": 1.0 - similarity,
+        }
+
+    def query(self, query_embedding, n_results: int = 5, where: Optional[dict] = None, **params) -> list[dict]:
+        """Search and format results like the Chroma-backed retrieval."""
+        return [
+            self.result(row, similarity)
+            for row, similarity in self.search(query_embedding, n_results, where, **params)
+        ]
+
+    def vectors(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Dequantized float32 vectors, for training and rebuilding."""
+        codes = self._codes[:self._size] if rows is None else self._codes[rows]
+        vectors = codes.astype(np.float32)
+        if self._scales is not None:
+            scales = self._scales[:self._size] if rows is None else self._scales[rows]
+            vectors *= scales[:, None]
+        return vectors
+
+    def _extra_arrays(self) -> dict[str, np.ndarray]:
+        """Additional arrays persisted alongside the vectors."""
+        return {}
+
+    def _extra_meta(self) -> dict:
+        """Additional settings persisted alongside the documents."""
+        return {}
+
+    def _restore(self, arrays, meta: dict) -> None:
+        """Rebuild subclass state from persisted arrays and settings."""
+
+    def snapshot(self) -> tuple[dict[str, np.ndarray], dict]:
+        """Copies of the arrays and documents to persist; ``write`` them while the index keeps changing."""
+        arrays = {"codes": self._codes[:self._size] if self._codes is not None else np.empty((0, 0))}
+        if self._scales is not None:
+            arrays["scales"] = self._scales[:self._size]
+        arrays.update(self._extra_arrays())
+        meta = {
+            "kind": self.kind,
+            "dtype": self.dtype,
+            **self._extra_meta(),
+            "ids": list(self.ids),
+            "documents": list(self.documents),
+            "metadatas": [dict(metadata) for metadata in self.metadatas],
+        }
+        return {name: array.copy() for name, array in arrays.items()}, meta
+
+    @staticmethod
+    def write(directory: Path, arrays: dict[str, np.ndarray], meta: dict) -> None:
+        """Persist a snapshot to a directory.
+
+        Both files are written under unique temp names and tagged with the
+        same save id, so concurrent writers never share a temp file and
+        ``load`` rejects a vectors file paired with another save's documents.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        save_id = secrets.token_hex(8)
+        tmp_vectors = directory / f"vectors.{save_id}.tmp.npz"
+        np.savez(tmp_vectors, save_id=np.array(save_id), **arrays)
+        tmp_docs = directory / f"documents.{save_id}.tmp.json"
+        with open(tmp_docs, "w", encoding="utf-8") as f:
+            json.dump({**meta, "save_id": save_id}, f, ensure_ascii=False)
+        tmp_vectors.replace(directory / "vectors.npz")
+        tmp_docs.replace(directory / "documents.json")
+
+    def save(self, directory: Path) -> None:
+        """Persist vectors and documents to a directory."""
+        self.write(directory, *self.snapshot())
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["VectorIndex"]:
+        """Load a persisted index, or None if there isn't one."""
+        docs_path = directory / "documents.json"
+        vectors_path = directory / "vectors.npz"
+        if not docs_path.exists() or not vectors_path.exists():
+            return None
+        with open(docs_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(vectors_path) as arrays:
+            saved_with = str(arrays["save_id"]) if "save_id" in arrays else None
+        if saved_with != meta.get("save_id"):
+            # Interrupted between renaming the two files
+            return None
+        index_cls = INDEX_KINDS.get(meta.get("kind", "flat"), cls)
+        index = index_cls(dtype=meta["dtype"])
+        index.ids = meta["ids"]
+        index.documents = meta["documents"]
+        index.metadatas = meta["metadatas"]
+        index._id_to_row = {doc_id: row for row, doc_id in enumerate(index.ids)}
+        index._size = len(index.ids)
+        for row, metadata in enumerate(index.metadatas):
+            index._index_metadata(row, metadata)
+        with np.load(vectors_path) as arrays:
+            index._codes = arrays["codes"]
+            index._scales = arrays["scales"] if "scales" in arrays else None
+            index._restore(arrays, meta)
+        return index
+
+
+def kmeans(
+    vectors: np.ndarray,
+    k: int,
+    iterations: int = 20,
+    seed: int = 0,
+) -> np.ndarray:
+    """Spherical k-means on unit vectors, returning unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=k)
+        # Re-seed empty clusters from random points so every list stays useful
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()), replace=False)]
+        centroids = normalize(sums)
+    return centroids
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (by inner product) for each vector, computed in blocks."""
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+        block = vectors[start:start + SCORE_BLOCK_ROWS]
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+class IVFIndex(VectorIndex):
+    """Inverted-file index: vectors are bucketed by nearest k-means centroid.
+
+    Queries score the ``nprobe`` closest centroids' buckets only. Until the
+    index holds ``min_train_size`` vectors it searches exhaustively. Inserts
+    are assigned to their nearest existing centroid; once the index has grown
+    by ``retrain_growth`` times since the last training the centroids are
+    retrained so buckets stay balanced.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        dtype: str = "float32",
+        nlist: int = 0,
+        nprobe: int = 8,
+        min_train_size: int = 1024,
+        retrain_growth: float = 4.0,
+    ):
+        super().__init__(dtype=dtype)
+        self.nlist = nlist  # 0 picks ~sqrt(n) lists at training time
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_growth = retrain_growth
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int64)
+        self._lists: list[np.ndarray] = []
+        self._assigned_rows = 0
+        self._trained_size = 0
+
+    @property
+    def is_trained(self) -> bool:
+        """Whether centroids exist and searches are approximate."""
+        return self._centroids is not None
+
+    def train(self) -> None:
+        """(Re)compute centroids from the stored vectors and rebuild the buckets."""
+        if self._size == 0:
+            return
+        nlist = self.nlist or max(1, int(np.sqrt(self._size)))
+        vectors = self.vectors()
+        # Train on a sample; assignment below still covers every vector
+        sample_size = min(self._size, max(nlist * 64, 10000))
+        sample = vectors[np.random.default_rng(0).choice(self._size, sample_size, replace=False)]
+        self._centroids = kmeans(sample, nlist)
+        self._assignments = assign(vectors, self._centroids)
+        self._assigned_rows = self._trained_size = self._size
+        self._rebuild_lists()
+
+    def _rebuild_lists(self) -> None:
+        """Group rows by centroid into contiguous arrays."""
+        assignments = self._assignments[:self._assigned_rows]
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(len(self._centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+
+    def _on_rows_added(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Assign new rows to buckets, training or retraining when due."""
+        if not self.is_trained:
+            if self._size >= self.min_train_size:
+                self.train()
+            return
+        if self._size >= self._trained_size * self.retrain_growth:
+            self.train()
+            return
+
+        if len(self._assignments) < self._size:
+            grown = np.empty(max(self._size, len(self._assignments) * 2), dtype=np.int64)
+            grown[:self._assigned_rows] = self._assignments[:self._assigned_rows]
+            self._assignments = grown
+
+        # Replaced rows leave their old bucket before being reassigned
+        for row in rows[rows < self._assigned_rows]:
+            bucket = self._assignments[row]
+            self._lists[bucket] = self._lists[bucket][self._lists[bucket] != row]
+
+        labels = assign(vectors, self._centroids)
+        self._assignments[rows] = labels
+        self._assigned_rows = self._size
+        for bucket in np.unique(labels):
+            self._lists[bucket] = np.concatenate([self._lists[bucket], rows[labels == bucket]])
+
+    def _candidate_rows(self, query: np.ndarray, nprobe: Optional[int] = None, **params) -> Optional[np.ndarray]:
+        """Rows in the buckets whose centroids are closest to the query."""
+        if not self.is_trained:
+            return None
+        nprobe = min(nprobe or self.nprobe, len(self._centroids))
+        if nprobe >= len(self._centroids):
+            return None
+        probes = top_k(self._centroids @ query, nprobe)
+        return np.concatenate([self._lists[b] for b in probes])
+
+    def _extra_arrays(self) -> dict[str, np.ndarray]:
+        """Persist centroids and bucket assignments."""
+        if not self.is_trained:
+            return {}
+        return {"centroids": self._centroids, "assignments": self._assignments[:self._size]}
+
+    def _extra_meta(self) -> dict:
+        """Persist the tuning parameters."""
+        return {
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "min_train_size": self.min_train_size,
+            "retrain_growth": self.retrain_growth,
+            "trained_size": self._trained_size,
+        }
+
+    def _restore(self, arrays, meta: dict) -> None:
+        """Restore parameters, centroids and buckets."""
+        self.nlist = meta.get("nlist", self.nlist)
+        self.nprobe = meta.get("nprobe", self.nprobe)
+        self.min_train_size = meta.get("min_train_size", self.min_train_size)
+        self.retrain_growth = meta.get("retrain_growth", self.retrain_growth)
+        self._trained_size = meta.get("trained_size", 0)
+        if "centroids" in arrays:
+            self._centroids = arrays["centroids"]
+            self._assignments = arrays["assignments"]
+            self._assigned_rows = len(self._assignments)
+            self._rebuild_lists()
+
+
+INDEX_KINDS = {VectorIndex.kind: VectorIndex, IVFIndex.kind: IVFIndex}
+
+
+class PartitionedIndex:
+    """One sub-index per value of a metadata key (the document type by default).
+
+    Partition names are lowercased, so selecting partitions ignores case
+    like the metadata filters do.
+    """
+
+    def __init__(self, factory: Callable[[], VectorIndex], partition_key: str = "type"):
+        self._factory = factory
+        self.partition_key = partition_key
+        self.partitions: dict[str, VectorIndex] = {}
+        template = factory()
+        self.kind = template.kind
+        self.dtype = template.dtype
+
+    def count(self) -> int:
+        """Number of indexed vectors across all partitions."""
+        return sum(index.count() for index in self.partitions.values())
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the stored vectors of all partitions."""
+        return sum(index.nbytes for index in self.partitions.values())
+
+    def add(
+        self,
+        ids: list[str],
+        embeddings,
+        documents: list[str],
+        metadatas: Optional[list[dict]] = None,
+    ) -> set[str]:
+        """Route vectors to their partitions, returning the partitions touched."""
+        if not ids:
+            return set()
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        metadatas = metadatas or [{} for _ in ids]
+        groups: dict[str, list[int]] = defaultdict(list)
+        for i, metadata in enumerate(metadatas):
+            groups[str((metadata or {}).get(self.partition_key, "other")).lower()].append(i)
+
+        for name, positions in groups.items():
+            index = self.partitions.get(name)
+            if index is None:
+                index = self.partitions[name] = self._factory()
+            index.add(
+                [ids[i] for i in positions],
+                embeddings[positions],
+                [documents[i] for i in positions],
+                [metadatas[i] for i in positions],
+            )
+        return set(groups)
+
+    def query(
+        self,
+        query_embedding,
+        n_results: int = 5,
+        partitions: Optional[list[str]] = None,
+        where: Optional[dict] = None,
+        **params,
+    ) -> list[dict]:
+        """Search the selected partitions (all by default) and merge the best hits."""
+        if partitions:
+            names = {p.lower() for p in partitions} & self.partitions.keys()
+        else:
+            names = self.partitions.keys()
+        hits = []
+        for name in names:
+            index = self.partitions[name]
+            for row, similarity in index.search(query_embedding, n_results, where, **params):
+                hits.append((similarity, index, row))
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [index.result(row, similarity) for similarity, index, row in hits[:n_results]]
+
+    @staticmethod
+    def _partition_dir(directory: Path, name: str) -> Path:
+        """Filesystem-safe directory for a partition."""
+        return directory / re.sub(r"[^A-Za-z0-9_-]", "_", name)
+
+    def snapshot(self, partitions: Optional[set[str]] = None) -> dict:
+        """Copies of all partitions, or only the given ones, plus the manifest, for ``write``."""
+        names = self.partitions.keys() if partitions is None else set(partitions) & self.partitions.keys()
+        return {
+            "partitions": {name: self.partitions[name].snapshot() for name in names},
+            "manifest": {
+                "kind": self.kind,
+                "dtype": self.dtype,
+                "partition_key": self.partition_key,
+                "partitions": sorted(self.partitions),
+            },
+        }
+
+    @classmethod
+    def write(cls, directory: Path, snapshot: dict) -> None:
+        """Persist a snapshot's partitions, then its manifest."""
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, (arrays, meta) in snapshot["partitions"].items():
+            VectorIndex.write(cls._partition_dir(directory, name), arrays, meta)
+        tmp_manifest = directory / f"partitions.{secrets.token_hex(8)}.tmp.json"
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump(snapshot["manifest"], f)
+        tmp_manifest.replace(directory / "partitions.json")
+
+    def save(self, directory: Path, partitions: Optional[set[str]] = None) -> None:
+        """Persist all partitions, or only the given ones, plus the manifest."""
+        self.write(directory, self.snapshot(partitions))
+
+    @classmethod
+    def load(cls, directory: Path, factory: Callable[[], VectorIndex]) -> Optional["PartitionedIndex"]:
+        """Load persisted partitions, or None if there are none."""
+        manifest_path = directory / "partitions.json"
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        index = cls(factory, partition_key=manifest["partition_key"])
+        index.kind = manifest["kind"]
+        index.dtype = manifest["dtype"]
+        for name in manifest["partitions"]:
+            partition = VectorIndex.load(cls._partition_dir(directory, name))
+            if partition is None:
+                return None
+            index.partitions[name] = partition
+        return index
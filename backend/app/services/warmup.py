@@ -0,0 +1,86 @@
+"""Background warm-up of slow-to-initialise service clients."""
+
+import asyncio
+import time
+from typing import Callable, Optional
+
+
+class WarmupTracker:
+    """Runs registered warm-up hooks in the background and tracks readiness."""
+
+    PENDING = "pending"
+    WARMING = "warming"
+    READY = "ready"
+    UNAVAILABLE = "unavailable"  # Warmed up, but the service will use its fallback
+    FAILED = "failed"
+    SKIPPED = "skipped"  # Warm-up disabled; initialised on first use instead
+
+    def __init__(self):
+        self._hooks: dict[str, Callable[[], bool]] = {}
+        self._components: dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, warm_up: Callable[[], bool]) -> None:
+        """Register a blocking warm-up hook returning whether the component is usable."""
+        self._hooks[name] = warm_up
+        self._components[name] = {"status": self.PENDING, "duration_ms": None, "error": None}
+
+    def start(self) -> asyncio.Task:
+        """Schedule warm-up of all registered components on the running loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def skip(self) -> None:
+        """Mark components not yet warmed as skipped, so readiness doesn't wait for them."""
+        for component in self._components.values():
+            if component["status"] == self.PENDING:
+                component["status"] = self.SKIPPED
+
+    async def stop(self) -> None:
+        """Cancel warm-up if it is still running."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        """Warm every component concurrently, each in a worker thread."""
+        # Yield first so the server finishes startup and accepts connections
+        await asyncio.sleep(0)
+        await asyncio.gather(*(self._warm(name) for name in self._hooks))
+
+    async def _warm(self, name: str) -> None:
+        """Run one warm-up hook off the event loop and record the outcome."""
+        component = self._components[name]
+        component["status"] = self.WARMING
+        start = time.perf_counter()
+        try:
+            usable = await asyncio.to_thread(self._hooks[name])
+            component["status"] = self.READY if usable else self.UNAVAILABLE
+        except Exception as e:
+            print(f"Error warming up {name}: {e}")
+            component["status"] = self.FAILED
+            component["error"] = str(e)
+        component["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    @property
+    def is_ready(self) -> bool:
+        """True once every component has finished warming up, whatever the outcome."""
+        return all(
+            c["status"] not in (self.PENDING, self.WARMING)
+            for c in self._components.values()
+        )
+
+    def status(self) -> dict:
+        """Get per-component readiness."""
+        return {
+            "ready": self.is_ready,
+            "components": {name: dict(c) for name, c in self._components.items()},
+        }
+
+
+# Singleton instance
+warmup_tracker = WarmupTracker()
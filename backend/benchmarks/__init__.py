@@ -0,0 +1,4 @@
+"""Benchmarks for the NZ Tours API.
+
+Run from the backend directory, e.g. ``python -m benchmarks.bench_quantization``.
+"""
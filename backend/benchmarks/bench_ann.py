@@ -0,0 +1,62 @@
+"""Recall/latency trade-off of the IVF index against exhaustive search.
+
+    python -m benchmarks.bench_ann --size 50000 --nprobe 1 4 8 16 32
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.vector_index import IVFIndex, VectorIndex
+
+from .bench_quantization import synthetic_corpus
+
+
+def timed_search(index, queries: np.ndarray, k: int, **params) -> tuple[list[set], list[float]]:
+    """Run every query, returning result row sets and per-query latency in ms."""
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, k, **params)
+        timings.append((time.perf_counter() - start) * 1000)
+        results.append({row for row, _ in hits})
+    return results, timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dtype", default="float32")
+    parser.add_argument("--nlist", type=int, default=0)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    corpus, queries = synthetic_corpus(args.size, args.queries)
+    ids = [str(i) for i in range(len(corpus))]
+    docs = [""] * len(corpus)
+
+    flat = VectorIndex(dtype=args.dtype)
+    flat.add(ids, corpus, docs)
+    baseline, flat_ms = timed_search(flat, queries, args.k)
+
+    start = time.perf_counter()
+    ivf = IVFIndex(dtype=args.dtype, nlist=args.nlist)
+    ivf.add(ids, corpus, docs)
+    build_s = time.perf_counter() - start
+
+    print(f"{args.size} vectors ({args.dtype}), {args.queries} queries, k={args.k}")
+    print(f"IVF trained with {len(ivf._centroids)} lists in {build_s:.2f}s")
+    print(f"{'search':<12} {'mean ms':>9} {'p95 ms':>8} {'recall@k':>9}")
+    print(f"{'flat':<12} {np.mean(flat_ms):>9.3f} {np.percentile(flat_ms, 95):>8.3f} {1.0:>9.4f}")
+    for nprobe in args.nprobe:
+        results, timings = timed_search(ivf, queries, args.k, nprobe=nprobe)
+        recall = np.mean([len(r & b) / max(len(b), 1) for r, b in zip(results, baseline)])
+        label = f"nprobe={nprobe}"
+        print(f"{label:<12} {np.mean(timings):>9.3f} {np.percentile(timings, 95):>8.3f} {recall:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""Load test of the API against local Google Sheets and Gemini stand-ins.
+
+Runs a fake Sheets server in this process and the API under uvicorn in a
+subprocess with the fake Gemini model installed, then drives a weighted mix
+of scripted requests from client threads and reports throughput and
+p50/p95/p99 latency per endpoint. Pass ``--url`` to load an already running
+server instead (the fakes are then not used). With ``--workers`` the API runs
+as several uvicorn worker processes sharing one catalog snapshot; the fake
+Sheets request count shows whether they still fetch it only once per TTL.
+``--catalog-file`` serves the catalog from a local CSV file instead of the
+fake Sheets server.
+
+    python -m benchmarks.bench_load --duration 30 --concurrency 16 \\
+        --packages 500 --sheets-latency-ms 150 --gemini-latency-ms 800 --gemini-error-rate 0.02
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+DEFAULT_MIX = "chat_flow=3,chat_ai=1,packages=3,filter=2,custom_trip=1"
+
+AI_QUESTIONS = [
+    "What's the weather like in Queenstown in July?",
+    "Which tours run in December?",
+    "Do I need a visa to visit New Zealand?",
+    "What's the best time to see whales in Kaikoura?",
+    "Can you recommend a food and wine trip for a couple?",
+]
+
+FLOW_CHOICES = [
+    ["browse", "custom"],
+    ["north", "south", "both", "recommend"],
+    ["adventure", "culture", "nature", "food", "mixed"],
+    ["short", "week", "two_weeks", "flexible"],
+    ["budget", "mid", "premium", "luxury"],
+    ["solo", "couple", "small", "large"],
+    ["summer", "autumn", "winter", "spring", "anytime"],
+]
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class Client:
+    """One keep-alive connection recording (endpoint, seconds, ok, finished at) samples."""
+
+    def __init__(self, host: str, port: int, samples: list, timeout: float = 60):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.samples = samples
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def request(self, name: str, method: str, path: str, body: Optional[dict] = None) -> Optional[dict]:
+        """Send a request, returning the JSON response if it succeeded."""
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        start = time.perf_counter()
+        try:
+            self._conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+            response = self._conn.getresponse()
+            data = response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            self._conn.close()
+            self._conn = None
+            data, ok = b"", False
+        end = time.perf_counter()
+        self.samples.append((name, end - start, ok, end))
+        return json.loads(data) if ok and data else None
+
+
+# Scripted user journeys
+
+def chat_flow(client: Client, rng: random.Random) -> None:
+    """Walk the guided flow from the greeting to the recommendations."""
+    session_id = None
+    for i, choices in enumerate(FLOW_CHOICES):
+        body = {"message": f"_flow:{rng.choice(choices)}", "session_id": session_id}
+        if i == 0:
+            body["flow_state"] = "greeting"
+        response = client.request("POST /api/chat (flow)", "POST", "/api/chat", body)
+        if response is None:
+            return
+        session_id = response.get("session_id")
+
+
+def chat_ai(client: Client, rng: random.Random) -> None:
+    """Ask the AI assistant a question."""
+    client.request("POST /api/chat (ai)", "POST", "/api/chat", {
+        "message": rng.choice(AI_QUESTIONS), "flow_state": "ai_chat",
+    })
+
+
+def packages(client: Client, rng: random.Random) -> None:
+    """List every package."""
+    client.request("GET /api/packages", "GET", "/api/packages")
+
+
+def filter_packages(client: Client, rng: random.Random) -> None:
+    """Filter by a random subset of criteria."""
+    criteria = {
+        "region": rng.choice(["North Island", "South Island", "Both"]),
+        "type": rng.choice(["Adventure", "Culture", "Nature", "Food", "Mixed"]),
+        "duration_max": rng.choice([5, 8, 16]),
+        "budget_max": rng.choice([1500, 3000, 5000]),
+        "group_size": rng.choice([1, 2, 4, 8]),
+        "travel_month": rng.randint(1, 12),
+    }
+    body = dict(rng.sample(sorted(criteria.items()), rng.randint(1, 3)))
+    client.request("POST /api/packages/filter", "POST", "/api/packages/filter", body)
+
+
+def custom_trip(client: Client, rng: random.Random) -> None:
+    """Submit a custom trip request."""
+    client.request("POST /api/custom-trips", "POST", "/api/custom-trips", {
+        "selections": {choices[0]: rng.choice(choices) for choices in FLOW_CHOICES[1:]},
+        "name": "Load Test",
+        "phone": "+64 21 000 0000",
+        "email": f"load{rng.randint(0, 10**6)}@example.com",
+        "notes": "Benchmark submission",
+    })
+
+
+SCENARIOS = {
+    "chat_flow": chat_flow,
+    "chat_ai": chat_ai,
+    "packages": packages,
+    "filter": filter_packages,
+    "custom_trip": custom_trip,
+}
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """Scenario weights from ``name=weight,...``."""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def run_load(host: str, port: int, weights: dict[str, float], concurrency: int, duration: float, seed: int) -> list:
+    """Run scenarios from ``concurrency`` threads for ``duration`` seconds."""
+    samples: list = []
+    deadline = time.perf_counter() + duration
+    names, scenario_weights = list(weights), list(weights.values())
+
+    def worker(n: int) -> None:
+        rng = random.Random(seed + n)
+        client = Client(host, port, samples)
+        while time.perf_counter() < deadline:
+            SCENARIOS[rng.choices(names, scenario_weights)[0]](client, rng)
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def report(samples: list, since: float, until: float) -> None:
+    """Print throughput and latency percentiles per endpoint and overall."""
+    samples = [sample for sample in samples if since <= sample[3] <= until]
+    elapsed = until - since
+    by_name: dict[str, list] = {}
+    for sample in samples:
+        by_name.setdefault(sample[0], []).append(sample)
+
+    print(f"\n{'endpoint':<28} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, rows in sorted(by_name.items()) + [("total", samples)]:
+        if not rows:
+            continue
+        timings = sorted(row[1] * 1000 for row in rows)
+        errors = sum(1 for row in rows if not row[2])
+        print(
+            f"{name:<28} {len(rows):>8} {errors:>7} {len(rows) / elapsed:>8.1f} "
+            f"{percentile(timings, 50):>8.1f} {percentile(timings, 95):>8.1f} "
+            f"{percentile(timings, 99):>8.1f} {timings[-1]:>8.1f}"
+        )
+
+
+def wait_ready(host: str, port: int, server: Optional[subprocess.Popen], timeout: float = 60) -> None:
+    """Wait until the API answers its health check."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server is not None and server.poll() is not None:
+            raise SystemExit("API server exited during startup")
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("API server did not become ready")
+
+
+def free_port() -> int:
+    """An unused local TCP port."""
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def create_app():
+    """App factory for each server worker: the API with the fake Gemini model and Sheets client (if any)."""
+    from app.main import app
+
+    from .fakes import FakeGeminiModel, Faults, install
+
+    fakes = json.loads(os.environ["BENCH_FAKES"])
+    install(fakes["sheets_url"], FakeGeminiModel(Faults(
+        fakes["gemini_latency_ms"], fakes["gemini_jitter_ms"], fakes["gemini_error_rate"], seed=fakes["seed"],
+    )))
+    return app
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Subprocess entry point: run the API under uvicorn with the fakes installed."""
+    import uvicorn
+
+    os.environ["BENCH_FAKES"] = json.dumps({
+        "sheets_url": args.sheets_url,
+        "gemini_latency_ms": args.gemini_latency_ms,
+        "gemini_jitter_ms": args.gemini_jitter_ms,
+        "gemini_error_rate": args.gemini_error_rate,
+        "seed": args.seed,
+    })
+    uvicorn.run(
+        "benchmarks.bench_load:create_app", factory=True, workers=args.workers,
+        host="127.0.0.1", port=args.serve, log_level="warning",
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Load an already running server instead of starting one")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load")
+    parser.add_argument("--warmup", type=float, default=2, help="Leading seconds left out of the report")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client threads")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--packages", type=int, default=200, help="Packages in the fake sheet")
+    parser.add_argument("--catalog-file", action="store_true", help="Load the packages from a CSV file, not the fake sheet")
+    parser.add_argument("--workers", type=int, default=1, help="Uvicorn worker processes")
+    parser.add_argument("--cache-ttl", type=int, help="Package cache TTL in seconds (default: the app's setting)")
+    parser.add_argument("--sheets-latency-ms", type=float, default=120)
+    parser.add_argument("--sheets-jitter-ms", type=float, default=30)
+    parser.add_argument("--sheets-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-latency-ms", type=float, default=600)
+    parser.add_argument("--gemini-jitter-ms", type=float, default=150)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--sheets-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    weights = parse_mix(args.mix)
+    server = None
+    sheets = None
+    if args.url:
+        target = urlparse(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        from .fakes import FakeSheetsServer, Faults, sheet_values, synthetic_packages, write_catalog_file
+
+        values = sheet_values(synthetic_packages(args.packages))
+        host, port = "127.0.0.1", free_port()
+        data_dir = Path(tempfile.mkdtemp(prefix="nztours-bench-"))
+        env = {
+            **os.environ,
+            "WARMUP_ENABLED": "false",
+            "RAG_ENABLED": "false",
+            "TRIPS_DB_PATH": str(data_dir / "custom_trips.db"),
+            "CHAT_SESSION_DB_PATH": str(data_dir / "chat_sessions.db"),
+            "CATALOG_SNAPSHOT_DIR": str(data_dir / "catalog"),
+            "NOTIFICATIONS_TRANSPORT": "file",
+            "NOTIFICATIONS_FILE_PATH": str(data_dir / "notifications.jsonl"),
+        }
+        if args.cache_ttl is not None:
+            env["CACHE_TTL_SECONDS"] = str(args.cache_ttl)
+        command = [
+            sys.executable, "-m", "benchmarks.bench_load", "--serve", str(port),
+            "--gemini-latency-ms", str(args.gemini_latency_ms), "--gemini-jitter-ms", str(args.gemini_jitter_ms),
+            "--gemini-error-rate", str(args.gemini_error_rate), "--seed", str(args.seed),
+            "--workers", str(args.workers),
+        ]
+        if args.catalog_file:
+            write_catalog_file(data_dir / "packages.csv", values)
+            env.update({"CATALOG_SOURCE": "file", "CATALOG_FILE_PATH": str(data_dir / "packages.csv")})
+        else:
+            sheets = FakeSheetsServer(
+                values, Faults(args.sheets_latency_ms, args.sheets_jitter_ms, args.sheets_error_rate, seed=args.seed),
+            ).start()
+            env["GOOGLE_SHEETS_ID"] = "bench"
+            command += ["--sheets-url", sheets.url]
+        server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+        print(f"Started API on port {port} with {args.workers} worker(s) (data in {data_dir})")
+
+    try:
+        wait_ready(host, port, server)
+        print(
+            f"Running {args.concurrency} clients for {args.duration:g}s "
+            f"({', '.join(f'{name}={weight:g}' for name, weight in weights.items())})"
+        )
+        start = time.perf_counter()
+        samples = run_load(host, port, weights, args.concurrency, args.duration, args.seed)
+        report(samples, start + args.warmup, time.perf_counter())
+        if sheets is not None:
+            print(f"\nFake Sheets: {sheets.requests} requests, {sheets.errors} injected errors")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+        if sheets is not None:
+            sheets.stop()
+
+
+if __name__ == "__main__":
+    main()
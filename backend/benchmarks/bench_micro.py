@@ -0,0 +1,153 @@
+"""Microbenchmarks of the catalog and retrieval hot paths at several catalog sizes.
+
+Covers ``PackageParser.parse`` (a whole sheet of rows),
+``RecommendationService.filter_packages`` and ``get_recommendations``, and
+``RAGService.retrieve`` over an in-process index. Retrieval uses a hashing
+embedder so it runs without downloading the model; pass ``--real-embedder``
+to include sentence-transformers encoding time.
+
+    python -m benchmarks.bench_micro --sizes 100 1000 10000
+"""
+
+import argparse
+import gc
+import hashlib
+import random
+import statistics
+import timeit
+from typing import Callable
+
+import numpy as np
+
+from app.models.schemas import PackageFilter
+from app.services.package_parser import PackageParser
+from app.services.rag_service import RAGService
+from app.services.recommendation import recommendation_service
+
+from .fakes import PLACES, sheet_values, synthetic_packages
+
+DIM = 384
+DOC_TYPES = ["faq", "destination", "activity", "seasonal_tip", "policy"]
+
+FILTERS = {
+    "region": PackageFilter(region="South Island"),
+    "region+type+budget": PackageFilter(region="North Island", type="Adventure", budget_max=3000),
+    "all criteria": PackageFilter(
+        region="Both", type="Nature", duration_min=4, duration_max=10,
+        budget_min=1000, budget_max=5000, group_size=2, travel_month=7,
+    ),
+}
+
+SELECTIONS = [
+    {"destination": "south", "trip_type": "adventure", "duration": "week", "budget": "mid", "group_size": "couple"},
+    {"destination": "both", "trip_type": "mixed", "duration": "flexible", "budget": "luxury", "travel_time": "winter"},
+]
+
+QUERIES = [
+    "What is the weather like in Queenstown in winter?",
+    "Can I get a refund if I cancel my booking?",
+    "Best places to see whales and penguins",
+]
+
+
+class HashingEmbedder:
+    """Stand-in for SentenceTransformer: hashed bag of words projected to 384 dimensions."""
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(DIM, dtype=np.float32)
+        for word in text.lower().split():
+            digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+            seed = int.from_bytes(digest, "little")
+            vector += np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+        return vector
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.stack([self._vector(text) for text in texts])
+
+
+def per_call(fn: Callable[[], object], repeat: int = 5, gc_enabled: bool = False) -> float:
+    """Median seconds per call over ``repeat`` timing runs of auto-ranged loop counts.
+
+    timeit turns the garbage collector off; ``gc_enabled`` keeps it on, for
+    code whose cost includes the collections its allocations trigger.
+    """
+    timer = timeit.Timer(fn, setup="gc.enable()" if gc_enabled else "pass", globals={"gc": gc})
+    loops, _ = timer.autorange()
+    return statistics.median(t / loops for t in timer.repeat(repeat, loops))
+
+
+def row(name: str, size: int, seconds: float, items: int = 1) -> None:
+    """Print one result line."""
+    per_item = f"{seconds / items * 1e6:>12.2f}" if items > 1 else f"{'':>12}"
+    print(f"{name:<38} {size:>7} {seconds * 1e3:>12.3f} {per_item}")
+
+
+def rag_service_for(size: int, real_embedder: bool, dtype: str) -> RAGService:
+    """A RAG service whose local index holds ``size`` synthetic knowledge documents."""
+    from app.services.vector_index import PartitionedIndex
+
+    rag = RAGService()
+    rag._settings = rag._settings.model_copy(update={"rag_vector_store": "local", "rag_embedding_dtype": dtype})
+    rag._embedder = None if real_embedder else HashingEmbedder()
+    embedder = rag._get_embedder()
+
+    rng = random.Random(size)
+    packages = synthetic_packages(min(size, 500), seed=size)
+    documents, metadatas = [], []
+    for i in range(size):
+        package = packages[i % len(packages)]
+        documents.append(f"{package.description} {' '.join(package.highlights)} {rng.choice(PLACES)}")
+        metadatas.append({"type": DOC_TYPES[i % len(DOC_TYPES)], "region": package.region})
+
+    index = PartitionedIndex(rag._new_local_index)
+    for start in range(0, size, 256):
+        batch = documents[start:start + 256]
+        index.add(
+            ids=[f"doc_{i}" for i in range(start, start + len(batch))],
+            embeddings=embedder.encode(batch),
+            documents=batch,
+            metadatas=metadatas[start:start + len(batch)],
+        )
+    rag._local_index = index
+    rag._initialized = True
+    return rag
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--real-embedder", action="store_true", help="Encode queries with sentence-transformers")
+    parser.add_argument("--rag-dtype", default="float32", choices=["float32", "float16", "int8"])
+    args = parser.parse_args()
+
+    print(f"{'benchmark':<38} {'size':>7} {'ms/call':>12} {'us/package':>12}")
+    for size in args.sizes:
+        packages = synthetic_packages(size)
+        values = sheet_values(packages)
+        headers, rows = values[0], values[1:]
+
+        row("PackageParser.parse (whole sheet)", size, per_call(
+            lambda: PackageParser(headers).parse(rows, 2), gc_enabled=True
+        ), size)
+        catalog = PackageParser(headers).parse(rows, 2)
+        row("gc.collect (catalog loaded)", size, per_call(gc.collect))
+        del catalog
+        for name, filters in FILTERS.items():
+            row(f"filter_packages ({name})", size, per_call(lambda: recommendation_service.filter_packages(packages, filters)), size)
+        for i, selections in enumerate(SELECTIONS, 1):
+            row(f"get_recommendations (selections {i})", size, per_call(
+                lambda: recommendation_service.get_recommendations(packages, selections)
+            ), size)
+
+        rag = rag_service_for(size, args.real_embedder, args.rag_dtype)
+        row("RAGService.retrieve", size, per_call(lambda: [rag.retrieve(q) for q in QUERIES]) / len(QUERIES))
+        row("RAGService.retrieve (doc_types=faq)", size, per_call(
+            lambda: [rag.retrieve(q, doc_types=["faq"]) for q in QUERIES]
+        ) / len(QUERIES))
+        print()
+
+
+if __name__ == "__main__":
+    main()
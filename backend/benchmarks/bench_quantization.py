@@ -0,0 +1,91 @@
+"""Recall and latency of quantized embedding storage against the float32 baseline.
+
+Uses synthetic clustered 384-d vectors (the all-MiniLM-L6-v2 dimension) so it
+runs without downloading the model. Pass ``--knowledge-base`` to embed the real
+knowledge base documents instead.
+
+    python -m benchmarks.bench_quantization --sizes 1000 10000 50000 --k 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.vector_index import SUPPORTED_DTYPES, VectorIndex, normalize
+
+DIM = 384
+
+
+def synthetic_corpus(size: int, n_queries: int, seed: int = 7) -> tuple[np.ndarray, np.ndarray]:
+    """Clustered unit vectors plus queries that are noisy copies of corpus vectors."""
+    rng = np.random.default_rng(seed)
+    n_clusters = max(8, size // 200)
+    centres = rng.standard_normal((n_clusters, DIM)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size)
+    corpus = normalize(centres[labels] + 0.6 * rng.standard_normal((size, DIM)).astype(np.float32))
+    picks = rng.integers(0, size, n_queries)
+    queries = normalize(corpus[picks] + 0.3 * rng.standard_normal((n_queries, DIM)).astype(np.float32))
+    return corpus, queries
+
+
+def knowledge_base_corpus() -> tuple[np.ndarray, np.ndarray]:
+    """Embed the knowledge base documents, querying with their own first sentences."""
+    from app.services.rag_service import rag_service
+
+    documents = rag_service._prepare_documents()
+    embedder = rag_service._get_embedder()
+    corpus = embedder.encode([doc["content"] for doc in documents])
+    queries = embedder.encode([doc["content"].split(".")[0] for doc in documents])
+    return normalize(corpus), normalize(queries)
+
+
+def run(corpus: np.ndarray, queries: np.ndarray, k: int) -> None:
+    """Print memory, latency and recall@k for each storage dtype."""
+    ids = [str(i) for i in range(len(corpus))]
+    docs = [""] * len(corpus)
+    baseline = None
+
+    print(f"\n{len(corpus)} vectors, {len(queries)} queries, k={k}")
+    print(f"{'dtype':<8} {'bytes':>12} {'ratio':>6} {'mean ms':>9} {'p95 ms':>8} {'recall@k':>9}")
+    for dtype in SUPPORTED_DTYPES:
+        index = VectorIndex(dtype=dtype)
+        index.add(ids, corpus, docs)
+
+        results, timings = [], []
+        for query in queries:
+            start = time.perf_counter()
+            hits = index.search(query, k)
+            timings.append((time.perf_counter() - start) * 1000)
+            results.append({row for row, _ in hits})
+
+        if baseline is None:
+            baseline = results
+            baseline_bytes = index.nbytes
+        recall = np.mean([len(r & b) / max(len(b), 1) for r, b in zip(results, baseline)])
+        print(
+            f"{dtype:<8} {index.nbytes:>12,} {baseline_bytes / index.nbytes:>5.1f}x "
+            f"{np.mean(timings):>9.3f} {np.percentile(timings, 95):>8.3f} {recall:>9.4f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--knowledge-base", action="store_true", help="Embed the real knowledge base")
+    args = parser.parse_args()
+
+    if args.knowledge_base:
+        corpus, queries = knowledge_base_corpus()
+        run(corpus, queries, args.k)
+        return
+
+    for size in args.sizes:
+        corpus, queries = synthetic_corpus(size, args.queries)
+        run(corpus, queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
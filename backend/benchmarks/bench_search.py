@@ -0,0 +1,98 @@
+"""Build time and query latency of the package search index.
+
+Generates a synthetic catalog by rewriting the demo packages with words drawn
+from a Zipf-distributed vocabulary, so common terms appear in most packages
+as they would in a real catalog.
+
+    python -m benchmarks.bench_search --sizes 1000 10000 --queries 300
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from app.models.schemas import Package
+from app.services.package_search import PackageSearchIndex
+from app.services.sheets_service import sheets_service
+
+SYLLABLES = "ka ko ra ri ta to wa wi ma mo na ne pu ro te ho hi ke".split()
+
+
+def synthetic_catalog(size: int, seed: int = 7) -> list[Package]:
+    """Demo packages rewritten with Zipf-distributed words."""
+    rng = random.Random(seed)
+    vocab = sorted({"".join(rng.sample(SYLLABLES, 3)) for _ in range(3000)})
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+
+    def text(n: int) -> str:
+        return " ".join(rng.choices(vocab, weights, k=n))
+
+    base = sheets_service._build_demo_packages()
+    return [
+        base[i % len(base)].model_copy(update={
+            "id": str(i),
+            "name": text(4),
+            "region": rng.choice(["North Island", "South Island", "Both"]),
+            "description": text(30),
+            "highlights": [text(3) for _ in range(4)],
+            "itinerary": [f"Day {day}: {text(8)}" for day in range(1, 6)],
+        })
+        for i in range(size)
+    ]
+
+
+def sample_queries(packages: list[Package], n: int, seed: int = 11) -> list[str]:
+    """One to three words taken from random packages."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        words = (rng.choice(packages).name + " " + rng.choice(packages).description).split()
+        queries.append(" ".join(rng.sample(words, rng.choice([1, 2, 3]))))
+    return queries
+
+
+def timed(index: PackageSearchIndex, queries: list[str], prefix: bool) -> list[float]:
+    """Per-query latency in microseconds (best of three runs)."""
+    timings = []
+    for query in queries:
+        if prefix and len(query.split()[-1]) > 4:
+            query = query[:-2]
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            index.search(query, 10, prefix=prefix)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best * 1e6)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{'packages':>9} {'build s':>8} {'terms':>7} {'mode':<7} {'p50 us':>8} {'p95 us':>8} {'max us':>8}")
+    for size in args.sizes:
+        packages = synthetic_catalog(size)
+        start = time.perf_counter()
+        index = PackageSearchIndex(packages)
+        build_s = time.perf_counter() - start
+        queries = sample_queries(packages, args.queries)
+        for prefix in (False, True):
+            timings = sorted(timed(index, queries, prefix))
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(
+                f"{size:>9} {build_s:>8.2f} {len(index.postings):>7} {'prefix' if prefix else 'exact':<7} "
+                f"{statistics.median(timings):>8.1f} {p95:>8.1f} {timings[-1]:>8.1f}"
+            )
+    print("\nAutocomplete:", end=" ")
+    start = time.perf_counter()
+    for _ in range(10000):
+        index.suggest("hik")
+    print(f"{(time.perf_counter() - start) / 10000 * 1e6:.2f} us per lookup")
+
+
+if __name__ == "__main__":
+    main()
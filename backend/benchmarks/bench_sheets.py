@@ -0,0 +1,146 @@
+"""Catalog fetch from a large sheet: one A:P request against parallel row blocks.
+
+Serves a synthetic sheet from the fake Sheets server in a subprocess (so its
+JSON encoding doesn't compete with the client for the GIL) and times
+``SheetsSource.fetch`` end to end, fetch and parse included, for each block
+size and concurrency. The fake adds per-request latency plus a per-cell
+cost, since the real API takes longer to return larger ranges. The sheet
+has a blank row after every ``--blank-every`` rows, so blocks of a multiple
+of that size end on one (the API leaves it out of the response) and the
+fetch must still read on. The same rows written to a CSV file and loaded by
+``FileSource`` give the offline baseline.
+
+    python -m benchmarks.bench_sheets --rows 10000 100000 --blocks 0 2000 5000 --concurrency 1 4 8
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.services.package_sources import FileSource
+from app.services.sheets_service import SheetsSource
+
+from .bench_load import free_port
+from .fakes import FakeSheetsServer, Faults, sheet_values, sheets_client, synthetic_packages, write_catalog_file
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+
+def with_blank_rows(values: list[list[str]], every: int) -> list[list[str]]:
+    """Sheet rows with a blank row after every ``every`` rows (0 for none), at rows 1001, 2001, ... for 1000.
+
+    Blocks end on the row after a multiple of the block size, the header
+    taking up row 1, so these are the last rows of blocks whose size is a
+    multiple of ``every``.
+    """
+    if every <= 0:
+        return values
+    rows = [values[0]]
+    for row in values[1:]:
+        if len(rows) % every == 0:
+            rows.append([""] * len(row))
+        rows.append(row)
+    return rows
+
+
+def serve_sheets(args: argparse.Namespace) -> None:
+    """Subprocess entry point: serve a synthetic sheet until killed."""
+    sheets = FakeSheetsServer(
+        with_blank_rows(sheet_values(synthetic_packages(args.serve_rows)), args.blank_every),
+        Faults(args.latency_ms, args.jitter_ms, seed=args.seed),
+        port=args.serve_sheets, cell_us=args.cell_us,
+    ).start()
+    print("ready", flush=True)
+    sheets._thread.join()
+
+
+def start_sheets(rows: int, args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    """Start a fake Sheets server process with ``rows`` packages; returns it and its URL."""
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.bench_sheets", "--serve-sheets", str(port), "--serve-rows", str(rows),
+            "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+            "--cell-us", str(args.cell_us), "--blank-every", str(args.blank_every), "--seed", str(args.seed),
+        ],
+        cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True,
+    )
+    if server.stdout.readline().strip() != "ready":
+        raise SystemExit("Fake Sheets server did not start")
+    return server, f"http://127.0.0.1:{port}/"
+
+
+def fetch_time(url: str, block_rows: int, concurrency: int, rows: int, runs: int) -> float:
+    """Median seconds to fetch and parse the whole catalog."""
+    times = []
+    for _ in range(runs):
+        source = SheetsSource()
+        source._settings = source._settings.model_copy(update={
+            "google_sheets_id": "bench", "sheets_block_rows": block_rows, "sheets_fetch_concurrency": concurrency,
+        })
+        source._service = sheets_client(url)
+        start = time.perf_counter()
+        packages = source.fetch()
+        times.append(time.perf_counter() - start)
+        if len(packages) != rows:
+            raise SystemExit(f"Fetched {len(packages)} packages, expected {rows}")
+    return statistics.median(times)
+
+
+def file_time(rows: int, runs: int) -> float:
+    """Median seconds to load the same catalog from a CSV file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "packages.csv"
+        write_catalog_file(path, sheet_values(synthetic_packages(rows)))
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            packages = FileSource(path).fetch()
+            times.append(time.perf_counter() - start)
+            if len(packages) != rows:
+                raise SystemExit(f"Loaded {len(packages)} packages, expected {rows}")
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000], help="Packages in the sheet")
+    parser.add_argument("--blocks", type=int, nargs="+", default=[0, 2000, 5000], help="Block sizes (0 = one A:P request)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=150, help="Per-request latency of the fake")
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--cell-us", type=float, default=2, help="Fake server time per returned cell")
+    parser.add_argument("--blank-every", type=int, default=1000, help="A blank sheet row every N rows (0 = none)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--serve-sheets", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--serve-rows", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_sheets:
+        serve_sheets(args)
+        return
+
+    print(f"{'rows':>7} {'block rows':>11} {'concurrency':>12} {'ms':>10} {'packages/s':>12}")
+    for rows in args.rows:
+        server, url = start_sheets(rows, args)
+        try:
+            for block_rows in args.blocks:
+                for concurrency in args.concurrency if block_rows else [1]:
+                    seconds = fetch_time(url, block_rows, concurrency, rows, args.runs)
+                    label = block_rows if block_rows else "A:P"
+                    print(f"{rows:>7} {label:>11} {concurrency:>12} {seconds * 1000:>10.1f} {rows / seconds:>12.0f}")
+        finally:
+            server.terminate()
+            server.wait(10)
+        seconds = file_time(rows, args.runs)
+        print(f"{rows:>7} {'csv file':>11} {1:>12} {seconds * 1000:>10.1f} {rows / seconds:>12.0f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""Local stand-ins for Google Sheets and Gemini with configurable latency and errors.
+
+``FakeSheetsServer`` is a real HTTP server speaking the Sheets v4 values API,
+so requests go through googleapiclient and httplib2 exactly as in production;
+``write_catalog_file`` writes the same rows for the local file source.
+``FakeGeminiModel`` replaces the ``genai.GenerativeModel`` instance, since the
+Gemini client's transport is not worth reproducing for load tests.
+"""
+
+import asyncio
+import csv
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+from app.models.schemas import Package
+
+SHEET_HEADERS = [
+    "ID", "Name", "Region", "Type", "Duration", "Price", "Group Size", "Description",
+    "Highlights", "Itinerary", "Inclusions", "Exclusions", "Image URL", "Gallery", "Season", "Status",
+]
+
+REGIONS = ["North Island", "South Island", "Both"]
+TYPES = ["Adventure", "Culture", "Nature", "Food", "Mixed"]
+SEASONS = [["All Year"], ["Summer", "Autumn"], ["Autumn", "Spring"], ["Winter"], ["Summer"], ["Oct-Mar"]]
+PLACES = [
+    "Queenstown", "Rotorua", "Milford Sound", "Wanaka", "Kaikoura", "Abel Tasman", "Waitomo",
+    "Franz Josef", "Tongariro", "Napier", "Marlborough", "Dunedin", "Bay of Islands", "Wellington",
+]
+ACTIVITIES = [
+    "jet boating", "glacier hike", "wine tasting", "whale watching", "hangi dinner", "kayaking",
+    "bungee jump", "glowworm caves", "geothermal pools", "scenic flight", "penguin colony", "cycle trail",
+]
+
+
+def synthetic_packages(size: int, seed: int = 7) -> list[Package]:
+    """Varied active packages covering every region, type, price band and season."""
+    rng = random.Random(seed)
+    packages = []
+    for i in range(size):
+        place = rng.choice(PLACES)
+        activities = rng.sample(ACTIVITIES, 4)
+        duration = rng.choice([2, 3, 4, 5, 6, 7, 8, 10, 12, 14, 16])
+        group_min = rng.choice([1, 2, 2, 4])
+        packages.append(Package(
+            id=str(i + 1),
+            name=f"{place} {activities[0].title()} Tour {i + 1}",
+            region=rng.choice(REGIONS),
+            type=rng.choice(TYPES),
+            duration=duration,
+            price=float(round(rng.uniform(300, 2000) * duration ** 0.6, -1)),
+            group_size_min=group_min,
+            group_size_max=group_min + rng.choice([2, 6, 10, 14]),
+            description=f"{duration} days around {place} with {', '.join(activities)}.",
+            highlights=[activity.title() for activity in activities],
+            itinerary=[f"Day {day}: {rng.choice(ACTIVITIES)} near {rng.choice(PLACES)}" for day in range(1, duration + 1)],
+            inclusions=["Accommodation", "Transport", "Guide"],
+            exclusions=["Flights", "Travel insurance"],
+            image_url=f"https://images.example.com/{i + 1}.jpg",
+            gallery=[f"https://images.example.com/{i + 1}-{n}.jpg" for n in range(3)],
+            season=rng.choice(SEASONS),
+            status="Active",
+        ))
+    return packages
+
+
+def sheet_values(packages: list[Package]) -> list[list[str]]:
+    """Header row plus one row of cell strings per package, as the Sheets API returns them."""
+    rows = [list(SHEET_HEADERS)]
+    for p in packages:
+        group = str(p.group_size_min) if p.group_size_min == p.group_size_max else f"{p.group_size_min}-{p.group_size_max}"
+        rows.append([
+            p.id, p.name, p.region, p.type, str(p.duration), f"{p.price:g}", group, p.description,
+            ", ".join(p.highlights), "\n".join(p.itinerary), ", ".join(p.inclusions), ", ".join(p.exclusions),
+            p.image_url, ", ".join(p.gallery), ", ".join(p.season), p.status,
+        ])
+    return rows
+
+
+class Faults:
+    """Latency (mean and jitter, in ms) and error rate shared by the fakes."""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> tuple[float, bool]:
+        """Delay in seconds for one call and whether it should fail."""
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            return delay, self._rng.random() < self.error_rate
+
+
+def _cells(values: list[list[str]]) -> int:
+    """Number of cells in a block of rows."""
+    return sum(len(row) for row in values)
+
+
+class FakeSheetsServer:
+    """Threaded HTTP server serving ``values.get``, ``values.batchGet`` and ``spreadsheets.get`` for one sheet.
+
+    Like the real API, value ranges leave out trailing empty rows and cells,
+    and the sheet's grid is at least the 1000 rows of a new sheet. Besides
+    the per-request latency from ``faults``, each response is delayed by
+    ``cell_us`` microseconds per returned cell, as the real API takes longer
+    to produce larger ranges.
+    """
+
+    def __init__(
+        self, values: list[list[str]], faults: Optional[Faults] = None,
+        host: str = "127.0.0.1", port: int = 0, cell_us: float = 0,
+    ):
+        self.values = values
+        self.faults = faults or Faults()
+        self.cell_us = cell_us
+        self.requests = 0
+        self.errors = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass as the client's API endpoint."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _range(self, a1: str) -> list[list[str]]:
+        """Cells of an A1 range such as ``A:P``, ``Sheet1!A2:P500`` or ``A1:A``."""
+        a1 = a1.split("!")[-1]
+        start, _, end = a1.partition(":")
+
+        def parse(ref: str, default_row: int) -> tuple[int, int]:
+            letters = "".join(ch for ch in ref if ch.isalpha()).upper()
+            digits = "".join(ch for ch in ref if ch.isdigit())
+            col = 0
+            for ch in letters:
+                col = col * 26 + ord(ch) - ord("A") + 1
+            return col - 1, int(digits) if digits else default_row
+
+        first_col, first_row = parse(start, 1)
+        last_col, last_row = parse(end or start, len(self.values))
+        rows = [row[first_col:last_col + 1] for row in self.values[first_row - 1:last_row]]
+        for row in rows:
+            while row and row[-1] == "":
+                row.pop()
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    @property
+    def row_count(self) -> int:
+        """Rows in the sheet's grid, blank ones included."""
+        return max(len(self.values), 1000)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: dict, cells: int = 0) -> None:
+                data = json.dumps(body).encode()
+                if cells and fake.cell_us:
+                    time.sleep(cells * fake.cell_us / 1e6)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                fake.requests += 1
+                delay, fail = fake.faults.draw()
+                time.sleep(delay)
+                if fail:
+                    fake.errors += 1
+                    self._send(503, {"error": {"code": 503, "message": "The service is currently unavailable.", "status": "UNAVAILABLE"}})
+                    return
+
+                url = urlparse(self.path)
+                parts = [unquote(part) for part in url.path.strip("/").split("/")]
+                # /v4/spreadsheets/{id}, /v4/spreadsheets/{id}/values/{range} and /v4/spreadsheets/{id}/values:batchGet
+                if len(parts) == 3 and parts[:2] == ["v4", "spreadsheets"]:
+                    grid = {"rowCount": fake.row_count, "columnCount": 26}
+                    self._send(200, {"sheets": [{"properties": {"gridProperties": grid}}]})
+                elif len(parts) == 5 and parts[:2] == ["v4", "spreadsheets"] and parts[3] == "values":
+                    values = fake._range(parts[4])
+                    self._send(200, {"range": parts[4], "majorDimension": "ROWS", "values": values}, _cells(values))
+                elif len(parts) == 4 and parts[:2] == ["v4", "spreadsheets"] and parts[3] == "values:batchGet":
+                    ranges = parse_qs(url.query).get("ranges", [])
+                    value_ranges = [{"range": a1, "majorDimension": "ROWS", "values": fake._range(a1)} for a1 in ranges]
+                    self._send(
+                        200, {"spreadsheetId": parts[2], "valueRanges": value_ranges},
+                        sum(_cells(value_range["values"]) for value_range in value_ranges),
+                    )
+                else:
+                    self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        return Handler
+
+    def start(self) -> "FakeSheetsServer":
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-sheets", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Shut the server down."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def write_catalog_file(path, values: list[list[str]]) -> None:
+    """Write sheet rows to a CSV file (tab-separated if ``path`` ends in .tsv) for the file catalog source."""
+    path = Path(path)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f, delimiter="\t" if path.suffix == ".tsv" else ",").writerows(values)
+
+
+def sheets_client(url: str):
+    """googleapiclient Sheets service pointed at a fake server, without credentials."""
+    from app.services.google_http import google_http
+    from app.services.sheets_service import build_sheets_client
+
+    return build_sheets_client(http=google_http(), client_options={"api_endpoint": url})
+
+
+class _Text:
+    """Response or stream chunk with a ``text`` attribute."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Stream:
+    """Async iterator of chunks, spreading the latency over them."""
+
+    def __init__(self, chunks: list[str], delay: float, fail: bool):
+        self._chunks = chunks
+        self._delay = delay / max(1, len(chunks))
+        self._fail = fail
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for i, chunk in enumerate(self._chunks):
+            await asyncio.sleep(self._delay)
+            if self._fail and i == len(self._chunks) // 2:
+                raise RuntimeError("Fake Gemini stream interrupted")
+            yield _Text(chunk)
+
+
+class FakeGeminiModel:
+    """Drop-in for ``genai.GenerativeModel`` returning canned text after a delay.
+
+    ``generate_content`` blocks like the real client does, so the cost of
+    calling it from async code shows up in the load test.
+    """
+
+    REPLY = (
+        "Kia Ora! New Zealand has something for every season. In winter the Southern Alps are "
+        "perfect for skiing, while summer is ideal for hiking the Great Walks and exploring the "
+        "beaches of the Bay of Islands. Let me know your dates and I can suggest a package."
+    )
+
+    def __init__(self, faults: Optional[Faults] = None, chunks: int = 8):
+        self.faults = faults or Faults()
+        self.chunks = chunks
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def _chunks(self) -> list[str]:
+        words = self.REPLY.split(" ")
+        size = max(1, len(words) // self.chunks)
+        return [" ".join(words[i:i + size]) + " " for i in range(0, len(words), size)]
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        delay, fail = self.faults.draw()
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError("Fake Gemini error")
+        return _Text(self.REPLY)
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        delay, fail = self.faults.draw()
+        if stream:
+            return _Stream(self._chunks(), delay, fail)
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("Fake Gemini error")
+        return _Text(self.REPLY)
+
+
+def install(sheets_url: Optional[str] = None, gemini: Optional[FakeGeminiModel] = None) -> None:
+    """Point the app's service singletons at the fakes."""
+    if sheets_url:
+        from app.services.sheets_service import sheets_service
+
+        sheets_service._source._service = sheets_client(sheets_url)
+        sheets_service._cache = None
+    if gemini is not None:
+        from app.services.gemini_service import gemini_service
+
+        gemini_service._model = gemini
@@ -0,0 +1,118 @@
+"""Import-time report and cold-start check for ``app.main``.
+
+Imports the app in fresh interpreters under ``python -X importtime`` and
+prints the slowest modules (cumulative, median over the runs) and the total
+per top-level package. With ``--first-response`` it also starts uvicorn cold
+and times how long the first ``GET /api/packages`` takes to answer. Exits
+non-zero when a median exceeds its budget, so it can gate a deploy.
+
+    python -m benchmarks.importtime --runs 5 --budget-ms 600 --first-response --first-response-budget-ms 1500
+"""
+
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from .bench_load import free_port
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# Keep background warm-up and optional features out of the measurement
+ENV = {"WARMUP_ENABLED": "false", "RAG_ENABLED": "false"}
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """{module: (self us, cumulative us)} from one fresh interpreter importing ``module``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env={**os.environ, **ENV}, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # The first import of a module is the one that paid for it
+        times.setdefault(name.strip(), (int(self_us), int(cumulative_us)))
+    return times
+
+
+def first_response(path: str, timeout: float = 60) -> float:
+    """Seconds from starting uvicorn to the first successful response for ``path``."""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, **ENV}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise SystemExit("API server exited during startup")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+                conn.request("GET", path)
+                if conn.getresponse().status == 200:
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)
+        raise SystemExit("API server did not answer")
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--top", type=int, default=25, help="Slowest modules to list")
+    parser.add_argument("--budget-ms", type=float, help="Fail if the median import of --module is slower")
+    parser.add_argument("--first-response", action="store_true", help="Also time a cold server's first response")
+    parser.add_argument("--first-response-path", default="/api/packages")
+    parser.add_argument("--first-response-budget-ms", type=float, help="Fail if the median first response is slower")
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    cumulative = {
+        name: statistics.median(run[name][1] for run in runs if name in run) / 1000
+        for name in runs[0]
+    }
+    packages: dict[str, list[float]] = defaultdict(lambda: [0.0] * len(runs))
+    for i, run in enumerate(runs):
+        for name, (self_us, _) in run.items():
+            packages[name.split(".")[0]][i] += self_us / 1000
+
+    print(f"{'module':<60} {'cumulative ms':>14}")
+    for name, ms in sorted(cumulative.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<60} {ms:>14.1f}")
+    print(f"\n{'top-level package':<60} {'self ms':>14}")
+    for name, times in sorted(packages.items(), key=lambda item: -statistics.median(item[1]))[:args.top]:
+        print(f"{name:<60} {statistics.median(times):>14.1f}")
+
+    failed = False
+    total = cumulative.get(args.module, 0.0)
+    print(f"\nimport {args.module}: {total:.1f} ms (median of {args.runs})")
+    if args.budget_ms is not None and total > args.budget_ms:
+        print(f"Over the import budget of {args.budget_ms:g} ms")
+        failed = True
+
+    if args.first_response:
+        seconds = statistics.median(first_response(args.first_response_path) for _ in range(args.runs))
+        print(f"first response to GET {args.first_response_path}: {seconds * 1000:.1f} ms (median of {args.runs})")
+        if args.first_response_budget_ms is not None and seconds * 1000 > args.first_response_budget_ms:
+            print(f"Over the first response budget of {args.first_response_budget_ms:g} ms")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
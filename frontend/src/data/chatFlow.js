@@ -10,6 +10,7 @@ export const FLOW_STATES = {
   DURATION: 'duration',
   BUDGET: 'budget',
   GROUP_SIZE: 'group_size',
+  TRAVEL_TIME: 'travel_time',
   SHOW_PACKAGES: 'show_packages',
   AI_CHAT: 'ai_chat',
 };
@@ -50,6 +51,13 @@ export const SELECTION_LABELS = {
   couple: 'Couple',
   small: 'Small Group (3-5)',
   large: 'Large Group (6+)',
+
+  // Travel time
+  summer: 'Summer (Dec-Feb)',
+  autumn: 'Autumn (Mar-May)',
+  winter: 'Winter (Jun-Aug)',
+  spring: 'Spring (Sep-Nov)',
+  anytime: 'Not Sure Yet',
 };
 
 /**
@@ -73,6 +81,9 @@ export function getSelectionsSummary(selections) {
   if (selections.group_size) {
     summary.push(`Group: ${SELECTION_LABELS[selections.group_size] || selections.group_size}`);
   }
+  if (selections.travel_time) {
+    summary.push(`When: ${SELECTION_LABELS[selections.travel_time] || selections.travel_time}`);
+  }
 
   return summary;
 }
@@ -16,6 +16,7 @@ export function useChat() {
 
   const messagesEndRef = useRef(null);
   const initialized = useRef(false);
+  const sessionId = useRef(null);
 
   // Scroll to bottom when messages change
   useEffect(() => {
@@ -37,6 +38,7 @@ export function useChat() {
     setIsLoading(true);
     try {
       const response = await sendChatMessage('', INITIAL_STATE, {});
+      sessionId.current = response.session_id || null;
 
       addBotMessage(response.message, response.options);
       setFlowState(response.flow_state);
@@ -110,7 +112,10 @@ export function useChat() {
 
     try {
       const messageToSend = isFlowSelection ? `_flow:${text}` : text;
-      const response = await sendChatMessage(messageToSend, flowState, selections);
+      const response = await sendChatMessage(messageToSend, flowState, selections, sessionId.current);
+      if (response.session_id) {
+        sessionId.current = response.session_id;
+      }
 
       // Update selections based on flow
       if (isFlowSelection && flowState !== FLOW_STATES.SHOW_PACKAGES) {
@@ -120,6 +125,7 @@ export function useChat() {
           duration: 'duration',
           budget: 'budget',
           group_size: 'group_size',
+          travel_time: 'travel_time',
         };
 
         if (stateSelectionMap[flowState]) {
@@ -175,6 +181,7 @@ export function useChat() {
     setCurrentOptions(null);
     setError(null);
     initialized.current = false;
+    sessionId.current = null;
 
     // Re-initialize
     setTimeout(() => {
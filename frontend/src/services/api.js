@@ -9,19 +9,16 @@ const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
  * @param {string} message - The user's message
  * @param {string} flowState - Current conversation flow state
  * @param {object} selections - User's selections from the flow
+ * @param {string} sessionId - Server-side session; selections are still sent in case it has expired
  * @returns {Promise<object>} Chat response
  */
-export async function sendChatMessage(message, flowState = null, selections = {}) {
+export async function sendChatMessage(message, flowState = null, selections = {}, sessionId = null) {
   const response = await fetch(`${API_URL}/api/chat`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
     },
-    body: JSON.stringify({
-      message,
-      flow_state: flowState,
-      selections,
-    }),
+    body: JSON.stringify({ message, flow_state: flowState, selections, session_id: sessionId }),
   });
 
   if (!response.ok) {